@@ -0,0 +1,11 @@
+DEFAULT_TRIALS = 3
+DEFAULT_WARMUPS = 1
+DEFAULT_PARAMS = 1024  # millions of model parameters
+DEFAULT_TENSORS = 64
+DEFAULT_LAYERS = 32
+DEFAULT_TYPE = 'half'
+DEFAULT_SAVE_DIR = '/tmp/ds_checkpoint_bench'
+DEFAULT_UPDATE_FRACTION = 1.0
+DEFAULT_ENGINES = ['torch', 'mmap', 'async', 'incremental', 'broadcast']
+ALL_ENGINES = DEFAULT_ENGINES + ['nebula']
+ZERO_STAGES = [1, 2, 3]
@@ -0,0 +1,72 @@
+from benchmarks.checkpoint.utils import *
+from benchmarks.checkpoint.constants import *
+
+from deepspeed.pipe import PipelineModule, LayerSpec
+from deepspeed.runtime import utils as ds_utils
+
+
+def run_pipeline(args):
+    """Saves and loads the per-layer files of a ``PipelineModule`` through
+    ``PipelineModule.save_state_dict`` and ``PipelineModule.load_state_dir``."""
+    hidden = int(math.sqrt(args.params * 1000 * 1000 / args.layers))
+    layers = [LayerSpec(torch.nn.Linear, hidden, hidden) for _ in range(args.layers)]
+    module = PipelineModule(layers=layers,
+                            num_stages=args.pipe_stages,
+                            partition_method='uniform')
+    module.to(get_dtype(args))
+    module.checkpoint_parallel_write_pipeline = args.parallel_write
+    params = list(module.parameters())
+    num_updated = int(len(params) * args.update_fraction)
+    inputs = torch.randn(8, hidden, dtype=get_dtype(args), device=module.device)
+
+    def update():
+        with torch.no_grad():
+            for param in params[:num_updated]:
+                param.add_(1e-3)
+
+    def save(checkpoint_engine, tag_dir):
+        module.save_state_dict(tag_dir, checkpoint_engine)
+        # only count the layers this rank wrote
+        dp_rank = module._grid.data_parallel_id
+        dp_size = module._grid.data_parallel_size
+        if args.parallel_write:
+            offsets = ds_utils.partition_uniform(len(module.forward_funcs), dp_size)
+            layers = module.forward_funcs[offsets[dp_rank]:offsets[dp_rank + 1]]
+        else:
+            layers = module.forward_funcs if dp_rank == 0 else []
+        return sum(numel_bytes(layer.state_dict()) for layer in layers)
+
+    def load(checkpoint_engine, tag_dir):
+        module.load_state_dir(tag_dir, checkpoint_engine)
+        return numel_bytes(module.state_dict()), None
+
+    def first_step(state):
+        module(inputs).float().sum().backward()
+
+    print_header(
+        args,
+        f'save/load of {args.layers} pipeline layer files ({args.pipe_stages} stages)')
+    for engine_name in args.engines:
+        # pipeline layer files are shared by the data parallel ranks of a stage
+        checkpoint_engine = create_checkpoint_engine(
+            engine_name,
+            args,
+            group=module._grid.get_data_parallel_group())
+        if checkpoint_engine is None:
+            print_rank_0(f"{engine_name:14s} skipped, dependencies are not installed")
+            continue
+        timed_save_load(args,
+                        engine_name,
+                        checkpoint_engine,
+                        os.path.join(args.save_dir,
+                                     f'pipeline_{engine_name}'),
+                        save,
+                        load,
+                        first_step,
+                        update)
+
+
+if __name__ == "__main__":
+    args = benchmark_parser().parse_args()
+    init_processes(args)
+    run_pipeline(args)
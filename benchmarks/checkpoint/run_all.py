@@ -0,0 +1,23 @@
+from benchmarks.checkpoint.utils import *
+from benchmarks.checkpoint.zero import run_zero
+from benchmarks.checkpoint.pipeline import run_pipeline
+from benchmarks.checkpoint.constants import *
+
+
+# For importing
+def main(args):
+
+    init_processes(args)
+
+    run_all = not args.zero and not args.pipeline
+    if args.zero or run_all:
+        for stage in args.zero_stages:
+            run_zero(args, stage)
+    if args.pipeline or run_all:
+        run_pipeline(args)
+
+
+# For directly calling benchmark
+if __name__ == "__main__":
+    args = benchmark_parser().parse_args()
+    main(args)
@@ -0,0 +1,306 @@
+import os
+import time
+import math
+import shutil
+import argparse
+import resource
+from types import SimpleNamespace
+
+import torch
+
+import deepspeed
+import deepspeed.comm as dist
+from deepspeed.accelerator import get_accelerator
+
+from benchmarks.checkpoint.constants import *
+
+
+def init_processes(args):
+    backend = args.backend or get_accelerator().communication_backend_name()
+    deepspeed.init_distributed(dist_backend=backend)
+    local_rank = int(os.environ['LOCAL_RANK'])
+    get_accelerator().set_device(local_rank)
+
+
+def print_rank_0(message):
+    if dist.get_rank() == 0:
+        print(message, flush=True)
+
+
+def sync_all():
+    get_accelerator().synchronize()
+    dist.barrier()
+
+
+def get_device():
+    return torch.device(get_accelerator().current_device_name())
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets the peak resident set size (VmHWM) of the
+    # process on Linux. Elsewhere the peak covers the lifetime of the process.
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def get_peak_rss():
+    """Returns the peak resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_dtype(args):
+    return getattr(torch, args.dtype)
+
+
+def create_checkpoint_engine(name, args, group=None):
+    """Returns the checkpoint engine ``name`` configured the way
+    ``DeepSpeedEngine._configure_checkpointing`` would, or None if its
+    dependencies are not available. The broadcast engine shares loads over
+    ``group``, all ranks by default."""
+    from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+    config = SimpleNamespace(checkpoint_mmap_format=(name == 'mmap' or args.mmap_format))
+    if name in ('torch', 'mmap'):
+        return TorchCheckpointEngine(config_params=config)
+    elif name == 'async':
+        from deepspeed.runtime.checkpoint_engine.async_checkpoint_engine import AsyncCheckpointEngine
+        return AsyncCheckpointEngine(config_params=config)
+    elif name == 'incremental':
+        from deepspeed.runtime.checkpoint_engine.incremental_checkpoint_engine import IncrementalCheckpointEngine
+        return IncrementalCheckpointEngine(config_params=config)
+    elif name == 'broadcast':
+        from deepspeed.runtime.checkpoint_engine.broadcast_checkpoint_engine import BroadcastCheckpointEngine
+        return BroadcastCheckpointEngine(
+            TorchCheckpointEngine(config_params=config),
+            group=group or dist.new_group(ranks=range(dist.get_world_size())),
+            device=get_device())
+    elif name == 'nebula':
+        try:
+            from deepspeed.runtime.checkpoint_engine.nebula_checkpoint_engine import NebulaCheckpointEngine
+        except ImportError:
+            return None
+        nebula_config = SimpleNamespace(enable_nebula_load=True,
+                                        load_path=None,
+                                        persistent_storage_path=os.path.join(
+                                            args.save_dir,
+                                            'nebula'),
+                                        persistent_time_interval=100,
+                                        num_of_version_in_retention=2)
+        return NebulaCheckpointEngine(config_params=nebula_config)
+    raise ValueError(f'Unknown checkpoint engine {name}')
+
+
+def finish_save(checkpoint_engine):
+    """Blocks until the files of the last committed tag are on storage."""
+    if hasattr(checkpoint_engine, 'wait'):
+        checkpoint_engine.wait()
+
+
+def numel_bytes(obj):
+    if torch.is_tensor(obj):
+        return obj.numel() * obj.element_size()
+    elif isinstance(obj, dict):
+        return sum(numel_bytes(v) for v in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        return sum(numel_bytes(v) for v in obj)
+    return 0
+
+
+def reduce_results(byte_counts, maxima):
+    """Sums ``byte_counts`` over all ranks and takes the maximum of ``maxima``
+    (durations, peak RSS), since a checkpoint is only as fast as its slowest
+    rank."""
+    device = get_device()
+    totals = torch.tensor(byte_counts, dtype=torch.float64, device=device)
+    dist.all_reduce(totals)
+    slowest = torch.tensor(maxima, dtype=torch.float64, device=device)
+    dist.all_reduce(slowest, op=dist.ReduceOp.MAX)
+    return [int(t) for t in totals.tolist()], slowest.tolist()
+
+
+def cleanup(path):
+    dist.barrier()
+    if dist.get_rank() == 0 and os.path.isdir(path):
+        shutil.rmtree(path)
+    dist.barrier()
+
+
+def timed_save_load(args,
+                    engine_name,
+                    checkpoint_engine,
+                    ckpt_dir,
+                    save_fn,
+                    load_fn,
+                    step_fn,
+                    update_fn):
+    """Saves and loads a checkpoint ``args.trials`` times through
+    ``checkpoint_engine`` and prints the averaged results.
+
+    ``save_fn(checkpoint_engine, tag_dir)`` saves the files of this rank and
+    returns the number of bytes it saved, ``load_fn(checkpoint_engine,
+    tag_dir)`` returns the number of bytes it loaded and the loaded state,
+    ``step_fn(state)`` runs the first training step on the loaded state and
+    ``update_fn()`` modifies the states between two saves. Time-to-first-step
+    (TTFS) is measured from the start of the load to the end of the first
+    step, which accounts for lazily loaded (mmap) files.
+    """
+    results = []
+    for trial in range(args.warmups + args.trials):
+        tag = f'global_step{trial}'
+        tag_dir = os.path.join(ckpt_dir, tag)
+        os.makedirs(tag_dir, exist_ok=True)
+        update_fn()
+
+        sync_all()
+        reset_peak_rss()
+        start = time.perf_counter()
+        checkpoint_engine.create(tag)
+        save_bytes = save_fn(checkpoint_engine, tag_dir)
+        checkpoint_engine.commit(tag)
+        sync_all()
+        # engines that write in the background only block training until here
+        save_time = time.perf_counter() - start
+        save_rss = get_peak_rss()
+        finish_save(checkpoint_engine)
+
+        sync_all()
+        reset_peak_rss()
+        start = time.perf_counter()
+        load_bytes, state = load_fn(checkpoint_engine, tag_dir)
+        load_time = time.perf_counter() - start
+        step_fn(state)
+        sync_all()
+        ttfs = time.perf_counter() - start
+        load_rss = get_peak_rss()
+        del state
+
+        if trial >= args.warmups:
+            results.append(
+                reduce_results([save_bytes,
+                                load_bytes],
+                               [save_time,
+                                load_time,
+                                ttfs,
+                                save_rss,
+                                load_rss]))
+
+    (save_bytes, load_bytes), _ = results[-1]
+    maxima = [sum(r[1][i] for r in results) / len(results) for i in range(3)]
+    peaks = [max(r[1][i] for r in results) for i in range(3, 5)]
+    print_result(engine_name, save_bytes, load_bytes, *maxima, *peaks)
+    if not args.keep_checkpoints:
+        cleanup(ckpt_dir)
+
+
+def print_header(args, title):
+    header = f"\n---- Checkpoint {title} on {dist.get_world_size()} ranks ({args.params}M params, {args.dtype}) ---------------------------------------\n"
+    header += f"{'Engine':14s} {'Size':12s} {'Save (s)':10s} {'Save GB/s':10s} {'Load (s)':10s} {'Load GB/s':10s} {'TTFS (s)':10s} {'Save RSS':12s} {'Load RSS':12s}\n"
+    header += "-" * 112
+    print_rank_0(header)
+
+
+def print_result(engine_name,
+                 save_bytes,
+                 load_bytes,
+                 save_time,
+                 load_time,
+                 ttfs,
+                 save_rss,
+                 load_rss):
+    save_bw = save_bytes / save_time / 1e9
+    load_bw = load_bytes / load_time / 1e9
+    print_rank_0(
+        f"{engine_name:14s} {convert_size(save_bytes):12s} {save_time:<10.3f} {save_bw:<10.3f} {load_time:<10.3f} {load_bw:<10.3f} {ttfs:<10.3f} {convert_size(int(save_rss)):12s} {convert_size(int(load_rss)):12s}"
+    )
+
+
+# Helper function to pretty-print sizes
+def convert_size(size_bytes):
+    if size_bytes == 0:
+        return "0B"
+    size_name = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
+    i = int(math.floor(math.log(size_bytes, 1024)))
+    p = math.pow(1024, i)
+    s = round(size_bytes / p, 2)
+    return "%s %s" % (s, size_name[i])
+
+
+def benchmark_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--local_rank", type=int)
+    parser.add_argument("--trials",
+                        type=int,
+                        default=DEFAULT_TRIALS,
+                        help='Number of timed save/load iterations')
+    parser.add_argument("--warmups",
+                        type=int,
+                        default=DEFAULT_WARMUPS,
+                        help='Number of warmup (non-timed) iterations')
+    parser.add_argument("--params",
+                        type=int,
+                        default=DEFAULT_PARAMS,
+                        help='Number of model parameters, in millions')
+    parser.add_argument("--tensors",
+                        type=int,
+                        default=DEFAULT_TENSORS,
+                        help='Number of tensors the model parameters are split into')
+    parser.add_argument("--layers",
+                        type=int,
+                        default=DEFAULT_LAYERS,
+                        help='Number of pipeline layers')
+    parser.add_argument("--pipe-stages",
+                        type=int,
+                        default=1,
+                        help='Number of pipeline stages')
+    parser.add_argument("--dtype",
+                        type=str,
+                        default=DEFAULT_TYPE,
+                        help='PyTorch dtype of the model parameters')
+    parser.add_argument("--engines",
+                        type=str,
+                        nargs='+',
+                        default=DEFAULT_ENGINES,
+                        choices=ALL_ENGINES,
+                        help='Checkpoint engines to benchmark')
+    parser.add_argument("--zero-stages",
+                        type=int,
+                        nargs='+',
+                        default=ZERO_STAGES,
+                        choices=ZERO_STAGES,
+                        help='ZeRO checkpoint layouts to benchmark')
+    parser.add_argument("--mmap-format",
+                        action="store_true",
+                        help='Use the mmap file format for all engines')
+    parser.add_argument(
+        "--update-fraction",
+        type=float,
+        default=DEFAULT_UPDATE_FRACTION,
+        help='Fraction of the tensors modified between two saves (see incremental)')
+    parser.add_argument("--parallel-write",
+                        action="store_true",
+                        help='Spread pipeline layer files over data parallel ranks')
+    parser.add_argument("--save-dir",
+                        type=str,
+                        default=DEFAULT_SAVE_DIR,
+                        help='Directory the checkpoints are written to')
+    parser.add_argument("--keep-checkpoints",
+                        action="store_true",
+                        help='Do not delete the checkpoints after the benchmark')
+    parser.add_argument("--backend",
+                        type=str,
+                        default=None,
+                        help='Communication library to use')
+    parser.add_argument("--zero", action="store_true", help='Run ZeRO layouts')
+    parser.add_argument("--pipeline",
+                        action="store_true",
+                        help='Run pipeline per-layer files')
+    return parser
@@ -0,0 +1,168 @@
+from benchmarks.checkpoint.utils import *
+from benchmarks.checkpoint.constants import *
+
+from collections import OrderedDict
+from deepspeed.runtime.checkpoint_engine.broadcast_checkpoint_engine import BroadcastCheckpointEngine
+
+
+def model_file(tag_dir, stage):
+    if stage == 3:
+        return os.path.join(
+            tag_dir,
+            f'zero_pp_rank_{dist.get_rank()}_mp_rank_00_model_states.pt')
+    return os.path.join(tag_dir, 'mp_rank_00_model_states.pt')
+
+
+def optim_file(tag_dir):
+    return os.path.join(tag_dir,
+                        f'zero_pp_rank_{dist.get_rank()}_mp_rank_00_optim_states.pt')
+
+
+def create_zero_states(args, stage):
+    """Returns synthetic model and optimizer states laid out the way
+    ``DeepSpeedEngine`` saves them for ZeRO ``stage`` on this rank.
+
+    ZeRO-1/2 keep the full model on every rank and save it once, in the model
+    states file of rank 0. ZeRO-3 partitions the model, every rank saves its
+    own model states file holding empty placeholders. In both cases every
+    rank saves the fp32 partition it owns and its Adam moments.
+    """
+    device = get_device()
+    world_size = dist.get_world_size()
+    numel = args.params * 1000 * 1000
+    tensor_numel = numel // args.tensors
+    partition_numel = (numel + world_size - 1) // world_size
+
+    module = OrderedDict()
+    for i in range(args.tensors):
+        if stage == 3:
+            module[f'layers.{i}.weight'] = torch.empty(0, dtype=get_dtype(args))
+        else:
+            module[f'layers.{i}.weight'] = torch.randn(tensor_numel,
+                                                       dtype=get_dtype(args),
+                                                       device=device)
+    model_state = {
+        'module': module,
+        'buffer_names': [],
+        'dp_world_size': world_size,
+        'mp_world_size': 1,
+        'global_steps': 0
+    }
+
+    fp32_partition = torch.randn(partition_numel, dtype=torch.float32, device=device)
+    base_optimizer_state = {
+        'state': {
+            0: {
+                'step': 1,
+                'exp_avg': torch.zeros_like(fp32_partition),
+                'exp_avg_sq': torch.zeros_like(fp32_partition)
+            }
+        },
+        'param_groups': [{
+            'lr': 1e-3,
+            'betas': (0.9,
+                      0.999),
+            'eps': 1e-8,
+            'weight_decay': 0.0,
+            'params': [0]
+        }]
+    }
+    if stage == 3:
+        optimizer_state_dict = {
+            'optimizer_state_dict': base_optimizer_state,
+            'fp32_flat_groups': [fp32_partition]
+        }
+    else:
+        optimizer_state_dict = {
+            'base_optimizer_state': base_optimizer_state,
+            'single_partition_of_fp32_groups': [fp32_partition]
+        }
+    optimizer_state_dict.update({'zero_stage': stage, 'partition_count': world_size})
+    optim_state = {'optimizer_state_dict': optimizer_state_dict}
+    return model_state, optim_state
+
+
+def get_fp32_partition_and_state(optimizer_state_dict):
+    if 'fp32_flat_groups' in optimizer_state_dict:
+        return optimizer_state_dict['fp32_flat_groups'][
+            0], optimizer_state_dict['optimizer_state_dict']['state'][0]
+    return optimizer_state_dict['single_partition_of_fp32_groups'][
+        0], optimizer_state_dict['base_optimizer_state']['state'][0]
+
+
+def adam_first_step(model_state, optim_state):
+    """Moves the loaded states to the device and runs an Adam step on them,
+    so that TTFS includes whatever part of the load was deferred."""
+    device = get_device()
+    fp32_partition, state = get_fp32_partition_and_state(optim_state['optimizer_state_dict'])
+    fp32_partition = fp32_partition.to(device)
+    exp_avg = state['exp_avg'].to(device)
+    exp_avg_sq = state['exp_avg_sq'].to(device)
+    grad = fp32_partition * 1e-3
+    exp_avg.mul_(0.9).add_(grad, alpha=0.1)
+    exp_avg_sq.mul_(0.999).addcmul_(grad, grad, value=0.001)
+    fp32_partition.addcdiv_(exp_avg, exp_avg_sq.sqrt().add_(1e-8), value=-1e-3)
+    for tensor in model_state['module'].values():
+        tensor.to(device)
+
+
+def run_zero(args, stage):
+    model_state, optim_state = create_zero_states(args, stage)
+    fp32_partition, state = get_fp32_partition_and_state(optim_state['optimizer_state_dict'])
+    module_tensors = list(model_state['module'].values())
+    num_updated = int(len(module_tensors) * args.update_fraction)
+
+    def update():
+        if stage != 3:
+            for tensor in module_tensors[:num_updated]:
+                tensor.add_(1e-3)
+        for tensor in [fp32_partition, state['exp_avg'], state['exp_avg_sq']]:
+            tensor.add_(1e-3)
+
+    def save(checkpoint_engine, tag_dir):
+        nbytes = 0
+        if stage == 3 or dist.get_rank() == 0:
+            checkpoint_engine.save(model_state, model_file(tag_dir, stage))
+            nbytes += numel_bytes(model_state)
+        checkpoint_engine.save(optim_state, optim_file(tag_dir))
+        return nbytes + numel_bytes(optim_state)
+
+    def load(checkpoint_engine, tag_dir):
+        # only the model states of ZeRO-1/2 are identical on all ranks
+        local_engine = checkpoint_engine
+        if isinstance(checkpoint_engine, BroadcastCheckpointEngine):
+            local_engine = checkpoint_engine.checkpoint_engine
+            if stage == 3:
+                checkpoint_engine = local_engine
+        loaded_model_state = checkpoint_engine.load(model_file(tag_dir,
+                                                               stage),
+                                                    map_location='cpu')
+        loaded_optim_state = local_engine.load(optim_file(tag_dir), map_location='cpu')
+        nbytes = numel_bytes(loaded_model_state) + numel_bytes(loaded_optim_state)
+        return nbytes, (loaded_model_state, loaded_optim_state)
+
+    def first_step(states):
+        adam_first_step(*states)
+
+    print_header(args, f'save/load of ZeRO-{stage} states')
+    for engine_name in args.engines:
+        checkpoint_engine = create_checkpoint_engine(engine_name, args)
+        if checkpoint_engine is None:
+            print_rank_0(f"{engine_name:14s} skipped, dependencies are not installed")
+            continue
+        timed_save_load(args,
+                        engine_name,
+                        checkpoint_engine,
+                        os.path.join(args.save_dir,
+                                     f'zero{stage}_{engine_name}'),
+                        save,
+                        load,
+                        first_step,
+                        update)
+
+
+if __name__ == "__main__":
+    args = benchmark_parser().parse_args()
+    init_processes(args)
+    for stage in args.zero_stages:
+        run_zero(args, stage)
@@ -0,0 +1,96 @@
+import os
+import torch
+
+from deepspeed.utils import logger
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import load as load_checkpoint_file
+
+from .constants import CHECKPOINT_INDEX_FILE
+
+INDEX_VERSION = 2
+INDEX_VERSION_KEY = 'version'
+INDEX_ENTRIES_KEY = 'entries'
+
+ENTRY_SIZE_KEY = 'size'
+ENTRY_MTIME_KEY = 'mtime'
+ENTRY_VALUES_KEY = 'values'
+
+
+def load_cpu(file):
+    return load_checkpoint_file(file, map_location=torch.device('cpu'))
+
+
+def _contains_tensor(obj):
+    if torch.is_tensor(obj):
+        return True
+    elif isinstance(obj, dict):
+        return any(_contains_tensor(v) for v in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        return any(_contains_tensor(v) for v in obj)
+    return False
+
+
+class CheckpointIndex(object):
+    """Header-only index of the files of a checkpoint folder.
+
+    For every indexed file the index keeps the top-level entries that hold
+    no tensors (iteration, args, checkpoint_info, ...). An entry is built the first time a file is queried,
+    by loading it once, and is cached on disk in ``CHECKPOINT_INDEX_FILE``
+    next to the checkpoint. Entries are invalidated when the size or
+    modification time of their file changes.
+    """
+    def __init__(self, dir):
+        self.dir = dir
+        self.index_file = os.path.join(dir, CHECKPOINT_INDEX_FILE)
+        self.entries = self._load_index()
+
+    def _load_index(self):
+        if not os.path.isfile(self.index_file):
+            return {}
+        try:
+            index = torch.load(self.index_file)
+        except Exception as err:
+            logger.warning(
+                f'Ignoring unreadable checkpoint index {self.index_file}: {err}')
+            return {}
+        if index.get(INDEX_VERSION_KEY, None) != INDEX_VERSION:
+            return {}
+        return index[INDEX_ENTRIES_KEY]
+
+    def _save_index(self):
+        tmp_file = f'{self.index_file}.{os.getpid()}.tmp'
+        try:
+            index = {INDEX_VERSION_KEY: INDEX_VERSION, INDEX_ENTRIES_KEY: self.entries}
+            torch.save(index, tmp_file)
+            # atomic, several processes may index the same folder
+            os.replace(tmp_file, self.index_file)
+        except OSError as err:
+            logger.warning(f'Unable to save checkpoint index {self.index_file}: {err}')
+
+    def _file_key(self, file):
+        return os.path.relpath(file, self.dir)
+
+    def _is_valid(self, entry, file):
+        stat = os.stat(file)
+        return entry[ENTRY_SIZE_KEY] == stat.st_size and entry[
+            ENTRY_MTIME_KEY] == stat.st_mtime_ns
+
+    def _build_entry(self, file, sd):
+        stat = os.stat(file)
+        values = {key: value for key, value in sd.items() if not _contains_tensor(value)}
+        return {
+            ENTRY_SIZE_KEY: stat.st_size,
+            ENTRY_MTIME_KEY: stat.st_mtime_ns,
+            ENTRY_VALUES_KEY: values
+        }
+
+    def get_entry(self, file):
+        key = self._file_key(file)
+        entry = self.entries.get(key, None)
+        if entry is None or not self._is_valid(entry, file):
+            entry = self._build_entry(file, load_cpu(file))
+            self.entries[key] = entry
+            self._save_index()
+        return entry
+
+    def get_value(self, file, key, default=None):
+        return self.get_entry(file)[ENTRY_VALUES_KEY].get(key, default)
@@ -34,6 +34,7 @@ MODEL_FILE_SUFFIX = '_model_states.pt'
 LAYER_FILE_PREFIX = 'layer_'
 BF16_ZERO_FILE_PREFIX = 'bf16_' + ZERO_FILE_PREFIX
 FP16_ZERO_FILE_PREFIX = 'fp16_' + ZERO_FILE_PREFIX
+CHECKPOINT_INDEX_FILE = 'ds_checkpoint_index.pt'
 
 #########################################
 # Checkpoint utility keys
@@ -14,6 +14,7 @@ from .constants import (MODEL_FILE_PREFIX, LAYER_FILE_PREFIX)
 
 from .reshape_meg_2d import reshape_meg_2d_parallel, meg_2d_parallel_map
 from .zero_checkpoint import ZeROCheckpoint
+from .checkpoint_index import CheckpointIndex, load_cpu
 from .constants import *
 
 EMBEDDING_LAYER_INDEX = 0
@@ -40,6 +41,9 @@ class DeepSpeedCheckpoint(object):
         self.dir = dir
         self._validate_folder(dir)
 
+        # global state comes from a header-only index, tensors
+        # are only loaded when a state getter asks for them
+        self.index = CheckpointIndex(dir)
         self.zero_checkpoint = ZeROCheckpoint(dir)
 
         self.file_list = get_files(dir)
@@ -119,9 +123,10 @@ class DeepSpeedCheckpoint(object):
         self._dump_mapping(self.transformer_file_map, 'rank_to_tranformer_files')
 
     def _build_global_state(self):
-        sd = torch.load(self.mp_rank_files[0], map_location=torch.device('cpu'))
-        self.global_state[ITERATION_KEY] = sd.get(ITERATION_KEY, 0)
-        self.global_state[ARGS_KEY] = sd.get(ARGS_KEY, None)
+        mp_rank_file = self.mp_rank_files[0]
+        iteration = self.index.get_value(mp_rank_file, ITERATION_KEY, 0)
+        self.global_state[ITERATION_KEY] = iteration
+        self.global_state[ARGS_KEY] = self.index.get_value(mp_rank_file, ARGS_KEY, None)
 
     def get_zero_checkpoint_state(self, pp_index, tp_index, dp_index) -> dict:
         return self.zero_checkpoint.get_state_for_rank(pp_index=pp_index,
@@ -142,18 +147,16 @@ class DeepSpeedCheckpoint(object):
 
     def get_iteration(self):
         if not ITERATION_KEY in self.global_state:
-            sd = torch.load(self.mp_rank_files[0], map_location=torch.device('cpu'))
-            self.global_state[ITERATION_KEY] = sd.get(ITERATION_KEY, 0)
+            self.global_state[ITERATION_KEY] = self.index.get_value(
+                self.mp_rank_files[0],
+                ITERATION_KEY,
+                0)
 
         return self.global_state[ITERATION_KEY]
 
     def get_embedding_state(self, tp_index: int) -> Dict:
         assert tp_index in self.tp_to_embedding_map.keys()
-        sd_list = [
-            torch.load(fname,
-                       map_location=torch.device('cpu'))
-            for fname in self.tp_to_embedding_map[tp_index]
-        ]
+        sd_list = [load_cpu(fname) for fname in self.tp_to_embedding_map[tp_index]]
         sd = self._merge_state_dicts(sd_list)
         return sd
 
@@ -163,8 +166,7 @@ class DeepSpeedCheckpoint(object):
 
     def _get_checkpoint_value(self, key):
         if not key in self.global_state:
-            sd = torch.load(self.mp_rank_files[0], map_location=torch.device('cpu'))
-            self.global_state[key] = sd.get(key, None)
+            self.global_state[key] = self.index.get_value(self.mp_rank_files[0], key)
 
         return self.global_state[key]
 
@@ -178,10 +180,7 @@ class DeepSpeedCheckpoint(object):
         assert tp_index < self.tp_degree
         assert pp_index < self.pp_degree
         fname_list = self.get_2d_parallel_files(tp_index=tp_index, pp_index=pp_index)
-        sd_list = [
-            torch.load(fname,
-                       map_location=torch.device('cpu')) for fname in fname_list
-        ]
+        sd_list = [load_cpu(fname) for fname in fname_list]
 
         merged_sd = None
         for sd in sd_list:
@@ -197,10 +196,7 @@ class DeepSpeedCheckpoint(object):
         assert pp_index < self.pp_degree
         t_list = []
         for fname_list in self.transformer_file_map[(tp_index, pp_index)]:
-            sd_list = [
-                torch.load(fname,
-                           map_location=torch.device('cpu')) for fname in fname_list
-            ]
+            sd_list = [load_cpu(fname) for fname in fname_list]
             sd = self._merge_state_dicts(sd_list)
             t_list.append(sd)
         return t_list
@@ -211,8 +207,7 @@ class DeepSpeedCheckpoint(object):
 
     def get_final_norm_state(self, tp_index: int) -> Dict:
         assert tp_index in self.tp_to_final_norm_map.keys()
-        sd = torch.load(self.tp_to_final_norm_map[tp_index][0],
-                        map_location=torch.device('cpu'))
+        sd = load_cpu(self.tp_to_final_norm_map[tp_index][0])
         return sd
 
     def get_final_norm_files(self, tp_index: int) -> list:
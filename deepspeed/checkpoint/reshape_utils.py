@@ -1,7 +1,10 @@
 import os
 import torch
 from collections import OrderedDict
-from .constants import (ZERO_FILE_PREFIX, FP16_ZERO_FILE_PREFIX, BF16_ZERO_FILE_PREFIX)
+from .constants import (ZERO_FILE_PREFIX,
+                        FP16_ZERO_FILE_PREFIX,
+                        BF16_ZERO_FILE_PREFIX,
+                        CHECKPOINT_INDEX_FILE)
 
 
 def basic_folder_validation(dir):
@@ -29,6 +32,8 @@ def get_files(dir):
     file_list = []
     for root, _, files in os.walk(dir):
         for file in files:
+            if file.startswith(CHECKPOINT_INDEX_FILE):
+                continue
             file_list.append(os.path.join(root, file))
     return file_list
 
@@ -9,6 +9,8 @@ from .reshape_utils import (basic_folder_validation, get_zero_files, merge_state
 
 from .reshape_3d_utils import (model_3d_desc, get_model_3d_descriptor)
 
+from .checkpoint_index import load_cpu
+
 GROUP_STATE_KEY = 'state'
 
 
@@ -56,7 +58,7 @@ class ZeROCheckpoint(object):
         state_file_list = self.get_files_for_rank(pp_index, tp_index, dp_index)
         merged_sd = None
         for state_file in state_file_list:
-            sd = torch.load(state_file, map_location=torch.device('cpu'))
+            sd = load_cpu(state_file)
             for key in keys_to_ignore:
                 sd.pop(key, None)
 
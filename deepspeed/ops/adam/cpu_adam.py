@@ -118,6 +118,73 @@ class DeepSpeedCPUAdam(torch.optim.Optimizer):
         for group in self.param_groups:
             group.setdefault('amsgrad', False)
 
+    def _init_state(self, p, device):
+        state = self.state[p]
+        state['step'] = 0
+
+        #use full precision by default unless self.fp32_optimizer_states is off
+        state_dtype = torch.float if self.fp32_optimizer_states else p.dtype
+
+        # gradient momentums
+        state['exp_avg'] = torch.zeros_like(p.data, dtype=state_dtype, device=device)
+        #memory_format=torch.preserve_format)
+        # gradient variances
+        state['exp_avg_sq'] = torch.zeros_like(p.data, dtype=state_dtype, device=device)
+        #memory_format=torch.preserve_format)
+
+    @torch.no_grad()
+    def begin_slice_step(self, p):
+        """Starts a step of ``p`` that is applied slice by slice with
+        ``step_slice()``.
+
+        Returns:
+            step: the step count to pass to ``step_slice()``.
+        """
+        state = self.state[p]
+        if len(state) == 0:
+            self._init_state(p, torch.device('cpu'))
+        state['step'] += 1
+        return state['step']
+
+    @torch.no_grad()
+    def step_slice(self, p, group, step, offset, numel):
+        """Update elements ``[offset, offset + numel)`` of ``p`` with its
+        gradient. Slices of one step can be updated in any order and from any
+        thread, which lets ZeRO-Offload overlap the step with the next
+        forward pass.
+
+        Args:
+            p: the CPU parameter, its state must be started with
+                ``begin_slice_step()``.
+            group (dict): the hyperparameters of the step, e.g. a copy of the
+                param group of ``p``.
+            step (int): the step count returned by ``begin_slice_step()``.
+            offset (int): the first element of the slice.
+            numel (int): the number of elements of the slice.
+        """
+        state = self.state[p]
+        beta1, beta2 = group['betas']
+        self.ds_opt_adam.adam_update(self.opt_id,
+                                     step,
+                                     group['lr'],
+                                     beta1,
+                                     beta2,
+                                     group['eps'],
+                                     group['weight_decay'],
+                                     group['bias_correction'],
+                                     p.data.narrow(0,
+                                                   offset,
+                                                   numel),
+                                     p.grad.data.narrow(0,
+                                                        offset,
+                                                        numel),
+                                     state['exp_avg'].narrow(0,
+                                                             offset,
+                                                             numel),
+                                     state['exp_avg_sq'].narrow(0,
+                                                                offset,
+                                                                numel))
+
     @torch.no_grad()
     def step(self, closure=None, fp16_param_groups=None):
         """Update the model parameters.
@@ -166,21 +233,7 @@ class DeepSpeedCPUAdam(torch.optim.Optimizer):
                 # State initialization
                 if len(state) == 0:
                     #print(f'group {group_id} param {param_id} = {p.numel()}')
-                    state['step'] = 0
-
-                    #use full precision by default unless self.fp32_optimizer_states is off
-                    state_dtype = torch.float if self.fp32_optimizer_states else p.dtype
-
-                    # gradient momentums
-                    state['exp_avg'] = torch.zeros_like(p.data,
-                                                        dtype=state_dtype,
-                                                        device=device)
-                    #memory_format=torch.preserve_format)
-                    # gradient variances
-                    state['exp_avg_sq'] = torch.zeros_like(p.data,
-                                                           dtype=state_dtype,
-                                                           device=device)
-                    #memory_format=torch.preserve_format)
+                    self._init_state(p, device)
 
                 state['step'] += 1
                 beta1, beta2 = group['betas']
@@ -0,0 +1,143 @@
+import atexit
+import os
+import threading
+import torch
+from concurrent.futures import ThreadPoolExecutor
+
+from deepspeed.utils import logger, log_dist
+from deepspeed.accelerator import get_accelerator
+from deepspeed.runtime.checkpoint_engine.checkpoint_engine import \
+    CheckpointEngine
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import load
+from deepspeed.runtime.checkpoint_engine.mmap_checkpoint import save_mmap_checkpoint
+
+NUM_SNAPSHOT_BUFFERS = 2
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _call_after(future, callback):
+    future.result()
+    callback()
+
+
+class AsyncCheckpointEngine(CheckpointEngine):
+    """Checkpoint engine that overlaps serialization with training.
+
+    ``save()`` copies every tensor of the state dict into a reusable host
+    buffer (pinned when an accelerator is available) and returns
+    immediately. The files of a tag are written by a single background
+    writer thread once ``commit(tag)`` is called. Two buffer sets are kept,
+    so the snapshot of a new tag can be taken while the previous tag is
+    still being written; ``commit`` only blocks on that previous write.
+    Files are fsynced by the writer thread, ``on_persisted`` callbacks run
+    after the files of their tag are durable.
+    """
+    def __init__(self, config_params=None):
+        super().__init__(config_params)
+        self.mmap_format = config_params is not None and config_params.checkpoint_mmap_format
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="ds_ckpt_writer")
+        self._buffers = [dict() for _ in range(NUM_SNAPSHOT_BUFFERS)]
+        self._buffer_idx = 0
+        self._pending = []
+        self._in_flight = None
+        self._in_flight_tag = None
+        self._lock = threading.Lock()
+        self._pin = get_accelerator().is_available()
+        atexit.register(self.wait)
+
+    def create(self, tag):
+        log_dist(f"[Async] Checkpoint {tag} is begin to save!", ranks=[0])
+
+    def _snapshot(self, obj, key):
+        if isinstance(obj, torch.Size):
+            return obj
+        elif isinstance(obj, dict):
+            return {k: self._snapshot(v, f"{key}.{k}") for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [self._snapshot(e, f"{key}.{i}") for i, e in enumerate(obj)]
+        elif isinstance(obj, tuple):
+            return tuple(self._snapshot(e, f"{key}.{i}") for i, e in enumerate(obj))
+        elif isinstance(obj, torch.Tensor):
+            return self._copy_to_buffer(obj.detach(), key)
+        else:
+            return obj
+
+    def _copy_to_buffer(self, tensor, key):
+        buffers = self._buffers[self._buffer_idx]
+        buffer = buffers.get(key, None)
+        if buffer is None or buffer.shape != tensor.shape or buffer.dtype != tensor.dtype:
+            buffer = torch.empty(tensor.shape, dtype=tensor.dtype, device='cpu')
+            if self._pin:
+                buffer = get_accelerator().pin_memory(buffer)
+            buffers[key] = buffer
+        buffer.copy_(tensor, non_blocking=self._pin)
+        return buffer
+
+    def save(self, state_dict, path: str):
+        logger.info(f"[Async] Snapshotting {path}...")
+        # the files of a tag are named alike in every tag, keying the
+        # buffers by file name lets each tag reuse them
+        snapshot = self._snapshot(state_dict, os.path.basename(path))
+        self._pending.append((snapshot, path))
+        return None
+
+    def load(self, path: str, map_location=None):
+        # A checkpoint may be loaded right after it was saved.
+        self.wait()
+        logger.info(f"[Async] Loading checkpoint from {path}...")
+        partition = load(path, map_location=map_location)
+        logger.info(f"[Async] Loaded checkpoint from {path}.")
+        return partition
+
+    def _write(self, files, tag):
+        for state_dict, path in files:
+            logger.info(f"[Async] Saving {path}...")
+            if self.mmap_format:
+                save_mmap_checkpoint(state_dict, path)
+            else:
+                torch.save(state_dict, path)
+            _fsync(path)
+            logger.info(f"[Async] Saved {path}.")
+        logger.info(f"[Async] Checkpoint {tag} is ready now!")
+
+    def commit(self, tag):
+        # Non-blocking copies into pinned memory must land before the
+        # writer thread reads the buffers.
+        if self._pin:
+            get_accelerator().synchronize()
+        self.wait()
+        with self._lock:
+            files, self._pending = self._pending, []
+            self._in_flight = self._executor.submit(self._write, files, tag)
+            self._in_flight_tag = tag
+            self._buffer_idx = (self._buffer_idx + 1) % NUM_SNAPSHOT_BUFFERS
+        return True
+
+    def on_persisted(self, tag, callback):
+        with self._lock:
+            in_flight = self._in_flight if self._in_flight_tag == tag else None
+            if in_flight is not None:
+                # the single writer thread runs it after the write, it is
+                # skipped if the write failed
+                self._in_flight = self._executor.submit(_call_after, in_flight, callback)
+        if in_flight is None:
+            # not committed or already persisted
+            callback()
+
+    def wait(self):
+        """Block until the in-flight checkpoint, if any, is on disk."""
+        with self._lock:
+            in_flight, tag = self._in_flight, self._in_flight_tag
+            self._in_flight = None
+            self._in_flight_tag = None
+        if in_flight is not None:
+            in_flight.result()
+            log_dist(f"[Async] Checkpoint {tag} is persisted.", ranks=[0])
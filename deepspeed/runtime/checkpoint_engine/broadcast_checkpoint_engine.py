@@ -0,0 +1,113 @@
+import io
+import pickle
+import torch
+
+from deepspeed import comm as dist
+from deepspeed.utils import logger
+from deepspeed.runtime.checkpoint_engine.checkpoint_engine import \
+    CheckpointEngine
+from deepspeed.runtime.checkpoint_engine.mmap_checkpoint import \
+    TensorExtractingPickler, TensorInjectingUnpickler
+
+BROADCAST_BUCKET_NUMEL = 256 * 1024 * 1024
+
+
+def _wait(handle):
+    # broadcast is asynchronous by default on some accelerators
+    if handle is not None:
+        handle.wait()
+
+
+class BroadcastCheckpointEngine(CheckpointEngine):
+    """Loads files that are identical across a process group only once.
+
+    The first rank of ``group`` loads the file through ``checkpoint_engine``
+    and broadcasts it. The non-tensor part of the state dict is sent as a
+    pickled skeleton, the tensors are sent in flat, per-dtype buckets. Every
+    rank of ``group`` must call ``load()`` for the same files in the same
+    order. Saving is delegated to ``checkpoint_engine``.
+    """
+    def __init__(self,
+                 checkpoint_engine,
+                 group,
+                 device,
+                 bucket_numel=BROADCAST_BUCKET_NUMEL):
+        super().__init__()
+        self.checkpoint_engine = checkpoint_engine
+        self.group = group
+        self.device = device
+        self.bucket_numel = bucket_numel
+        self.src_rank = dist.get_global_rank(group, 0)
+
+    def create(self, tag):
+        return self.checkpoint_engine.create(tag)
+
+    def save(self, state_dict, path: str):
+        return self.checkpoint_engine.save(state_dict, path)
+
+    def commit(self, tag):
+        return self.checkpoint_engine.commit(tag)
+
+    def _broadcast_bytes(self, data=None):
+        length = torch.tensor([0 if data is None else len(data)],
+                              dtype=torch.long,
+                              device=self.device)
+        _wait(dist.broadcast(length, self.src_rank, group=self.group))
+        if data is None:
+            buffer = torch.empty(length.item(), dtype=torch.uint8, device=self.device)
+        else:
+            buffer = torch.frombuffer(bytearray(data), dtype=torch.uint8).to(self.device)
+        _wait(dist.broadcast(buffer, self.src_rank, group=self.group))
+        return buffer.cpu().numpy().tobytes()
+
+    def _buckets(self, tensor_meta):
+        # consecutive tensors of the same dtype share a flat bucket
+        bucket = []
+        bucket_numel = 0
+        for index, (dtype, shape) in enumerate(tensor_meta):
+            numel = shape.numel()
+            if bucket and (tensor_meta[bucket[0]][0] != dtype
+                           or bucket_numel + numel > self.bucket_numel):
+                yield bucket
+                bucket = []
+                bucket_numel = 0
+            bucket.append(index)
+            bucket_numel += numel
+        if bucket:
+            yield bucket
+
+    def _broadcast_tensors(self, tensor_meta, tensors=None):
+        received = [None] * len(tensor_meta)
+        for bucket in self._buckets(tensor_meta):
+            dtype = tensor_meta[bucket[0]][0]
+            numels = [tensor_meta[i][1].numel() for i in bucket]
+            if tensors is None:
+                flat = torch.empty(sum(numels), dtype=dtype, device=self.device)
+            else:
+                flat = torch.cat([tensors[i].reshape(-1) for i in bucket])
+                flat = flat.to(self.device)
+            _wait(dist.broadcast(flat, self.src_rank, group=self.group))
+            if tensors is None:
+                flat = flat.cpu()
+                offset = 0
+                for i, numel in zip(bucket, numels):
+                    received[i] = flat.narrow(0, offset, numel).view(tensor_meta[i][1])
+                    offset += numel
+        return received
+
+    def load(self, path: str, map_location=None):
+        if dist.get_rank() == self.src_rank:
+            state_dict = self.checkpoint_engine.load(path, map_location=map_location)
+            skeleton = io.BytesIO()
+            pickler = TensorExtractingPickler(skeleton)
+            pickler.dump(state_dict)
+            tensor_meta = [(t.dtype, t.shape) for t in pickler.tensors]
+            self._broadcast_bytes(pickle.dumps((skeleton.getvalue(), tensor_meta)))
+            self._broadcast_tensors(tensor_meta, pickler.tensors)
+            logger.info(f"[Broadcast] Loaded and broadcast checkpoint {path}.")
+            return state_dict
+
+        skeleton, tensor_meta = pickle.loads(self._broadcast_bytes())
+        tensors = self._broadcast_tensors(tensor_meta)
+        logger.info(f"[Broadcast] Received checkpoint {path} from rank {self.src_rank}.")
+        return TensorInjectingUnpickler(io.BytesIO(skeleton), tensors).load()
@@ -1,5 +1,11 @@
+import os
+
+
 class CheckpointEngine(object):
 
+    # whether save/load may be called from several threads at once
+    thread_safe = False
+
     # init checkpoint engine for save/load
     def __init__(self, config_params=None):
         pass
@@ -14,6 +20,14 @@ class CheckpointEngine(object):
     def load(self, path: str, map_location=None):
         pass
 
+    def get_size(self, path: str):
+        # size in bytes of a saved file, 0 if unknown.
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
     def commit(self, tag):
         # to tell checkpoint services if all files are readys.
         pass
+
+    def on_persisted(self, tag, callback):
+        # call callback once the committed files of tag are on persistent storage.
+        callback()
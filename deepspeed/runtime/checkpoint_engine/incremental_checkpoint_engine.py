@@ -0,0 +1,94 @@
+import os
+import copy
+import hashlib
+import torch
+
+from deepspeed.utils import logger, log_dist
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import \
+    TorchCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.tensor_reference import make_tensor_reference
+
+FINGERPRINT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _get_tag_from_path(path):
+    return os.path.basename(os.path.dirname(path))
+
+
+def tensor_fingerprint(tensor):
+    """Hash of the raw tensor bytes, computed chunk by chunk to bound host memory."""
+    tensor = tensor.detach()
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{tensor.dtype}{tuple(tensor.shape)}".encode())
+    if tensor.numel() > 0:
+        data = tensor.contiguous().reshape(-1).view(torch.uint8)
+        for start in range(0, data.numel(), FINGERPRINT_CHUNK_BYTES):
+            chunk = data[start:start + FINGERPRINT_CHUNK_BYTES].cpu()
+            hasher.update(chunk.numpy().tobytes())
+    return hasher.hexdigest()
+
+
+class IncrementalCheckpointEngine(TorchCheckpointEngine):
+    """Checkpoint engine writing only tensors changed since the last committed tag.
+
+    Every tensor is fingerprinted on ``save()``. A tensor whose fingerprint
+    matches the one recorded for the same file and key at the last committed
+    tag is replaced by a reference to the tag that holds its data. References
+    are resolved transparently by ``TorchCheckpointEngine.load``, so the
+    referenced tags must be kept as long as newer tags point into them.
+    """
+    # fingerprints are recorded per save
+    thread_safe = False
+
+    def __init__(self, config_params=None):
+        super().__init__(config_params)
+        # file name -> {key path: (fingerprint, tag holding the data)}
+        self.committed_fingerprints = {}
+        self.pending_fingerprints = {}
+
+    def create(self, tag):
+        log_dist(f"[Incremental] Checkpoint {tag} is begin to save!", ranks=[0])
+
+    def save(self, state_dict, path: str):
+        tag = _get_tag_from_path(path)
+        file_name = os.path.basename(path)
+        committed = self.committed_fingerprints.get(file_name, {})
+        fingerprints = {}
+        stats = {"written": 0, "skipped": 0}
+
+        def replace_unchanged(obj, key_path):
+            if isinstance(obj, torch.Size):
+                return obj
+            elif isinstance(obj, dict):
+                # Shallow copy keeps the dict type and its attributes (e.g. _metadata)
+                replaced = copy.copy(obj)
+                for k, v in obj.items():
+                    replaced[k] = replace_unchanged(v, key_path + (k, ))
+                return replaced
+            elif isinstance(obj, list):
+                replaced = []
+                for i, e in enumerate(obj):
+                    replaced.append(replace_unchanged(e, key_path + (i, )))
+                return replaced
+            elif isinstance(obj, torch.Tensor):
+                fingerprint = tensor_fingerprint(obj)
+                previous = committed.get(key_path, None)
+                if previous is not None and previous[0] == fingerprint:
+                    fingerprints[key_path] = previous
+                    stats["skipped"] += 1
+                    return make_tensor_reference(previous[1], key_path)
+                fingerprints[key_path] = (fingerprint, tag)
+                stats["written"] += 1
+            return obj
+
+        state_dict = replace_unchanged(state_dict, ())
+        self.pending_fingerprints[file_name] = fingerprints
+        logger.info(
+            f"[Incremental] {path}: writing {stats['written']} tensors, "
+            f"referencing {stats['skipped']} unchanged tensors from earlier tags")
+        return super().save(state_dict, path)
+
+    def commit(self, tag):
+        self.committed_fingerprints.update(self.pending_fingerprints)
+        self.pending_fingerprints = {}
+        return super().commit(tag)
@@ -0,0 +1,230 @@
+"""
+Flat, memory-mappable checkpoint layout.
+
+A checkpoint file has the following layout:
+
+    | magic | header length (u64) | JSON header | skeleton | padding | storage data |
+
+The JSON header describes every storage (location, offset and size relative to
+the start of the aligned storage data) and every tensor as a view of one of
+them (storage index, dtype, shape, stride and storage offset), so tensors that
+share a storage on save share it on load, like with ``torch.save``. The
+skeleton is the pickled state dict with each tensor replaced by a reference
+into the tensor table, so only the (small) non-tensor part goes through
+pickle. On load the file is mmap'ed and CPU tensors are returned as views
+into the mapping, so no copy of the storage data is made until a page is
+touched.
+"""
+
+import io
+import json
+import mmap
+import pickle
+import struct
+import torch
+
+MMAP_CHECKPOINT_MAGIC = b"DSMMAP01"
+MMAP_CHECKPOINT_VERSION = 2
+MMAP_CHECKPOINT_ALIGNMENT = 64
+
+_HEADER_LEN_FORMAT = "<Q"
+_PREAMBLE_SIZE = len(MMAP_CHECKPOINT_MAGIC) + struct.calcsize(_HEADER_LEN_FORMAT)
+
+
+def _align(offset, alignment=MMAP_CHECKPOINT_ALIGNMENT):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _dtype_to_str(dtype):
+    return str(dtype).replace("torch.", "")
+
+
+def _str_to_dtype(name):
+    return getattr(torch, name)
+
+
+def _untyped_storage(tensor):
+    if hasattr(tensor, "untyped_storage"):
+        return tensor.untyped_storage()
+    return tensor.storage()._untyped()
+
+
+def _storage_bytes(storage):
+    data = torch.empty(0, dtype=torch.uint8, device=storage.device).set_(storage)
+    return data.cpu().numpy().tobytes()
+
+
+def _location(storage):
+    return str(storage.device)
+
+
+class TensorExtractingPickler(pickle.Pickler):
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.tensors = []
+
+    def persistent_id(self, obj):
+        if isinstance(obj, torch.Tensor):
+            self.tensors.append(obj)
+            return ("tensor", len(self.tensors) - 1)
+        return None
+
+
+class TensorInjectingUnpickler(pickle.Unpickler):
+    def __init__(self, file, tensors):
+        super().__init__(file)
+        self.tensors = tensors
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        assert kind == "tensor", f"Unknown persistent id {pid} in mmap checkpoint"
+        return self.tensors[index]
+
+
+def is_mmap_checkpoint(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MMAP_CHECKPOINT_MAGIC)) == MMAP_CHECKPOINT_MAGIC
+    except OSError:
+        return False
+
+
+def save_mmap_checkpoint(state_dict, path):
+    skeleton_buffer = io.BytesIO()
+    pickler = TensorExtractingPickler(skeleton_buffer)
+    pickler.dump(state_dict)
+    skeleton = skeleton_buffer.getvalue()
+
+    storages = []
+    storage_table = []
+    storage_index = {}
+    tensor_table = []
+    offset = 0
+    for tensor in pickler.tensors:
+        storage = _untyped_storage(tensor.detach())
+        key = (storage.device, storage.data_ptr(), storage.nbytes())
+        # zero sized storages may share a null pointer without aliasing
+        if key not in storage_index or storage.nbytes() == 0:
+            storage_index[key] = len(storages)
+            storages.append(storage)
+            storage_table.append({
+                "location": _location(storage),
+                "offset": offset,
+                "nbytes": storage.nbytes()
+            })
+            offset = _align(offset + storage.nbytes())
+        tensor_table.append({
+            "storage": storage_index[key],
+            "dtype": _dtype_to_str(tensor.dtype),
+            "shape": list(tensor.shape),
+            "stride": list(tensor.stride()),
+            "storage_offset": tensor.storage_offset()
+        })
+
+    header = json.dumps({
+        "version": MMAP_CHECKPOINT_VERSION,
+        "alignment": MMAP_CHECKPOINT_ALIGNMENT,
+        "skeleton_nbytes": len(skeleton),
+        "storages": storage_table,
+        "tensors": tensor_table
+    }).encode("utf-8")
+
+    data_start = _align(_PREAMBLE_SIZE + len(header) + len(skeleton))
+    with open(path, "wb") as f:
+        f.write(MMAP_CHECKPOINT_MAGIC)
+        f.write(struct.pack(_HEADER_LEN_FORMAT, len(header)))
+        f.write(header)
+        f.write(skeleton)
+        for storage, entry in zip(storages, storage_table):
+            f.seek(data_start + entry["offset"])
+            f.write(_storage_bytes(storage))
+
+
+def read_mmap_checkpoint_header(path):
+    with open(path, "rb") as f:
+        magic = f.read(len(MMAP_CHECKPOINT_MAGIC))
+        assert magic == MMAP_CHECKPOINT_MAGIC, f"{path} is not an mmap checkpoint"
+        header_len, = struct.unpack(_HEADER_LEN_FORMAT,
+                                    f.read(struct.calcsize(_HEADER_LEN_FORMAT)))
+        return json.loads(f.read(header_len).decode("utf-8")), _PREAMBLE_SIZE + header_len
+
+
+def _upgrade_header(header):
+    # version 1 stored every tensor contiguously in its own storage
+    if header["version"] == 1:
+        header["storages"] = []
+        for index, entry in enumerate(header["tensors"]):
+            header["storages"].append({
+                "location": "cpu",
+                "offset": entry["offset"],
+                "nbytes": entry["nbytes"]
+            })
+            stride = []
+            numel = 1
+            for dim in reversed(entry["shape"]):
+                stride.insert(0, numel)
+                numel *= dim
+            entry.update({"storage": index, "stride": stride, "storage_offset": 0})
+    return header
+
+
+def _map_storage(storage, location, map_location):
+    """Applies ``map_location`` like ``torch.load`` to a CPU storage that was
+    saved at ``location``."""
+    if map_location is None:
+        target = location
+    elif isinstance(map_location, (str, torch.device)):
+        target = str(map_location)
+    elif isinstance(map_location, dict):
+        target = str(map_location.get(location, location))
+    elif callable(map_location):
+        mapped = map_location(storage, location)
+        if mapped is None:
+            return storage
+        # typed storages wrap the untyped storage the tensors are built on
+        return getattr(mapped, "_untyped_storage", mapped)
+    else:
+        raise TypeError(f"Unsupported map_location {map_location!r}")
+    if target == "cpu":
+        return storage
+    data = torch.empty(0, dtype=torch.uint8).set_(storage)
+    return _untyped_storage(data.to(target))
+
+
+def load_mmap_checkpoint(path, map_location=None):
+    header, skeleton_start = read_mmap_checkpoint_header(path)
+    header = _upgrade_header(header)
+    skeleton_end = skeleton_start + header["skeleton_nbytes"]
+    data_start = _align(skeleton_end, header["alignment"])
+
+    with open(path, "rb") as f:
+        # ACCESS_COPY gives writable, copy-on-write views: in-place updates
+        # of loaded tensors never reach the file.
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    storages = []
+    for entry in header["storages"]:
+        if entry["nbytes"] == 0:
+            data = torch.empty(0, dtype=torch.uint8)
+        else:
+            data = torch.frombuffer(mm,
+                                    dtype=torch.uint8,
+                                    count=entry["nbytes"],
+                                    offset=data_start + entry["offset"])
+        storage = _untyped_storage(data)
+        storages.append(_map_storage(storage, entry["location"], map_location))
+
+    tensors = []
+    for entry in header["tensors"]:
+        storage = storages[entry["storage"]]
+        tensor = torch.empty(0,
+                             dtype=_str_to_dtype(entry["dtype"]),
+                             device=storage.device).set_(storage,
+                                                         entry["storage_offset"],
+                                                         entry["shape"],
+                                                         entry["stride"])
+        tensors.append(tensor)
+
+    unpickler = TensorInjectingUnpickler(io.BytesIO(mm[skeleton_start:skeleton_end]),
+                                         tensors)
+    return unpickler.load()
@@ -0,0 +1,312 @@
+import fnmatch
+import glob
+import os
+import pickle
+import shutil
+import torch
+
+from deepspeed import comm as dist
+from deepspeed.utils import logger, log_dist
+from deepspeed.utils.groups import _get_local_world_size
+from deepspeed.runtime.checkpoint_engine.checkpoint_engine import \
+    CheckpointEngine
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import load
+from deepspeed.runtime.checkpoint_engine.mmap_checkpoint import save_mmap_checkpoint
+
+PEER_MEMORY_CHUNK_BYTES = 256 * 1024 * 1024
+PARTIAL_TAG_SUFFIX = ".partial"
+
+
+def _get_tag_from_path(path):
+    return os.path.basename(os.path.dirname(path))
+
+
+def _wait(handles):
+    for handle in handles:
+        if handle is not None:
+            handle.wait()
+
+
+class PeerMemoryCheckpointEngine(CheckpointEngine):
+    """Keeps the latest checkpoint in host memory on this rank and on a
+    buddy rank of the next node.
+
+    Every rank writes the files it saves into ``memory_dir``, which should be
+    a RAM backed file system such as ``/dev/shm`` so that it outlives the
+    training process, and ``commit()`` sends them to its buddy rank
+    ``(rank + local_world_size) % world_size``. Only every
+    ``persist_interval``-th checkpoint is also saved through
+    ``checkpoint_engine``.
+
+    After a failure, ``restore(tag)`` must be called by all ranks before
+    loading. Ranks of a replaced node get their files back from their buddy,
+    then ``load()`` reads the files of this rank from memory and falls back
+    to ``checkpoint_engine`` for all other files. ``on_persisted`` callbacks,
+    e.g. writing ``latest``, only run for the tags that are persisted.
+    """
+    def __init__(self,
+                 checkpoint_engine,
+                 persist_interval,
+                 memory_dir,
+                 device,
+                 chunk_bytes=PEER_MEMORY_CHUNK_BYTES):
+        super().__init__()
+        self.checkpoint_engine = checkpoint_engine
+        self.thread_safe = checkpoint_engine.thread_safe
+        self.persist_interval = persist_interval
+        self.device = device
+        self.chunk_bytes = chunk_bytes
+
+        self.rank = dist.get_rank()
+        self.world_size = dist.get_world_size()
+        local_world_size = _get_local_world_size()
+        self.buddy_rank = (self.rank + local_world_size) % self.world_size
+        self.ward_rank = (self.rank - local_world_size) % self.world_size
+        self.replicate = self.buddy_rank != self.rank
+        if not self.replicate:
+            log_dist(
+                "[PeerMemory] All ranks run on a single node, in-memory checkpoints are "
+                "not replicated and only survive process restarts.",
+                ranks=[0])
+
+        self.own_dir = os.path.join(memory_dir, f"rank_{self.rank:05d}")
+        self.replica_dir = os.path.join(memory_dir,
+                                        f"replica_of_rank_{self.ward_rank:05d}")
+        self.num_commits = 0
+        self.persist = False
+        self.persisted_tag = None
+
+    def _memory_path(self, path):
+        return os.path.join(self.own_dir,
+                            _get_tag_from_path(path) + PARTIAL_TAG_SUFFIX,
+                            os.path.basename(path))
+
+    def create(self, tag):
+        self.persist = (self.num_commits + 1) % self.persist_interval == 0
+        partial_dir = os.path.join(self.own_dir, tag + PARTIAL_TAG_SUFFIX)
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        if self.persist:
+            self.checkpoint_engine.create(tag)
+        log_dist(f"[PeerMemory] Checkpoint {tag} is begin to save!", ranks=[0])
+
+    def save(self, state_dict, path: str):
+        memory_path = self._memory_path(path)
+        os.makedirs(os.path.dirname(memory_path), exist_ok=True)
+        save_mmap_checkpoint(state_dict, memory_path)
+        if self.persist:
+            self.checkpoint_engine.save(state_dict, path)
+        return None
+
+    def load(self, path: str, map_location=None):
+        memory_path = os.path.join(self.own_dir,
+                                   _get_tag_from_path(path),
+                                   os.path.basename(path))
+        if os.path.isfile(memory_path):
+            logger.info(f"[PeerMemory] Loading {path} from memory...")
+            return load(memory_path, map_location=map_location)
+        return self.checkpoint_engine.load(path, map_location=map_location)
+
+    def get_size(self, path: str):
+        memory_path = os.path.join(self.own_dir,
+                                   _get_tag_from_path(path),
+                                   os.path.basename(path))
+        if os.path.isfile(memory_path):
+            return os.path.getsize(memory_path)
+        return self.checkpoint_engine.get_size(path)
+
+    def commit(self, tag):
+        # ranks that saved no file still publish an empty tag
+        os.makedirs(os.path.join(self.own_dir, tag + PARTIAL_TAG_SUFFIX), exist_ok=True)
+        self._publish(self.own_dir, tag)
+        if self.replicate:
+            self._transfer(send_dir=os.path.join(self.own_dir,
+                                                 tag),
+                           send_rank=self.buddy_rank,
+                           recv_dir=os.path.join(self.replica_dir,
+                                                 tag + PARTIAL_TAG_SUFFIX),
+                           recv_rank=self.ward_rank)
+            self._publish(self.replica_dir, tag)
+        self.num_commits += 1
+        if self.persist:
+            self.checkpoint_engine.commit(tag)
+            self.persisted_tag = tag
+        log_dist(
+            f"[PeerMemory] Checkpoint {tag} is in memory{' and persisted' if self.persist else ''}.",
+            ranks=[0])
+        return True
+
+    def on_persisted(self, tag, callback):
+        if tag == self.persisted_tag:
+            self.checkpoint_engine.on_persisted(tag, callback)
+
+    def latest_tag(self):
+        """Collectively returns the tag held in memory, or None if the ranks
+        hold different tags, e.g. after a failure during a commit."""
+        tags = set()
+        for root in [self.own_dir, self.replica_dir]:
+            if os.path.isdir(root):
+                tags.update(name for name in os.listdir(root)
+                            if not name.endswith(PARTIAL_TAG_SUFFIX))
+        all_tags = set()
+        for rank_tags in self._all_gather_bytes(pickle.dumps(sorted(tags))):
+            all_tags.update(pickle.loads(rank_tags))
+        return all_tags.pop() if len(all_tags) == 1 else None
+
+    def glob(self, pattern):
+        """Collectively returns the paths matching ``pattern`` on persistent
+        storage or in the memory of any rank. The files of a tag are only held
+        by the ranks that saved them, e.g. the model states files by the first
+        data parallel rank."""
+        tag_dir = os.path.join(self.own_dir, _get_tag_from_path(pattern))
+        names = sorted(os.listdir(tag_dir)) if os.path.isdir(tag_dir) else []
+        paths = set(glob.glob(pattern))
+        for rank_names in self._all_gather_bytes(pickle.dumps(names)):
+            paths.update(
+                os.path.join(os.path.dirname(pattern),
+                             name) for name in pickle.loads(rank_names)
+                if fnmatch.fnmatch(name,
+                                   os.path.basename(pattern)))
+        return sorted(paths)
+
+    def restore(self, tag):
+        """Collectively brings the files of ``tag`` back into the memory of
+        every rank. Returns True if all ranks can load ``tag`` from memory."""
+        has_own = os.path.isdir(os.path.join(self.own_dir, tag))
+        has_replica = self.replicate and os.path.isdir(
+            os.path.join(self.replica_dir,
+                         tag))
+        # [own copy of every rank, replica of every rank held by its buddy]
+        available = torch.zeros(2 * self.world_size,
+                                dtype=torch.int32,
+                                device=self.device)
+        available[self.rank] = int(has_own)
+        available[self.world_size + self.ward_rank] = int(has_replica)
+        dist.all_reduce(available)
+        available = available.tolist()
+        own, replica = available[:self.world_size], available[self.world_size:]
+
+        recv = not own[self.rank] and replica[self.rank]
+        send = has_replica and not own[self.ward_rank]
+        if send or recv:
+            send_dir = os.path.join(self.replica_dir, tag) if send else None
+            recv_dir = os.path.join(self.own_dir,
+                                    tag + PARTIAL_TAG_SUFFIX) if recv else None
+            self._transfer(send_dir=send_dir,
+                           send_rank=self.ward_rank,
+                           recv_dir=recv_dir,
+                           recv_rank=self.buddy_rank)
+            if recv:
+                self._publish(self.own_dir, tag)
+                logger.info(f"[PeerMemory] Restored checkpoint {tag} "
+                            f"from rank {self.buddy_rank}.")
+
+        restored = all(o or r for o, r in zip(own, replica))
+        if not restored:
+            log_dist(
+                f"[PeerMemory] Checkpoint {tag} is not in memory on all ranks, "
+                "loading the missing files from persistent storage.",
+                ranks=[0])
+        return restored
+
+    def _publish(self, root, tag):
+        # a tag only becomes visible once all of its files are written, older
+        # tags are dropped to bound the memory used
+        partial_dir = os.path.join(root, tag + PARTIAL_TAG_SUFFIX)
+        tag_dir = os.path.join(root, tag)
+        shutil.rmtree(tag_dir, ignore_errors=True)
+        os.replace(partial_dir, tag_dir)
+        for name in os.listdir(root):
+            if name != tag:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    def _all_gather_bytes(self, data):
+        length = torch.tensor([len(data)], dtype=torch.long, device=self.device)
+        lengths = [torch.zeros_like(length) for _ in range(self.world_size)]
+        dist.all_gather(lengths, length)
+        lengths = [length.item() for length in lengths]
+        buffer = torch.zeros(max(lengths), dtype=torch.uint8, device=self.device)
+        buffer[:len(data)].copy_(torch.frombuffer(bytearray(data), dtype=torch.uint8))
+        buffers = [torch.empty_like(buffer) for _ in range(self.world_size)]
+        dist.all_gather(buffers, buffer)
+        return [
+            buffer[:length].cpu().numpy().tobytes() for buffer,
+            length in zip(buffers,
+                          lengths)
+        ]
+
+    def _exchange_bytes(self, data, send_rank, recv_rank):
+        # data is None when nothing is sent, nothing is received if recv_rank is None
+        handles = []
+        if data is not None:
+            send_length = torch.tensor([len(data)], dtype=torch.long, device=self.device)
+            handles.append(dist.isend(send_length, send_rank))
+        if recv_rank is not None:
+            recv_length = torch.zeros(1, dtype=torch.long, device=self.device)
+            handles.append(dist.irecv(recv_length, recv_rank))
+        _wait(handles)
+
+        handles = []
+        if data is not None:
+            send_buffer = torch.frombuffer(bytearray(data),
+                                           dtype=torch.uint8).to(self.device)
+            handles.append(dist.isend(send_buffer, send_rank))
+        if recv_rank is not None:
+            recv_buffer = torch.empty(recv_length.item(),
+                                      dtype=torch.uint8,
+                                      device=self.device)
+            handles.append(dist.irecv(recv_buffer, recv_rank))
+        _wait(handles)
+        return recv_buffer.cpu().numpy().tobytes() if recv_rank is not None else None
+
+    def _chunks(self, files):
+        for name, size in files:
+            for offset in range(0, size, self.chunk_bytes):
+                yield name, offset, min(self.chunk_bytes, size - offset)
+
+    def _transfer(self, send_dir, send_rank, recv_dir, recv_rank):
+        """Sends the files of ``send_dir`` to ``send_rank`` while receiving
+        the files of ``recv_rank`` into ``recv_dir``, in chunks of at most
+        ``chunk_bytes``. Either direction may be None."""
+        send_files = None
+        if send_dir is not None:
+            send_files = [(name,
+                           os.path.getsize(os.path.join(send_dir,
+                                                        name)))
+                          for name in sorted(os.listdir(send_dir))]
+        recv_files = self._exchange_bytes(
+            pickle.dumps(send_files) if send_dir is not None else None,
+            send_rank,
+            recv_rank if recv_dir is not None else None)
+        recv_files = pickle.loads(recv_files) if recv_dir is not None else []
+        if recv_dir is not None:
+            shutil.rmtree(recv_dir, ignore_errors=True)
+            os.makedirs(recv_dir)
+
+        send_chunks = list(self._chunks(send_files or []))
+        recv_chunks = list(self._chunks(recv_files))
+        # sends and receives advance in lock step, each step waits for both
+        for step in range(max(len(send_chunks), len(recv_chunks))):
+            handles = []
+            if step < len(send_chunks):
+                name, offset, length = send_chunks[step]
+                data = bytearray(length)
+                with open(os.path.join(send_dir, name), "rb") as f:
+                    f.seek(offset)
+                    f.readinto(data)
+                send_buffer = torch.frombuffer(data, dtype=torch.uint8).to(self.device)
+                handles.append(dist.isend(send_buffer, send_rank))
+            if step < len(recv_chunks):
+                recv_buffer = torch.empty(recv_chunks[step][2],
+                                          dtype=torch.uint8,
+                                          device=self.device)
+                handles.append(dist.irecv(recv_buffer, recv_rank))
+            _wait(handles)
+            if step < len(recv_chunks):
+                name = recv_chunks[step][0]
+                with open(os.path.join(recv_dir, name), "ab") as f:
+                    f.write(recv_buffer.cpu().numpy().tobytes())
+
+        # empty files have no chunks
+        for name, size in recv_files:
+            if size == 0:
+                open(os.path.join(recv_dir, name), "wb").close()
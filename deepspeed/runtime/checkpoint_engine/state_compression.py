@@ -0,0 +1,184 @@
+"""
+Compression of optimizer moments in ZeRO checkpoints.
+
+Two codecs are supported for the Adam moments (``exp_avg`` and ``exp_avg_sq``):
+
+    * lossless: the tensor bytes are byte-shuffled (all first bytes of every
+      element, then all second bytes, ...) which groups the slowly changing
+      sign/exponent bytes of floating point values, and then compressed with
+      zstd or lz4.
+    * quantized: ``exp_avg_sq`` is stored as 8-bit codes of the logarithm of
+      its square root, with the fp32 range of the logarithms of each block.
+      Adam only uses ``sqrt(exp_avg_sq)`` as the update denominator, so the
+      error is relative: small values keep their magnitude instead of being
+      rounded to zero, which would blow up their Adam updates. Code 0 is
+      reserved for exact zeros.
+
+A compressed tensor is stored as a small dict tagged with
+``COMPRESSED_TENSOR_KEY``, which ``decompress_state_dict`` turns back into a
+tensor. Loading needs no configuration.
+"""
+
+import copy
+import torch
+
+COMPRESSED_TENSOR_KEY = "ds_compressed_tensor"
+
+CODEC_NONE = "none"
+CODEC_ZSTD = "zstd"
+CODEC_LZ4 = "lz4"
+LOSSLESS_CODECS = [CODEC_NONE, CODEC_ZSTD, CODEC_LZ4]
+CODEC_QUANTIZED_8BIT = "quantized_8bit"
+
+EXP_AVG_KEY = "exp_avg"
+EXP_AVG_SQ_KEY = "exp_avg_sq"
+
+
+def _get_compressor(codec):
+    if codec == CODEC_ZSTD:
+        try:
+            import zstandard
+        except ImportError as err:
+            raise ImportError(
+                "zstd checkpoint compression requires the zstandard package") from err
+        return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+    elif codec == CODEC_LZ4:
+        try:
+            import lz4.frame
+        except ImportError as err:
+            raise ImportError(
+                "lz4 checkpoint compression requires the lz4 package") from err
+        return lz4.frame.compress, lz4.frame.decompress
+    raise ValueError(f"Unknown checkpoint compression codec {codec}")
+
+
+def _as_bytes(tensor):
+    return tensor.contiguous().reshape(-1).view(torch.uint8)
+
+
+def _compress_lossless(tensor, codec):
+    compress, _ = _get_compressor(codec)
+    # byte shuffle: [numel, element_size] -> [element_size, numel]
+    shuffled = _as_bytes(tensor).view(-1, tensor.element_size()).t().contiguous()
+    data = compress(shuffled.numpy().tobytes())
+    return {
+        "codec": codec,
+        "dtype": tensor.dtype,
+        "shape": tensor.shape,
+        "data": torch.frombuffer(bytearray(data),
+                                 dtype=torch.uint8)
+    }
+
+
+def _decompress_lossless(compressed):
+    _, decompress = _get_compressor(compressed["codec"])
+    dtype = compressed["dtype"]
+    element_size = torch.empty(0, dtype=dtype).element_size()
+    data = decompress(compressed["data"].numpy().tobytes())
+    shuffled = torch.frombuffer(bytearray(data), dtype=torch.uint8)
+    shuffled = shuffled.view(element_size, -1)
+    return shuffled.t().contiguous().view(dtype).view(compressed["shape"])
+
+
+def _compress_quantized(tensor, block_size):
+    numel = tensor.numel()
+    sqrt_values = tensor.float().reshape(-1).clamp(min=0).sqrt()
+    padding = (block_size - numel % block_size) % block_size
+    blocks = torch.nn.functional.pad(sqrt_values, (0, padding)).view(-1, block_size)
+    nonzero = blocks > 0
+    logs = blocks.log()
+    log_min = torch.where(nonzero, logs, float("inf")).amin(dim=1)
+    log_max = torch.where(nonzero, logs, float("-inf")).amax(dim=1)
+    # all zero blocks
+    log_min[~nonzero.any(dim=1)] = 0
+    log_max = torch.maximum(log_max, log_min)
+    log_steps = (log_max - log_min) / 254
+    log_steps[log_steps == 0] = 1
+    codes = (logs - log_min.unsqueeze(1)) / log_steps.unsqueeze(1)
+    codes = codes.round_().clamp_(0, 254) + 1
+    quantized = torch.where(nonzero, codes, 0.).to(torch.uint8)
+    return {
+        "codec": CODEC_QUANTIZED_8BIT,
+        "dtype": tensor.dtype,
+        "shape": tensor.shape,
+        "block_size": block_size,
+        "data": quantized.view(-1)[:numel].clone(),
+        "log_min": log_min,
+        "log_steps": log_steps
+    }
+
+
+def _decompress_quantized(compressed):
+    block_size = compressed["block_size"]
+    quantized = compressed["data"]
+    numel = quantized.numel()
+    padding = (block_size - numel % block_size) % block_size
+    blocks = torch.nn.functional.pad(quantized, (0, padding)).view(-1, block_size)
+    log_min = compressed["log_min"].unsqueeze(1)
+    log_steps = compressed["log_steps"].unsqueeze(1)
+    logs = log_min + (blocks.float() - 1) * log_steps
+    sqrt_values = torch.where(blocks > 0, logs.exp(), 0.)
+    values = sqrt_values.view(-1)[:numel].square()
+    return values.to(compressed["dtype"]).view(compressed["shape"])
+
+
+def compress_tensor(tensor, codec, block_size=None):
+    tensor = tensor.detach().cpu()
+    if codec == CODEC_QUANTIZED_8BIT:
+        compressed = _compress_quantized(tensor, block_size)
+    else:
+        compressed = _compress_lossless(tensor, codec)
+    return {COMPRESSED_TENSOR_KEY: compressed}
+
+
+def is_compressed_tensor(obj):
+    return isinstance(obj, dict) and len(obj) == 1 and COMPRESSED_TENSOR_KEY in obj
+
+
+def decompress_tensor(obj):
+    compressed = obj[COMPRESSED_TENSOR_KEY]
+    if compressed["codec"] == CODEC_QUANTIZED_8BIT:
+        return _decompress_quantized(compressed)
+    return _decompress_lossless(compressed)
+
+
+def compress_optimizer_state_dict(state_dict,
+                                  codec=CODEC_NONE,
+                                  quantize_exp_avg_sq=False,
+                                  block_size=2048):
+    """Returns a copy of ``state_dict`` with the Adam moments compressed.
+
+    Containers are copied, the tensors of ``state_dict`` are left untouched.
+    """
+    def compress(obj, key=None):
+        if isinstance(obj, dict):
+            compressed = copy.copy(obj)
+            for k, v in obj.items():
+                compressed[k] = compress(v, k)
+            return compressed
+        elif isinstance(obj, list):
+            return [compress(e) for e in obj]
+        elif torch.is_tensor(obj) and obj.is_floating_point() and obj.numel() > 0:
+            if key == EXP_AVG_SQ_KEY and quantize_exp_avg_sq:
+                return compress_tensor(obj, CODEC_QUANTIZED_8BIT, block_size)
+            if key in (EXP_AVG_KEY, EXP_AVG_SQ_KEY) and codec != CODEC_NONE:
+                return compress_tensor(obj, codec)
+        return obj
+
+    return compress(state_dict)
+
+
+def decompress_state_dict(state_dict):
+    """Replaces every compressed tensor of ``state_dict`` in place."""
+    def decompress(obj):
+        if is_compressed_tensor(obj):
+            return decompress_tensor(obj)
+        elif isinstance(obj, dict):
+            for k, v in obj.items():
+                obj[k] = decompress(v)
+        elif isinstance(obj, list):
+            for i, e in enumerate(obj):
+                obj[i] = decompress(e)
+        return obj
+
+    return decompress(state_dict)
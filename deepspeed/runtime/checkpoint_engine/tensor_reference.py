@@ -0,0 +1,66 @@
+"""
+References to tensors stored in the same checkpoint file of an earlier tag.
+
+Incremental checkpoints replace unchanged tensors with a small dict that names
+the tag holding the data and the key path of the tensor inside that file.
+Checkpoint files live at ``<save_dir>/<tag>/<file name>``, so the referenced
+file is found by swapping the tag directory of the file being loaded.
+"""
+
+import os
+
+TENSOR_REFERENCE_KEY = "ds_tensor_ref"
+
+
+def make_tensor_reference(tag, key_path):
+    return {TENSOR_REFERENCE_KEY: {"tag": tag, "key": list(key_path)}}
+
+
+def is_tensor_reference(obj):
+    return isinstance(obj, dict) and len(obj) == 1 and TENSOR_REFERENCE_KEY in obj
+
+
+def get_tag_path(path, tag):
+    tag_dir = os.path.dirname(path)
+    return os.path.join(os.path.dirname(tag_dir), tag, os.path.basename(path))
+
+
+def _lookup(state_dict, key_path):
+    obj = state_dict
+    for key in key_path:
+        obj = obj[key]
+    return obj
+
+
+def resolve_tensor_references(state_dict, path, load_fn):
+    """Replace every tensor reference in ``state_dict`` by the referenced tensor.
+
+    Containers are updated in place, so state dict types (and attributes like
+    ``_metadata`` of module state dicts) are preserved.
+
+    Arguments:
+        state_dict: loaded checkpoint file content
+        path: path the ``state_dict`` was loaded from
+        load_fn: callable loading the checkpoint file at a given path
+    """
+    loaded_tags = {}
+
+    def resolve(obj):
+        if is_tensor_reference(obj):
+            ref = obj[TENSOR_REFERENCE_KEY]
+            if ref["tag"] not in loaded_tags:
+                loaded_tags[ref["tag"]] = load_fn(get_tag_path(path, ref["tag"]))
+            return _lookup(loaded_tags[ref["tag"]], ref["key"])
+        elif isinstance(obj, dict):
+            for k, v in obj.items():
+                obj[k] = resolve(v)
+        elif isinstance(obj, list):
+            for i, e in enumerate(obj):
+                obj[i] = resolve(e)
+        elif type(obj) is tuple:
+            resolved = [resolve(e) for e in obj]
+            if any(r is not e for r, e in zip(resolved, obj)):
+                return tuple(resolved)
+        return obj
+
+    return resolve(state_dict)
@@ -2,24 +2,37 @@ import torch
 from deepspeed.utils import logger, log_dist
 from deepspeed.runtime.checkpoint_engine.checkpoint_engine import \
     CheckpointEngine
+from deepspeed.runtime.checkpoint_engine.mmap_checkpoint import \
+    is_mmap_checkpoint, save_mmap_checkpoint, load_mmap_checkpoint
+from deepspeed.runtime.checkpoint_engine.tensor_reference import \
+    resolve_tensor_references
+from deepspeed.runtime.checkpoint_engine.state_compression import \
+    decompress_state_dict
 
 
 class TorchCheckpointEngine(CheckpointEngine):
+    # every file is written and read independently
+    thread_safe = True
+
     def __init__(self, config_params=None):
         super().__init__(config_params)
+        self.mmap_format = config_params is not None and config_params.checkpoint_mmap_format
 
     def create(self, tag):
         log_dist(f"[Torch] Checkpoint {tag} is begin to save!", ranks=[0])
 
     def save(self, state_dict, path: str):
         logger.info(f"[Torch] Saving {path}...")
-        save(state_dict, path)
+        if self.mmap_format:
+            save_mmap_checkpoint(state_dict, path)
+        else:
+            save(state_dict, path)
         logger.info(f"[Torch] Saved {path}.")
         return None
 
     def load(self, path: str, map_location=None):
         logger.info(f"[Torch] Loading checkpoint from {path}...")
-        partition = torch.load(path, map_location=map_location)
+        partition = load(path, map_location=map_location)
         logger.info(f"[Torch] Loaded checkpoint from {path}.")
         return partition
 
@@ -27,6 +40,20 @@ class TorchCheckpointEngine(CheckpointEngine):
         logger.info(f"[Torch] Checkpoint {tag} is ready now!")
         return True
 
+def load(filename, map_location=None):
+    if is_mmap_checkpoint(filename):
+        state_dict = load_mmap_checkpoint(filename, map_location=map_location)
+    else:
+        state_dict = torch.load(filename, map_location=map_location)
+    # Incremental checkpoints reference unchanged tensors of earlier tags
+    state_dict = resolve_tensor_references(
+        state_dict,
+        filename,
+        lambda path: load(path,
+                          map_location=map_location))
+    return decompress_state_dict(state_dict)
+
+
 def save(data, filename):
     def convert_for_pickle(obj):
         if isinstance(obj, torch.Size):
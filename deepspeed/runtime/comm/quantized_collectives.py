@@ -0,0 +1,222 @@
+"""gradient collectives that send blockwise quantized tensors to reduce the
+communicated bytes, the received tensors are dequantized and summed in fp32"""
+
+from typing import List, Tuple
+
+import torch
+from torch import Tensor
+from deepspeed import comm as dist
+from deepspeed.utils import logger
+from deepspeed.runtime.utils import get_use_hpu
+
+INT8 = "int8"
+FP8 = "fp8"
+
+SCALE_BYTES = 4
+INT8_MAX = 127.0
+FP8_MAX = 448.0
+
+# Cuda modules will be imported if needed
+quantizer_cuda_module = None
+
+
+def _load_quantizer_cuda_module():
+    global quantizer_cuda_module
+    if quantizer_cuda_module is None:
+        try:
+            from deepspeed.ops.op_builder import QuantizerBuilder
+            quantizer_cuda_module = QuantizerBuilder().load()
+        except Exception as e:
+            logger.warning(
+                f"Unable to load the quantizer kernels ({e}), using the torch implementation."
+            )
+            quantizer_cuda_module = False
+    return quantizer_cuda_module
+
+
+class BlockQuantizer:
+    """Quantizes flat tensors in blocks of ``block_size`` elements to int8 or
+    fp8 (e4m3), with one fp32 scale per block.
+
+    int8 fp16 tensors on CUDA are quantized with the kernels of
+    ``deepspeed/ops/quantizer``, everything else with a torch implementation.
+    Both store the dequantization multiplier of each block, so packed tensors
+    are always dequantized in fp32 with torch. The quantized values and the
+    scales of a tensor are packed into one uint8 buffer so that a single
+    collective sends both.
+    """
+    def __init__(self, dtype=INT8, block_size=256):
+        assert dtype in [INT8, FP8], f"unsupported gradient quantization dtype {dtype}"
+        if dtype == FP8:
+            assert hasattr(torch, "float8_e4m3fn"), "fp8 gradient quantization requires torch.float8_e4m3fn"
+        self.dtype = dtype
+        self.block_size = block_size
+
+    def num_blocks(self, numel):
+        return (numel + self.block_size - 1) // self.block_size
+
+    def _values_numel(self, num_blocks):
+        # keeps the scales and the next packed tensor aligned for the fp32 view
+        values_numel = num_blocks * self.block_size
+        return (values_numel + SCALE_BYTES - 1) // SCALE_BYTES * SCALE_BYTES
+
+    def packed_numel(self, numel):
+        """Number of bytes of a packed tensor of ``numel`` elements."""
+        num_blocks = self.num_blocks(numel)
+        return self._values_numel(num_blocks) + num_blocks * SCALE_BYTES
+
+    def _use_kernel(self, tensor):
+        return (self.dtype == INT8 and tensor.is_cuda and tensor.dtype == torch.half
+                and _load_quantizer_cuda_module())
+
+    def pack(self, tensor: Tensor, out: Tensor):
+        """Quantizes the flat ``tensor`` into the uint8 buffer ``out`` of
+        ``packed_numel(tensor.numel())`` bytes. Returns the dequantized tensor
+        in fp32, which error feedback compares with ``tensor``."""
+        num_blocks = self.num_blocks(tensor.numel())
+        padded = tensor.new_zeros(num_blocks * self.block_size)
+        padded[:tensor.numel()].copy_(tensor)
+        values = out.narrow(0, 0, num_blocks * self.block_size)
+        scales = out.narrow(0,
+                            self._values_numel(num_blocks),
+                            num_blocks * SCALE_BYTES).view(torch.float32)
+
+        if self._use_kernel(padded):
+            quantized, params = quantizer_cuda_module.quantize(
+                padded, num_blocks, 8, quantizer_cuda_module.Symmetric)
+            values.copy_(quantized.view(torch.uint8))
+            scales.copy_(params.view(-1))
+        else:
+            blocks = padded.float().view(num_blocks, self.block_size)
+            max_value = INT8_MAX if self.dtype == INT8 else FP8_MAX
+            block_scales = blocks.abs().amax(dim=1, keepdim=True).div_(max_value)
+            block_scales.clamp_(min=torch.finfo(torch.float32).tiny)
+            blocks.div_(block_scales)
+            if self.dtype == INT8:
+                quantized = blocks.round_().clamp_(-INT8_MAX, INT8_MAX).to(torch.int8)
+            else:
+                quantized = blocks.to(torch.float8_e4m3fn)
+            values.copy_(quantized.view(-1).view(torch.uint8))
+            scales.copy_(block_scales.view(-1))
+        return self.unpack(out, tensor.numel())
+
+    def unpack(self, packed: Tensor, numel) -> Tensor:
+        """Dequantizes the first ``numel`` elements of the packed tensor ``packed`` to fp32."""
+        num_blocks = self.num_blocks(numel)
+        values = packed.narrow(0, 0, num_blocks * self.block_size)
+        scales = packed.narrow(0,
+                               self._values_numel(num_blocks),
+                               num_blocks * SCALE_BYTES).view(torch.float32)
+        quantized_dtype = torch.int8 if self.dtype == INT8 else torch.float8_e4m3fn
+        quantized = values.view(quantized_dtype)
+        dequantized = quantized.float().view(num_blocks,
+                                             self.block_size).mul_(scales.view(-1,
+                                                                               1))
+        return dequantized.view(-1)[:numel]
+
+
+def _wait(handle):
+    if handle is not None and not get_use_hpu():
+        handle.wait()
+
+
+def _gather_ranges(tensor, ranges):
+    return torch.cat([tensor.narrow(0, offset, numel) for offset, numel in ranges])
+
+
+def _scatter_ranges(flat, tensor, ranges):
+    offset_in_flat = 0
+    for offset, numel in ranges:
+        tensor.narrow(0, offset, numel).copy_(flat.narrow(0, offset_in_flat, numel))
+        offset_in_flat += numel
+
+
+@torch.no_grad()
+def all_to_all_quant_reduce(tensor: Tensor,
+                            rank_ranges: List[List[Tuple[int,
+                                                         int]]],
+                            quantizer: BlockQuantizer,
+                            group=None,
+                            residual: Tensor = None):
+    """Sums ``tensor`` over ``group`` into the ranges owned by each rank.
+
+    ``rank_ranges[r]`` lists the (offset, numel) ranges of ``tensor`` owned by
+    rank ``r`` of ``group``, it must be the same on all ranks. Every rank
+    quantizes the ranges of each owner, sends them with one all-to-all, and
+    sums the dequantized ranges it receives in fp32 into its own ranges of
+    ``tensor``. The ranges owned by other ranks are left unreduced.
+
+    If ``residual`` is given, it is added to ``tensor`` before quantization
+    and updated in place with the quantization error (error feedback). It
+    should be fp32, the error is computed in fp32 and would mostly underflow
+    in fp16. The error of non-finite values, e.g. of an overflowing fp16
+    step, is zero.
+    """
+    world_size = dist.get_world_size(group=group)
+    rank = dist.get_rank(group=group)
+    assert len(rank_ranges) == world_size
+
+    if residual is not None:
+        tensor.add_(residual)
+
+    numels = [sum(numel for _, numel in ranges) for ranges in rank_ranges]
+    packed_numels = [quantizer.packed_numel(numel) for numel in numels]
+    send_buffer = torch.empty(sum(packed_numels),
+                              dtype=torch.uint8,
+                              device=tensor.device)
+    send_offset = 0
+    for ranges, numel, packed_numel in zip(rank_ranges, numels, packed_numels):
+        if numel > 0:
+            flat = _gather_ranges(tensor, ranges)
+            packed = send_buffer.narrow(0, send_offset, packed_numel)
+            dequantized = quantizer.pack(flat, packed)
+            if residual is not None:
+                error = flat.float().sub_(dequantized)
+                error.masked_fill_(~torch.isfinite(error), 0.)
+                _scatter_ranges(error, residual, ranges)
+        send_offset += packed_numel
+
+    recv_buffer = torch.empty(world_size * packed_numels[rank],
+                              dtype=torch.uint8,
+                              device=tensor.device)
+    _wait(
+        dist.all_to_all_single(recv_buffer,
+                               send_buffer,
+                               output_split_sizes=[packed_numels[rank]] * world_size,
+                               input_split_sizes=packed_numels,
+                               group=group))
+
+    if numels[rank] > 0:
+        reduced = torch.zeros(numels[rank], dtype=torch.float32, device=tensor.device)
+        for packed in recv_buffer.chunk(world_size):
+            reduced.add_(quantizer.unpack(packed, numels[rank]))
+        _scatter_ranges(reduced, tensor, rank_ranges[rank])
+
+
+@torch.no_grad()
+def quant_all_reduce(tensor: Tensor, quantizer: BlockQuantizer, group=None):
+    """All-reduces the flat ``tensor`` over ``group`` with a quantized
+    reduce-scatter (see all_to_all_quant_reduce) followed by a quantized
+    all-gather of the reduced chunks."""
+    world_size = dist.get_world_size(group=group)
+    rank = dist.get_rank(group=group)
+    chunk_numel = (tensor.numel() + world_size - 1) // world_size
+    rank_ranges = []
+    for r in range(world_size):
+        offset = min(r * chunk_numel, tensor.numel())
+        rank_ranges.append([(offset, min(chunk_numel, tensor.numel() - offset))])
+    all_to_all_quant_reduce(tensor, rank_ranges, quantizer, group=group)
+
+    packed_numel = quantizer.packed_numel(chunk_numel)
+    packed = torch.empty(packed_numel, dtype=torch.uint8, device=tensor.device)
+    own_offset, own_numel = rank_ranges[rank][0]
+    if own_numel > 0:
+        quantizer.pack(tensor.narrow(0, own_offset, own_numel), packed)
+    gathered = torch.empty(world_size * packed_numel,
+                           dtype=torch.uint8,
+                           device=tensor.device)
+    _wait(dist.allgather_fn(gathered, packed, group=group))
+    for r, packed in enumerate(gathered.chunk(world_size)):
+        offset, numel = rank_ranges[r][0]
+        if numel > 0:
+            tensor.narrow(0, offset, numel).copy_(quantizer.unpack(packed, numel))
@@ -164,6 +164,15 @@ def get_fp16_master_weights_and_grads_enabled(param_dict):
         return False
 
 
+def get_fp16_deferred_overflow_check(param_dict):
+    if get_fp16_enabled(param_dict):
+        return get_scalar_param(param_dict[FP16],
+                                FP16_DEFERRED_OVERFLOW_CHECK,
+                                FP16_DEFERRED_OVERFLOW_CHECK_DEFAULT)
+    else:
+        return False
+
+
 def get_fp16_auto_cast(param_dict):
     if get_fp16_enabled(param_dict):
         return get_scalar_param(param_dict[FP16], FP16_AUTO_CAST, FP16_AUTO_CAST_DEFAULT)
@@ -693,6 +702,82 @@ def get_checkpoint_parallel_write_pipeline(checkpoint_params):
             f"value of '{par_write_pipeline}' is invalid, expecting: true or false")
 
 
+def get_checkpoint_parallel_write_layer_workers(checkpoint_params):
+    par_write_params = checkpoint_params.get(CHECKPOINT_PARALLEL_WRITE, {})
+    layer_workers = par_write_params.get(
+        CHECKPOINT_PARALLEL_WRITE_LAYER_WORKERS,
+        CHECKPOINT_PARALLEL_WRITE_LAYER_WORKERS_DEFAULT)
+    if not isinstance(layer_workers, int) or layer_workers < 1:
+        raise DeepSpeedConfigError(
+            "checkpoint::parallel_write::layer_workers "
+            f"value of '{layer_workers}' is invalid, expecting a positive integer")
+    return layer_workers
+
+
+def get_checkpoint_parallel_write_max_inflight_bytes(checkpoint_params):
+    par_write_params = checkpoint_params.get(CHECKPOINT_PARALLEL_WRITE, {})
+    max_inflight_bytes = par_write_params.get(
+        CHECKPOINT_PARALLEL_WRITE_MAX_INFLIGHT_BYTES,
+        CHECKPOINT_PARALLEL_WRITE_MAX_INFLIGHT_BYTES_DEFAULT)
+    if not isinstance(max_inflight_bytes, int) or max_inflight_bytes < 1:
+        raise DeepSpeedConfigError(
+            "checkpoint::parallel_write::max_inflight_bytes "
+            f"value of '{max_inflight_bytes}' is invalid, expecting a positive integer")
+    return max_inflight_bytes
+
+
+def get_checkpoint_optimizer_state_compression(checkpoint_params):
+    compression_params = checkpoint_params.get(CHECKPOINT_OPTIMIZER_STATE_COMPRESSION,
+                                               {})
+    codec = compression_params.get(
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC,
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC_DEFAULT).lower()
+    if codec not in CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODECS:
+        raise DeepSpeedConfigError(
+            "checkpoint::optimizer_state_compression::codec "
+            f"value of '{codec}' is invalid, expecting one of {CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODECS}"
+        )
+    quantize = compression_params.get(
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE,
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE_DEFAULT)
+    if quantize not in [True, False]:
+        raise DeepSpeedConfigError(
+            "checkpoint::optimizer_state_compression::quantize_exp_avg_sq "
+            f"value of '{quantize}' is invalid, expecting: true or false")
+    block_size = compression_params.get(
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE,
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE_DEFAULT)
+    return {
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC: codec,
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE: quantize,
+        CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE: block_size
+    }
+
+
+def get_checkpoint_peer_memory(checkpoint_params):
+    peer_memory_params = checkpoint_params.get(CHECKPOINT_PEER_MEMORY, {})
+    enabled = peer_memory_params.get(CHECKPOINT_PEER_MEMORY_ENABLED,
+                                     CHECKPOINT_PEER_MEMORY_ENABLED_DEFAULT)
+    if enabled not in [True, False]:
+        raise DeepSpeedConfigError(
+            "checkpoint::peer_memory::enabled "
+            f"value of '{enabled}' is invalid, expecting: true or false")
+    persist_interval = peer_memory_params.get(
+        CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL,
+        CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL_DEFAULT)
+    if not isinstance(persist_interval, int) or persist_interval < 1:
+        raise DeepSpeedConfigError(
+            "checkpoint::peer_memory::persist_interval "
+            f"value of '{persist_interval}' is invalid, expecting a positive integer")
+    memory_dir = peer_memory_params.get(CHECKPOINT_PEER_MEMORY_MEMORY_DIR,
+                                        CHECKPOINT_PEER_MEMORY_MEMORY_DIR_DEFAULT)
+    return {
+        CHECKPOINT_PEER_MEMORY_ENABLED: enabled,
+        CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL: persist_interval,
+        CHECKPOINT_PEER_MEMORY_MEMORY_DIR: memory_dir
+    }
+
+
 def get_dataloader_drop_last(param_dict):
     return get_scalar_param(param_dict,
                             DATALOADER_DROP_LAST,
@@ -859,6 +944,7 @@ class DeepSpeedConfig(object):
         assert not (self.fp16_enabled and self.bfloat16_enabled), 'bfloat16 and fp16 modes cannot be simultaneously enabled'
         self.fp16_master_weights_and_gradients = get_fp16_master_weights_and_grads_enabled(
             param_dict)
+        self.fp16_deferred_overflow_check = get_fp16_deferred_overflow_check(param_dict)
         self.amp_enabled = get_amp_enabled(param_dict)
         self.amp_params = get_amp_params(param_dict)
         self.loss_scale = get_loss_scale(param_dict)
@@ -922,12 +1008,37 @@ class DeepSpeedConfig(object):
             USE_NODE_LOCAL_STORAGE_CHECKPOINT,
             USE_NODE_LOCAL_STORAGE_CHECKPOINT_DEFAULT)
 
+        self.checkpoint_async_save = checkpoint_params.get(
+            CHECKPOINT_ASYNC_SAVE,
+            CHECKPOINT_ASYNC_SAVE_DEFAULT)
+
+        self.checkpoint_mmap_format = checkpoint_params.get(
+            CHECKPOINT_MMAP_FORMAT,
+            CHECKPOINT_MMAP_FORMAT_DEFAULT)
+
+        self.checkpoint_incremental = checkpoint_params.get(
+            CHECKPOINT_INCREMENTAL,
+            CHECKPOINT_INCREMENTAL_DEFAULT)
+
+        self.checkpoint_load_broadcast = checkpoint_params.get(
+            CHECKPOINT_LOAD_BROADCAST,
+            CHECKPOINT_LOAD_BROADCAST_DEFAULT)
+
+        self.checkpoint_optimizer_state_compression = get_checkpoint_optimizer_state_compression(
+            checkpoint_params)
+
+        self.checkpoint_peer_memory = get_checkpoint_peer_memory(checkpoint_params)
+
         data_types_params = get_data_types_params(param_dict)
         self.grad_accum_dtype = data_types_params.get(GRAD_ACCUM_DTYPE,
                                                       GRAD_ACCUM_DTYPE_DEFAULT)
 
         par_write_pipe = get_checkpoint_parallel_write_pipeline(checkpoint_params)
         self.checkpoint_parallel_write_pipeline = par_write_pipe
+        self.checkpoint_parallel_write_layer_workers = get_checkpoint_parallel_write_layer_workers(
+            checkpoint_params)
+        self.checkpoint_parallel_write_max_inflight_bytes = get_checkpoint_parallel_write_max_inflight_bytes(
+            checkpoint_params)
 
         self.aio_config = get_aio_config(param_dict)
 
@@ -1055,6 +1166,13 @@ class DeepSpeedConfig(object):
     def _do_warning_check(self):
         fp16_enabled = self.fp16_enabled
 
+        if self.fp16_deferred_overflow_check and not (
+                self.zero_enabled
+                and self.zero_optimization_stage <= ZeroStageEnum.gradients):
+            logger.warning(
+                "DeepSpeedConfig: {} is only supported with ZeRO stage 1 and 2, it will be ignored."
+                .format(FP16_DEFERRED_OVERFLOW_CHECK))
+
         vocabulary_size = self._param_dict.get(VOCABULARY_SIZE, VOCABULARY_SIZE_DEFAULT)
         if vocabulary_size and vocabulary_size % TENSOR_CORE_ALIGN_SIZE != 0:
             logger.warning(
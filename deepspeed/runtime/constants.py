@@ -138,7 +138,8 @@ FP16 parameters should be of the format:
   "initial_scale_power": 32,
   "loss_scale_window": 1000,
   "hysteresis": 2,
-  "min_loss_scale": 1
+  "min_loss_scale": 1,
+  "deferred_overflow_check": false
 }
 '''
 FP16 = "fp16"
@@ -173,6 +174,10 @@ FP16_MIN_LOSS_SCALE_DEFAULT = 1
 FP16_MASTER_WEIGHTS_AND_GRADS = "fp16_master_weights_and_grads"
 FP16_MASTER_WEIGHTS_AND_GRADS_DEFAULT = False
 
+# FP16 overflow flag and dynamic loss scale kept on device, read by the host every steps_per_print steps
+FP16_DEFERRED_OVERFLOW_CHECK = "deferred_overflow_check"
+FP16_DEFERRED_OVERFLOW_CHECK_DEFAULT = False
+
 #########################################
 # Apex AMP support
 #########################################
@@ -368,8 +373,24 @@ class ValidationMode:
 #   tag_validation=["Ignore"|"Warn"|"Fail"]
 #   load_universal=false
 #   use_node_local_storage=false
+#   async_save=false
+#   mmap_format=false
+#   incremental=false
+#   load_broadcast=false
+#   optimizer_state_compression: {
+#     codec: ["none"|"zstd"|"lz4"]
+#     quantize_exp_avg_sq: [True|False]
+#     block_size: 2048
+#   }
+#   peer_memory: {
+#     enabled: [True|False]
+#     persist_interval: 10
+#     memory_dir: "/dev/shm/deepspeed_peer_checkpoint"
+#   }
 #   parallel_write: {
 #     pipeline_stage: [True|False]
+#     layer_workers: 1
+#     max_inflight_bytes: 1073741824
 #   }
 # }
 CHECKPOINT = "checkpoint"
@@ -387,9 +408,42 @@ LOAD_UNIVERSAL_CHECKPOINT_DEFAULT = False
 USE_NODE_LOCAL_STORAGE_CHECKPOINT = "use_node_local_storage"
 USE_NODE_LOCAL_STORAGE_CHECKPOINT_DEFAULT = False
 
+CHECKPOINT_ASYNC_SAVE = "async_save"
+CHECKPOINT_ASYNC_SAVE_DEFAULT = False
+
+CHECKPOINT_MMAP_FORMAT = "mmap_format"
+CHECKPOINT_MMAP_FORMAT_DEFAULT = False
+
+CHECKPOINT_INCREMENTAL = "incremental"
+CHECKPOINT_INCREMENTAL_DEFAULT = False
+
+CHECKPOINT_LOAD_BROADCAST = "load_broadcast"
+CHECKPOINT_LOAD_BROADCAST_DEFAULT = False
+
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION = "optimizer_state_compression"
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC = "codec"
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC_DEFAULT = "none"
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODECS = ["none", "zstd", "lz4"]
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE = "quantize_exp_avg_sq"
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE_DEFAULT = False
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE = "block_size"
+CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE_DEFAULT = 2048
+
+CHECKPOINT_PEER_MEMORY = "peer_memory"
+CHECKPOINT_PEER_MEMORY_ENABLED = "enabled"
+CHECKPOINT_PEER_MEMORY_ENABLED_DEFAULT = False
+CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL = "persist_interval"
+CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL_DEFAULT = 10
+CHECKPOINT_PEER_MEMORY_MEMORY_DIR = "memory_dir"
+CHECKPOINT_PEER_MEMORY_MEMORY_DIR_DEFAULT = "/dev/shm/deepspeed_peer_checkpoint"
+
 CHECKPOINT_PARALLEL_WRITE = "parallel_write"
 CHECKPOINT_PARALLEL_WRITE_PIPELINE_STAGE = "pipeline_stage"
 CHECKPOINT_PARALLEL_WRITE_PIPELINE_STAGE_DEFAULT = False
+CHECKPOINT_PARALLEL_WRITE_LAYER_WORKERS = "layer_workers"
+CHECKPOINT_PARALLEL_WRITE_LAYER_WORKERS_DEFAULT = 1
+CHECKPOINT_PARALLEL_WRITE_MAX_INFLIGHT_BYTES = "max_inflight_bytes"
+CHECKPOINT_PARALLEL_WRITE_MAX_INFLIGHT_BYTES_DEFAULT = 1024 * 1024 * 1024
 
 #########################################
 # Data types config params
@@ -25,6 +25,8 @@ from deepspeed.runtime.zero.stage_1_and_2 import DeepSpeedZeroOptimizer
 from deepspeed.runtime.zero.partition_parameters import ZeroParamStatus
 from deepspeed.runtime.zero.utils import is_zero_supported_optimizer, ZeRORuntimeException
 from deepspeed.runtime.zero.parameter_offload import DeepSpeedZeRoOffload
+from deepspeed.runtime.zero.bucket_tuner import ZeroBucketSizeTuner
+from deepspeed.runtime.zero.prefetch_controller import ZeroPrefetchController
 from deepspeed.runtime.zero.config import ZERO_OPTIMIZATION
 
 from deepspeed.runtime.fp16.fused_optimizer import FP16_Optimizer
@@ -38,7 +40,12 @@ from deepspeed.runtime.config import DeepSpeedConfig, DEEPSPEED_OPTIMIZERS, \
 from deepspeed.runtime.dataloader import DeepSpeedDataLoader
 from deepspeed.runtime.constants import \
     ROUTE_TRAIN, ROUTE_PREDICT, ROUTE_EVAL, \
-    PLD_THETA, PLD_GAMMA, BFLOAT16, FP16, AMP
+    PLD_THETA, PLD_GAMMA, BFLOAT16, FP16, AMP, \
+    CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC, \
+    CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE, \
+    CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE, \
+    CHECKPOINT_PEER_MEMORY_ENABLED, CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL, \
+    CHECKPOINT_PEER_MEMORY_MEMORY_DIR
 from deepspeed.runtime.zero.config import ZeroStageEnum
 from deepspeed.compression import compression_scheduler
 from deepspeed.compression.constants import \
@@ -66,6 +73,11 @@ from deepspeed.runtime.utils import clip_grad_norm_, typeof
 from deepspeed.runtime.eigenvalue import Eigenvalue
 from deepspeed.runtime.data_pipeline.curriculum_scheduler import CurriculumScheduler
 from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.async_checkpoint_engine import AsyncCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.incremental_checkpoint_engine import IncrementalCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.broadcast_checkpoint_engine import BroadcastCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.peer_memory_checkpoint_engine import PeerMemoryCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.state_compression import compress_optimizer_state_dict, decompress_state_dict
 
 from .pipe.module import PipelineModule
 from .utils import ensure_directory_exists, get_ma_status, get_use_hpu, torch_check_hpu_fp16_supported
@@ -386,6 +398,34 @@ class DeepSpeedEngine(Module):
         elif self.bfloat16_enabled():
             self.optimizer = self._configure_bf16_optimizer(optimizer=None)
 
+        if hasattr(self.optimizer, "register_overlapped_step_hooks"):
+            self.optimizer.register_overlapped_step_hooks(self.module)
+
+        self.bucket_size_tuner = None
+        bucket_size_tuning = self.zero_bucket_size_tuning()
+        if bucket_size_tuning is not None and bucket_size_tuning.enabled:
+            if hasattr(self.optimizer, "set_bucket_sizes"):
+                self.bucket_size_tuner = ZeroBucketSizeTuner(self.optimizer,
+                                                             bucket_size_tuning,
+                                                             self.device)
+            else:
+                logger.warning(
+                    "ZeRO bucket size tuning requires a ZeRO optimizer, using the configured bucket sizes."
+                )
+
+        self.prefetch_controller = None
+        prefetch_control = self.zero_prefetch_control()
+        if prefetch_control is not None and prefetch_control.enabled:
+            if hasattr(self.optimizer, "set_prefetch_limits"):
+                self.prefetch_controller = ZeroPrefetchController(self.optimizer,
+                                                                  prefetch_control,
+                                                                  self.device,
+                                                                  use_hpu=self.use_hpu)
+            else:
+                logger.warning(
+                    "ZeRO prefetch control requires a ZeRO stage 3 optimizer, using the configured prefetch limits."
+                )
+
         # Bookkeeping for sparse support
         self.sparse_tensor_module_names = set()
         # if self.sparse_gradients_enabled():
@@ -698,6 +738,21 @@ class DeepSpeedEngine(Module):
     def zero_reduce_scatter(self):
         return self._config.zero_config.reduce_scatter
 
+    def zero_hierarchical_reduce_scatter(self):
+        return self._config.zero_config.hierarchical_reduce_scatter
+
+    def zero_local_gradient_accumulation(self):
+        return self._config.zero_config.local_gradient_accumulation
+
+    def zero_persistent_gradient_buckets(self):
+        return self._config.zero_config.persistent_gradient_buckets
+
+    def zero_gradient_quantization(self):
+        return self._config.zero_config.gradient_quantization
+
+    def zero_weight_quantization(self):
+        return self._config.zero_config.weight_quantization
+
     def zero_overlap_comm(self):
         return self._config.zero_config.overlap_comm
 
@@ -736,6 +791,12 @@ class DeepSpeedEngine(Module):
     def zero_allgather_bucket_size(self):
         return self._config.zero_config.allgather_bucket_size
 
+    def zero_bucket_size_tuning(self):
+        return self._config.zero_config.bucket_size_tuning
+
+    def zero_prefetch_control(self):
+        return self._config.zero_config.prefetch_control
+
     def zero_optimization_partition_gradients(self):
         return self.zero_optimization_stage() >= ZeroStageEnum.gradients
 
@@ -757,6 +818,12 @@ class DeepSpeedEngine(Module):
     def zero_max_reuse_distance(self):
         return self._config.zero_config.max_reuse_distance
 
+    def zero_max_cached_traces(self):
+        return self._config.zero_config.max_cached_traces
+
+    def zero_secondary_partition(self):
+        return self._config.zero_config.secondary_partition
+
     def zero_prefetch_bucket_size(self):
         return self._config.zero_config.prefetch_bucket_size
 
@@ -787,6 +854,9 @@ class DeepSpeedEngine(Module):
     def fp16_master_weights_and_gradients(self):
         return self._config.fp16_master_weights_and_gradients
 
+    def fp16_deferred_overflow_check(self):
+        return self._config.fp16_deferred_overflow_check
+
     def amp_enabled(self):
         return self._config.amp_enabled
 
@@ -808,6 +878,24 @@ class DeepSpeedEngine(Module):
     def load_universal_checkpoint(self):
         return self._config.load_universal_checkpoint
 
+    def checkpoint_async_save(self):
+        return self._config.checkpoint_async_save
+
+    def checkpoint_mmap_format(self):
+        return self._config.checkpoint_mmap_format
+
+    def checkpoint_incremental(self):
+        return self._config.checkpoint_incremental
+
+    def checkpoint_load_broadcast(self):
+        return self._config.checkpoint_load_broadcast
+
+    def checkpoint_optimizer_state_compression(self):
+        return self._config.checkpoint_optimizer_state_compression
+
+    def checkpoint_peer_memory(self):
+        return self._config.checkpoint_peer_memory
+
     @property
     def communication_data_type(self):
         res = self._config.communication_data_type
@@ -895,7 +983,16 @@ class DeepSpeedEngine(Module):
         log_dist(f'DeepSpeed LR Scheduler = {self.lr_scheduler}', ranks=[0])
 
     def _configure_checkpointing(self, dist_init_required):
-        self.checkpoint_engine = TorchCheckpointEngine()
+        self.checkpoint_engine = TorchCheckpointEngine(config_params=self._config)
+
+        if self._config is not None and self._config.checkpoint_async_save:
+            self.checkpoint_engine = AsyncCheckpointEngine(config_params=self._config)
+
+        if self._config is not None and self._config.checkpoint_incremental:
+            assert not self._config.checkpoint_async_save, \
+                "checkpoint::incremental is not supported together with checkpoint::async_save"
+            self.checkpoint_engine = IncrementalCheckpointEngine(
+                config_params=self._config)
 
         if self._config is not None and self._config.nebula_config.enabled:
             try:
@@ -909,6 +1006,15 @@ class DeepSpeedEngine(Module):
                 )
                 self.checkpoint_engine = TorchCheckpointEngine()
 
+        if self._config is not None and self._config.checkpoint_peer_memory[
+                CHECKPOINT_PEER_MEMORY_ENABLED]:
+            peer_memory = self._config.checkpoint_peer_memory
+            self.checkpoint_engine = PeerMemoryCheckpointEngine(
+                self.checkpoint_engine,
+                persist_interval=peer_memory[CHECKPOINT_PEER_MEMORY_PERSIST_INTERVAL],
+                memory_dir=peer_memory[CHECKPOINT_PEER_MEMORY_MEMORY_DIR],
+                device=self.device)
+
         dp_rank = self.global_rank
         if self.mpu:
             dp_rank = self.mpu.get_data_parallel_rank()
@@ -1561,8 +1667,13 @@ class DeepSpeedEngine(Module):
                 expert_data_parallel_group=self.expert_data_parallel_group
                 if self.has_moe_layers else None,
                 reduce_scatter=self.zero_reduce_scatter(),
+                hierarchical_reduce_scatter=self.zero_hierarchical_reduce_scatter(),
+                gradient_quantization=self.zero_gradient_quantization(),
+                persistent_gradient_buckets=self.zero_persistent_gradient_buckets(),
+                local_gradient_accumulation=self.zero_local_gradient_accumulation(),
                 overlap_comm=overlap_comm,
                 cpu_offload=self.zero_cpu_offload(),
+                offload_optimizer_config=self.zero_offload_optimizer(),
                 mpu=self.mpu,
                 postscale_gradients=self.postscale_gradients(),
                 gradient_predivide_factor=self.gradient_predivide_factor(),
@@ -1575,6 +1686,7 @@ class DeepSpeedEngine(Module):
                 ),
                 communication_data_type=self.communication_data_type,
                 elastic_checkpoint=self.zero_elastic_checkpoint(),
+                deferred_overflow_check=self.fp16_deferred_overflow_check(),
                 use_hpu=self.use_hpu,
                 no_cuda=self.no_cuda)
 
@@ -1590,9 +1702,11 @@ class DeepSpeedEngine(Module):
                     prefetch_bucket_size=self.zero_prefetch_bucket_size(),
                     max_reuse_distance=self.zero_max_reuse_distance(),
                     max_live_parameters=self.zero_max_live_parameters(),
+                    max_cached_traces=self.zero_max_cached_traces(),
                     param_persistence_threshold=self.zero_param_persistence_threshold(),
                     model_persistence_threshold=self.zero_model_persistence_threshold(),
                     offload_param_config=self.zero_offload_param(),
+                    weight_quantization_config=self.zero_weight_quantization(),
                     mpu=self.mpu,
                     use_hpu=self.use_hpu,
                     no_cuda=self.no_cuda)
@@ -1614,6 +1728,7 @@ class DeepSpeedEngine(Module):
                     prefetch_bucket_size=self.zero_prefetch_bucket_size(),
                     max_reuse_distance=self.zero_max_reuse_distance(),
                     max_live_parameters=self.zero_max_live_parameters(),
+                    max_cached_traces=self.zero_max_cached_traces(),
                     param_persistence_threshold=self.zero_param_persistence_threshold(),
                     model_persistence_threshold=self.zero_model_persistence_threshold(),
                     dp_process_group=self.data_parallel_group,
@@ -1621,6 +1736,8 @@ class DeepSpeedEngine(Module):
                     overlap_comm=self.zero_overlap_comm(),
                     offload_optimizer_config=self.zero_offload_optimizer(),
                     offload_param_config=self.zero_offload_param(),
+                    weight_quantization_config=self.zero_weight_quantization(),
+                    secondary_partition=self.zero_secondary_partition(),
                     sub_group_size=self.zero_sub_group_size(),
                     mpu=self.mpu,
                     postscale_gradients=self.postscale_gradients(),
@@ -2060,6 +2177,14 @@ class DeepSpeedEngine(Module):
                                 mpu=self.mpu)
         self.optimizer.step()
 
+        if self.bucket_size_tuner is not None:
+            self.bucket_size_tuner.step()
+
+        # the prefetch bucket size is left to the tuner until it is frozen
+        if self.prefetch_controller is not None and (self.bucket_size_tuner is None
+                                                     or self.bucket_size_tuner.frozen):
+            self.prefetch_controller.step()
+
         if hasattr(self.optimizer, '_global_grad_norm'):
             self._global_grad_norm = self.optimizer._global_grad_norm
 
@@ -2108,12 +2233,19 @@ class DeepSpeedEngine(Module):
                     # pipe_engine.train_batch()
                     self.lr_scheduler.step(increment=self.train_batch_size())
 
+        if (self.global_steps + 1) % self.steps_per_print() == 0:
+            self._read_deferred_overflows()
         if report_progress and (self.global_steps + 1) % self.steps_per_print() == 0:
             self._report_progress(self.global_steps + 1)
 
         self.global_steps += 1
         self.global_samples += self.train_batch_size()
 
+    def _read_deferred_overflows(self):
+        # with fp16 deferred_overflow_check, skipped steps are only counted on device
+        if hasattr(self.optimizer, "read_deferred_overflows"):
+            self.skipped_steps += self.optimizer.read_deferred_overflows()
+
     def step(self, lr_kwargs=None):
         r"""Execute the weight update step after forward and backward propagation
         on effective_train_batch.
@@ -2532,7 +2664,13 @@ class DeepSpeedEngine(Module):
         dist.all_gather(tensor_list, value, group=dp_group)
         return tensor_list
 
+    def _wait_overlapped_step(self):
+        # the weights of the last step may not be gathered yet
+        if hasattr(self.optimizer, "wait_overlapped_step"):
+            self.optimizer.wait_overlapped_step()
+
     def module_state_dict(self, destination=None, prefix="", keep_vars=False):
+        self._wait_overlapped_step()
         sd = self.module.state_dict(destination, prefix, keep_vars)
         return sd
 
@@ -2688,6 +2826,9 @@ class DeepSpeedEngine(Module):
         ckpt_file_pattern = self._get_ckpt_name(checkpoints_path,
                                                 tag,
                                                 mp_placeholder="*")
+        if isinstance(self.checkpoint_engine, PeerMemoryCheckpointEngine):
+            # the files of tags that are not persisted are only in memory
+            return self.checkpoint_engine.glob(ckpt_file_pattern)
         import glob
 
         ckpt_files = glob.glob(ckpt_file_pattern)
@@ -2721,6 +2862,12 @@ class DeepSpeedEngine(Module):
         before ``load_checkpoint()``.
         """
 
+        if tag is None and isinstance(
+                self.checkpoint_engine,
+                PeerMemoryCheckpointEngine) and not self.load_universal_checkpoint():
+            # 'latest' is only written for persisted tags
+            tag = self.checkpoint_engine.latest_tag()
+
         if tag is None:
             latest_tag = "latest_universal" if self.load_universal_checkpoint(
             ) else "latest"
@@ -2740,6 +2887,10 @@ class DeepSpeedEngine(Module):
                     )
                     return None, None
 
+        if isinstance(self.checkpoint_engine, PeerMemoryCheckpointEngine):
+            # bring the files of replaced ranks back from their buddies' memory
+            self.checkpoint_engine.restore(tag)
+
         if self.zero_optimization_partition_weights():
             # Prepare for checkpoint load by ensuring all parameters are partitioned
             self.optimizer.checkpoint_event_prologue()
@@ -2778,9 +2929,23 @@ class DeepSpeedEngine(Module):
         from deepspeed.runtime.state_dict_factory import SDLoaderFactory
 
         ckpt_list = self._get_all_ckpt_names(load_dir, tag)
+        checkpoint_engine = self.checkpoint_engine
+        # below ZeRO-3 the model states files are only saved by the first data
+        # parallel rank and are the same for all data parallel ranks, read them
+        # once per data parallel group and broadcast instead. With peer_memory
+        # checkpoints only the first data parallel rank keeps them in memory.
+        # ZeRO-3 saves a model states file per data parallel rank.
+        load_broadcast = self.checkpoint_load_broadcast() or isinstance(
+            self.checkpoint_engine,
+            PeerMemoryCheckpointEngine)
+        if load_broadcast and self.dp_world_size > 1 and \
+                not self.zero_optimization_partition_weights():
+            checkpoint_engine = BroadcastCheckpointEngine(self.checkpoint_engine,
+                                                          group=self.data_parallel_group,
+                                                          device=self.device)
         sd_loader = SDLoaderFactory.get_sd_loader(
             ckpt_list,
-            checkpoint_engine=self.checkpoint_engine, device=self.device)
+            checkpoint_engine=checkpoint_engine, device=self.device)
 
         is_pipe_parallel = isinstance(self.module, PipelineModule)
 
@@ -2999,6 +3164,7 @@ class DeepSpeedEngine(Module):
                     ckpt_name,
                     map_location='cpu',
                 )
+                decompress_state_dict(_state)
             else:
                 _state = {OPTIMIZER_STATE_DICT: None}
             zero_sd_list.append(_state)
@@ -3061,6 +3227,8 @@ class DeepSpeedEngine(Module):
         if self.zero_optimization_partition_weights():
             # Prepare for checkpoint save by ensuring all parameters are partitioned
             self.optimizer.checkpoint_event_prologue()
+        else:
+            self._wait_overlapped_step()
 
         rank = self.local_rank if self.use_node_local_storage() else self.global_rank
 
@@ -3105,13 +3273,26 @@ class DeepSpeedEngine(Module):
         # Save latest checkpoint tag
         self.checkpoint_engine.commit(tag)
         if save_latest and rank == 0:
-            with open(os.path.join(save_dir, 'latest'), 'w') as fd:
-                fd.write(tag)
+            # asynchronous engines call this once the files are persisted
+            self.checkpoint_engine.on_persisted(
+                tag,
+                lambda: self._save_latest_tag(save_dir,
+                                              tag))
 
         dist.barrier()
 
         return True
 
+    @staticmethod
+    def _save_latest_tag(save_dir, tag):
+        # replaced atomically, 'latest' is either the old or the new tag after a crash
+        latest_path = os.path.join(save_dir, 'latest')
+        with open(latest_path + '.tmp', 'w') as fd:
+            fd.write(tag)
+            fd.flush()
+            os.fsync(fd.fileno())
+        os.replace(latest_path + '.tmp', latest_path)
+
     def _get_non_moe_state_dict(self, full_state_dict):
         """
             Get the state dict of the non-moe layers
@@ -3259,6 +3440,8 @@ class DeepSpeedEngine(Module):
 
         save_path = self._get_ckpt_name(save_dir, tag)
 
+        self._read_deferred_overflows()
+
         zero_optimizer_state = self.zero_optimization() or self.bfloat16_enabled()
 
         # A hack to save the checkpointing directory. Pipeline parallelism overrides
@@ -3367,7 +3550,17 @@ class DeepSpeedEngine(Module):
 
     def _save_zero_checkpoint(self, save_path, tag):
         zero_checkpoint_name = self._get_zero_ckpt_name(save_path, tag)
-        zero_sd = dict(optimizer_state_dict=self.optimizer.state_dict(),
+        optimizer_state_dict = self.optimizer.state_dict()
+        compression = self.checkpoint_optimizer_state_compression()
+        if compression[CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC] != 'none' or \
+                compression[CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE]:
+            optimizer_state_dict = compress_optimizer_state_dict(
+                optimizer_state_dict,
+                codec=compression[CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_CODEC],
+                quantize_exp_avg_sq=compression[
+                    CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_QUANTIZE],
+                block_size=compression[CHECKPOINT_OPTIMIZER_STATE_COMPRESSION_BLOCK_SIZE])
+        zero_sd = dict(optimizer_state_dict=optimizer_state_dict,
                        ds_config=self.config,
                        ds_version=version)
 
@@ -3476,6 +3669,7 @@ class DeepSpeedEngine(Module):
                 )
                 return False
         else:
+            self._wait_overlapped_step()
             state_dict = self.module.state_dict()
 
         if dist.get_rank() == 0:
@@ -16,6 +16,8 @@
 #    https://github.com/NVIDIA/Megatron-LM/blob/master/fp16/loss_scaler.py
 #Commit: 93ab4bea59dc5cbf97c079d313741866af4deac9
 
+import torch
+
 INITIAL_LOSS_SCALE = 'init_scale'
 SCALE_WINDOW = 'scale_window'
 DELAYED_SHIFT = 'delayed_shift'
@@ -170,6 +172,110 @@ class DynamicLossScaler(LossScalerBase):
         self.cur_iter += 1
 
 
+class DeviceDynamicLossScaler(DynamicLossScaler):
+    """
+    :class:`DynamicLossScaler` that keeps the loss scale and the overflow state on ``device``,
+    so that no device to host synchronization is needed in a training step.
+
+    :meth:`update_scale` takes the overflow flag as a boolean device tensor and applies the same
+    rules as :class:`DynamicLossScaler` with tensor operations. The overflows since the last call
+    are counted on device and read back by the host only when it calls :meth:`read_overflows`,
+    which also raises if the scale had to be decreased below ``min_scale``.
+
+    Args:
+        device (torch.device): Device the loss scale and the overflow state are kept on.
+        Other arguments are the same as for :class:`DynamicLossScaler`.
+    """
+    def __init__(self, device, **kwargs):
+        super(DeviceDynamicLossScaler, self).__init__(**kwargs)
+        self.cur_scale = torch.tensor(float(self.cur_scale),
+                                      dtype=torch.float32,
+                                      device=device)
+        self.last_overflow_iter = torch.tensor(self.last_overflow_iter,
+                                               dtype=torch.long,
+                                               device=device)
+        self.cur_hysteresis = torch.tensor(self.cur_hysteresis,
+                                           dtype=torch.long,
+                                           device=device)
+        self.overflow_count = torch.zeros((), dtype=torch.long, device=device)
+        self.min_scale_overflow = torch.zeros((), dtype=torch.bool, device=device)
+
+    @classmethod
+    def from_scaler(cls, scaler, device):
+        """Returns a :class:`DeviceDynamicLossScaler` on ``device`` in the state of the
+        :class:`DynamicLossScaler` ``scaler``, e.g. one loaded from a checkpoint."""
+        device_scaler = cls(device,
+                            init_scale=float(scaler.cur_scale),
+                            scale_factor=scaler.scale_factor,
+                            scale_window=scaler.scale_window,
+                            min_scale=scaler.min_scale,
+                            delayed_shift=scaler.delayed_shift,
+                            consecutive_hysteresis=scaler.consecutive_hysteresis,
+                            raise_error_at_min_scale=scaler.raise_error_at_min_scale)
+        device_scaler.cur_iter = scaler.cur_iter
+        device_scaler.last_overflow_iter.fill_(int(scaler.last_overflow_iter))
+        device_scaler.cur_hysteresis.fill_(int(scaler.cur_hysteresis))
+        return device_scaler
+
+    def to_host_scaler(self):
+        """Returns a :class:`DynamicLossScaler` in the same state."""
+        scaler = DynamicLossScaler(
+            init_scale=self.cur_scale.item(),
+            scale_factor=self.scale_factor,
+            scale_window=self.scale_window,
+            min_scale=self.min_scale,
+            delayed_shift=self.delayed_shift,
+            consecutive_hysteresis=self.consecutive_hysteresis,
+            raise_error_at_min_scale=self.raise_error_at_min_scale)
+        scaler.cur_iter = self.cur_iter
+        scaler.last_overflow_iter = self.last_overflow_iter.item()
+        scaler.cur_hysteresis = self.cur_hysteresis.item()
+        return scaler
+
+    # `overflow` is a boolean device tensor indicating whether the gradient overflowed
+    def update_scale(self, overflow):
+        shift = overflow & ((self.delayed_shift == 1) | (self.cur_hysteresis == 1))
+        self.min_scale_overflow |= shift & (self.cur_scale == self.min_scale)
+        decreased_scale = torch.clamp(self.cur_scale / self.scale_factor,
+                                      min=self.min_scale)
+
+        window_end = ~overflow & (
+            (self.cur_iter - self.last_overflow_iter) % self.scale_window == 0)
+        if self.consecutive_hysteresis:
+            reset_hysteresis = ~overflow
+        else:
+            reset_hysteresis = window_end
+
+        self.cur_scale = torch.where(
+            shift,
+            decreased_scale,
+            torch.where(window_end,
+                        self.cur_scale * self.scale_factor,
+                        self.cur_scale))
+        self.cur_hysteresis = torch.where(
+            reset_hysteresis,
+            torch.full_like(self.cur_hysteresis,
+                            self.delayed_shift),
+            self.cur_hysteresis - (overflow & ~shift).long())
+        self.last_overflow_iter = torch.where(
+            overflow,
+            torch.full_like(self.last_overflow_iter,
+                            self.cur_iter),
+            self.last_overflow_iter)
+        self.overflow_count += overflow.long()
+        self.cur_iter += 1
+
+    def read_overflows(self):
+        """Returns the number of overflows since the last call, synchronizing with the device."""
+        overflow_count, min_scale_overflow = self.overflow_count.item(), self.min_scale_overflow.item()
+        self.overflow_count.zero_()
+        if min_scale_overflow and self.raise_error_at_min_scale:
+            raise Exception(
+                "Current loss scale already at minimum - cannot decrease scale anymore. Exiting run."
+            )
+        return overflow_count
+
+
 ##############################################################
 # Example usage below here -- assuming it's in a separate file
 ##############################################################
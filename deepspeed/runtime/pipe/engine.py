@@ -202,6 +202,8 @@ class PipelineEngine(DeepSpeedEngine):
                 'activation_checkpoint_interval']
 
         self.module.checkpoint_parallel_write_pipeline = self._config.checkpoint_parallel_write_pipeline
+        self.module.checkpoint_layer_workers = self._config.checkpoint_parallel_write_layer_workers
+        self.module.checkpoint_max_inflight_bytes = self._config.checkpoint_parallel_write_max_inflight_bytes
 
         if self.is_last_stage():
             self.loss_model = self.module.loss_fn
@@ -3,6 +3,8 @@ import glob
 
 import re as regex
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 import torch
@@ -14,12 +16,60 @@ from .. import utils as ds_utils
 from ..activation_checkpointing import checkpointing
 from .topology import PipeDataParallelTopology, PipelineParallelGrid
 from deepspeed.runtime.state_dict_factory import SDLoaderFactory
+from deepspeed.runtime.constants import CHECKPOINT_PARALLEL_WRITE_LAYER_WORKERS_DEFAULT, \
+    CHECKPOINT_PARALLEL_WRITE_MAX_INFLIGHT_BYTES_DEFAULT
 
 
 class PipelineError(Exception):
     """Errors related to the use of deepspeed.PipelineModule """
 
 
+class _LayerFileWindow:
+    """Runs layer file saves/loads on a thread pool while bounding the bytes
+    held by pending tasks.
+
+    ``make_room(nbytes)`` waits for the oldest tasks until ``nbytes`` more fit
+    in ``max_inflight_bytes`` and returns their ``(key, result)`` in submission
+    order, ``drain()`` does the same for all remaining tasks. A single task
+    larger than the limit is still run, alone. With ``num_workers <= 1`` tasks
+    run inline in ``submit``.
+    """
+    def __init__(self, num_workers, max_inflight_bytes):
+        assert max_inflight_bytes > 0, f"max_inflight_bytes must be positive, got {max_inflight_bytes}"
+        self.executor = ThreadPoolExecutor(
+            max_workers=num_workers,
+            thread_name_prefix="ds_layer_ckpt") if num_workers > 1 else None
+        self.max_inflight_bytes = max_inflight_bytes
+        self.pending = deque()
+        self.inflight_bytes = 0
+
+    def submit(self, nbytes, key, fn, *args, **kwargs):
+        if self.executor is None:
+            self.pending.append((key, fn(*args, **kwargs), nbytes))
+        else:
+            self.pending.append((key, self.executor.submit(fn, *args, **kwargs), nbytes))
+        self.inflight_bytes += nbytes
+
+    def _pop(self):
+        key, result, nbytes = self.pending.popleft()
+        if self.executor is not None:
+            result = result.result()
+        self.inflight_bytes -= nbytes
+        return key, result
+
+    def make_room(self, nbytes):
+        done = []
+        while self.pending and self.inflight_bytes + nbytes > self.max_inflight_bytes:
+            done.append(self._pop())
+        return done
+
+    def drain(self):
+        done = [self._pop() for _ in range(len(self.pending))]
+        if self.executor is not None:
+            self.executor.shutdown()
+        return done
+
+
 class LayerSpec:
     """Building block for specifying pipeline-parallel modules.
 
@@ -211,6 +261,10 @@ class PipelineModule(nn.Module):
         self.activation_checkpoint_interval = activation_checkpoint_interval
         self.activation_checkpoint_func = activation_checkpoint_func
 
+        # number of threads saving/loading layer files and bound on the bytes they hold
+        self.checkpoint_layer_workers = CHECKPOINT_PARALLEL_WRITE_LAYER_WORKERS_DEFAULT
+        self.checkpoint_max_inflight_bytes = CHECKPOINT_PARALLEL_WRITE_MAX_INFLIGHT_BYTES_DEFAULT
+
     def _build(self):
         specs = self._layer_specs
 
@@ -588,6 +642,10 @@ class PipelineModule(nn.Module):
         layer_list = self.forward_funcs[start:end]
 
         os.makedirs(save_dir, exist_ok=True)
+        # layer files are independent, up to checkpoint_layer_workers of them are
+        # serialized concurrently while their clones stay below checkpoint_max_inflight_bytes
+        window = _LayerFileWindow(self._layer_file_workers(checkpoint_engine),
+                                  self.checkpoint_max_inflight_bytes)
         for idx, layer in enumerate(layer_list):
             model_ckpt_path = self.ckpt_layer_path(save_dir, start + idx)
             if not hasattr(layer, 'state_dict'):
@@ -599,13 +657,43 @@ class PipelineModule(nn.Module):
             # It is expected that the garbage collector will reclaim the cloned tensor storage to avoid memory bloat.
             # See https://pytorch.org/docs/stable/notes/serialization.html#preserve-storage-sharing
             orig_state_dict = layer.state_dict()
+            nbytes = sum(v.numel() * v.element_size() for v in orig_state_dict.values())
+            window.make_room(nbytes)
             final_state_dict = type(orig_state_dict)(
                 {k: v.clone()
                  for k,
                  v in orig_state_dict.items()})
-            checkpoint_engine.save(final_state_dict, model_ckpt_path)
+            window.submit(nbytes,
+                          model_ckpt_path,
+                          checkpoint_engine.save,
+                          final_state_dict,
+                          model_ckpt_path)
+        window.drain()
+
+    def _layer_file_workers(self, checkpoint_engine):
+        # engines that are not thread safe handle one layer file at a time
+        thread_safe = getattr(checkpoint_engine, "thread_safe", False)
+        if self.checkpoint_layer_workers > 1 and not thread_safe:
+            logger.warning(f"{type(checkpoint_engine).__name__} is not thread safe, "
+                           "saving and loading one layer file at a time")
+            return 1
+        return self.checkpoint_layer_workers
+
+    def _load_layer_file(self, model_ckpt_list, checkpoint_engine):
+        mp_rank = self._grid.get_slice_parallel_rank()
+        mp_world_size = self._grid.get_slice_parallel_world_size()
+
+        sd_loader = SDLoaderFactory.get_sd_loader(model_ckpt_list,
+                                                  version=2.0,
+                                                  checkpoint_engine=checkpoint_engine,
+                                                  device=self.device)
+        load_path, checkpoint, _ = sd_loader.load(mp_world_size, mp_rank, module_key=None, is_pipe_parallel=True)
+        return checkpoint
 
     def load_state_dir(self, load_dir, checkpoint_engine, strict=True):
+        # layer files are read concurrently, and loaded into their layer in order
+        window = _LayerFileWindow(self._layer_file_workers(checkpoint_engine),
+                                  self.checkpoint_max_inflight_bytes)
         for idx, layer in enumerate(self.forward_funcs):
             # Functions, etc. will not have state_dicts
             if not hasattr(layer, 'load_state_dict'):
@@ -613,22 +701,16 @@ class PipelineModule(nn.Module):
 
             # get all checkpoint files for the layer.
             model_ckpt_list = self.ckpt_layer_path_list(load_dir, idx)
-            mp_rank = self._grid.get_slice_parallel_rank()
-            mp_world_size = self._grid.get_slice_parallel_world_size()
-
-            sd_loader = SDLoaderFactory.get_sd_loader(
-                model_ckpt_list,
-                version=2.0,
-                checkpoint_engine=checkpoint_engine,
-                device=self.device)
-            load_path, checkpoint, _ = sd_loader.load(mp_world_size, mp_rank, module_key=None, is_pipe_parallel=True)
-
-            layer.load_state_dict(checkpoint)
-
-            # if self._grid.data_parallel_id == 0:
-            #     logger.info(
-            #         f'RANK={self.global_rank} Loaded layer={idx+self._local_start} file={load_path}'
-            #     )
+            nbytes = sum(checkpoint_engine.get_size(f) for f in model_ckpt_list)
+            for layer_idx, checkpoint in window.make_room(nbytes):
+                self.forward_funcs[layer_idx].load_state_dict(checkpoint)
+            window.submit(nbytes,
+                          idx,
+                          self._load_layer_file,
+                          model_ckpt_list,
+                          checkpoint_engine)
+        for layer_idx, checkpoint in window.drain():
+            self.forward_funcs[layer_idx].load_state_dict(checkpoint)
 
         self._synchronize_tied_weights()
 
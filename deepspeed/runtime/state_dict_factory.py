@@ -3,7 +3,6 @@ Copyright 2020 The Microsoft DeepSpeed Team
 '''
 
 import torch
-import os
 import copy
 import collections
 import json
@@ -101,7 +100,8 @@ class SDLoaderBase(ABC):
 
         merge_count = 1
         if num_ckpt == mp_world_size:
-            assert os.path.exists(load_path)
+            # the file may only be held in memory by the checkpoint engine,
+            # which raises if it does not exist
             #logger.info(f'rank: {mp_rank} loading checkpoint: {load_path}')
             sd = self.checkpoint_engine.load(load_path, map_location=self.map_location)
 
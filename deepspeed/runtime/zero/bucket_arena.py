@@ -0,0 +1,50 @@
+"""
+Copyright (c) Microsoft Corporation
+Licensed under the MIT license.
+"""
+
+import torch
+
+
+class BucketArena:
+    """Named flat buffers on one device that are reused across steps.
+
+    ``get()`` returns a view of the buffer with a given name, which is only
+    reallocated when a larger view is requested. Once the largest bucket of
+    each name has been seen, typically after the first step, the buffers
+    keep their size: no memory is allocated or freed per step, which avoids
+    allocator fragmentation and keeps tensor shapes stable for graph mode
+    accelerators.
+    """
+    def __init__(self, device):
+        self.device = device
+        self.buffers = {}
+
+    def get(self, name, numel, dtype):
+        """A flat view of ``numel`` elements of the ``dtype`` buffer ``name``.
+        The view is valid until the next ``get()`` of the same buffer."""
+        buffer = self.buffers.get((name, dtype))
+        if buffer is None or buffer.numel() < numel:
+            buffer = torch.empty(int(numel), dtype=dtype, device=self.device)
+            self.buffers[(name, dtype)] = buffer
+        return buffer.narrow(0, 0, int(numel))
+
+    def flatten(self, name, tensors, numel=None):
+        """Copies ``tensors`` into a flat view of the buffer ``name``, zero
+        padded to ``numel`` elements if given."""
+        total_numel = sum(tensor.numel() for tensor in tensors)
+        numel = total_numel if numel is None else numel
+        assert numel >= total_numel, f"cannot flatten {total_numel} elements into {numel}"
+        flat = self.get(name, numel, tensors[0].dtype)
+        torch.cat([tensor.contiguous().view(-1) for tensor in tensors],
+                  out=flat.narrow(0,
+                                  0,
+                                  total_numel))
+        if numel > total_numel:
+            flat.narrow(0, total_numel, numel - total_numel).zero_()
+        return flat
+
+    def memory_bytes(self):
+        """The memory held by the arena."""
+        return sum(buffer.numel() * buffer.element_size()
+                   for buffer in self.buffers.values())
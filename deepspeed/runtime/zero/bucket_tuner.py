@@ -0,0 +1,159 @@
+"""
+Copyright (c) Microsoft Corporation
+Licensed under the MIT license.
+"""
+
+import statistics
+
+import torch
+from deepspeed import comm as dist
+from deepspeed.utils import log_dist
+
+# collectives whose latencies determine each bucket size
+REDUCE_OPS = ["all_reduce", "reduce", "reduce_scatter", "reduce_scatter_base"]
+GATHER_OPS = ["all_gather", "all_gather_base"]
+BUCKET_OPS = {
+    "reduce_bucket_size": REDUCE_OPS,
+    "allgather_bucket_size": GATHER_OPS,
+    "prefetch_bucket_size": GATHER_OPS,
+}
+
+
+def fit_latency_model(samples):
+    """Least squares fit of ``latency = launch + msg_size * per_byte`` to the
+    (msg_size in bytes, latency) samples. The median latency of each message
+    size is used, which discards warmup outliers. Returns
+    (launch, per_byte), or None if the samples cover less than two message
+    sizes or do not grow with the message size."""
+    latencies = {}
+    for msg_size, latency in samples:
+        latencies.setdefault(msg_size, []).append(latency)
+    if len(latencies) < 2:
+        return None
+    sizes = list(latencies.keys())
+    medians = [statistics.median(latencies[size]) for size in sizes]
+
+    mean_size = sum(sizes) / len(sizes)
+    mean_latency = sum(medians) / len(medians)
+    covariance = 0.0
+    for size, latency in zip(sizes, medians):
+        covariance += (size - mean_size) * (latency - mean_latency)
+    variance = sum((size - mean_size)**2 for size in sizes)
+    per_byte = covariance / variance
+    if per_byte <= 0:
+        return None
+    launch = max(0.0, mean_latency - per_byte * mean_size)
+    return launch, per_byte
+
+
+def pick_bucket_size(launch,
+                     per_byte,
+                     launch_overhead_fraction,
+                     bytes_per_element,
+                     min_bucket_size,
+                     max_bucket_size):
+    """Smallest bucket size, in elements, whose collective spends at most
+    ``launch_overhead_fraction`` of its latency on the launch overhead.
+    Smaller buckets start communicating earlier and overlap better with the
+    backward pass, larger ones amortize the launch overhead."""
+    transfer_fraction = 1 - launch_overhead_fraction
+    msg_size = launch * transfer_fraction / (launch_overhead_fraction * per_byte)
+    bucket_size = int(msg_size / bytes_per_element)
+    return min(max(bucket_size, min_bucket_size), max_bucket_size)
+
+
+class ZeroBucketSizeTuner:
+    """Tunes the bucket sizes of a ZeRO optimizer during the first
+    ``tuning_steps`` steps.
+
+    The bucket sizes are swept geometrically from the configured sizes down
+    to ``min_bucket_size`` while the comms logger records the latency of the
+    collectives. A latency model fit per bucket then gives the smallest
+    bucket size that amortizes the launch overhead, see pick_bucket_size().
+    The sizes are agreed on by all ranks, frozen and logged. The configured
+    sizes are upper bounds, as they bound the memory of the buckets.
+    """
+    def __init__(self, optimizer, tuning_config, device):
+        self.optimizer = optimizer
+        self.tuning_steps = tuning_config.tuning_steps
+        self.min_bucket_size = tuning_config.min_bucket_size
+        self.launch_overhead_fraction = tuning_config.launch_overhead_fraction
+        self.device = device
+        self.bytes_per_element = torch.tensor([], dtype=optimizer.dtype).element_size()
+        self.max_bucket_sizes = optimizer.get_bucket_sizes()
+        self.num_steps = 0
+        self.frozen = False
+
+        comms_logger = dist.comms_logger
+        self.comms_logger_state = (comms_logger.enabled, comms_logger.prof_all)
+        comms_logger.enabled = True
+        comms_logger.prof_all = True
+        # only the latencies recorded while tuning are used
+        self.prior_counts = {}
+        for record_name, msg_sizes in comms_logger.comms_dict.items():
+            for msg_size, record in msg_sizes.items():
+                self.prior_counts[(record_name, msg_size)] = len(record[1])
+        self.optimizer.set_bucket_sizes(**self._sweep_bucket_sizes(0))
+
+    def _sweep_bucket_sizes(self, step):
+        sizes = {}
+        for name, max_size in self.max_bucket_sizes.items():
+            min_size = min(self.min_bucket_size, max_size)
+            ratio = step / (self.tuning_steps - 1)
+            if max_size > 0:
+                sizes[name] = round(max_size * (min_size / max_size)**ratio)
+            else:
+                sizes[name] = 0
+        return sizes
+
+    def _samples(self, ops):
+        samples = []
+        for record_name, msg_sizes in dist.comms_logger.comms_dict.items():
+            # with comms logger debug, record names end with the caller
+            if record_name.split(" |")[0] not in ops:
+                continue
+            for msg_size, record in msg_sizes.items():
+                latencies = record[1][self.prior_counts.get((record_name, msg_size), 0):]
+                samples.extend((msg_size, latency) for latency in latencies)
+        return samples
+
+    def step(self):
+        """Called after every optimizer step until the sizes are frozen."""
+        if self.frozen:
+            return
+        self.num_steps += 1
+        if self.num_steps < self.tuning_steps:
+            self.optimizer.set_bucket_sizes(**self._sweep_bucket_sizes(self.num_steps))
+        else:
+            self._freeze()
+
+    def _freeze(self):
+        bucket_sizes = {}
+        for name, max_size in self.max_bucket_sizes.items():
+            model = fit_latency_model(self._samples(BUCKET_OPS[name]))
+            if model is None:
+                bucket_sizes[name] = max_size
+            else:
+                bucket_sizes[name] = pick_bucket_size(
+                    *model,
+                    self.launch_overhead_fraction,
+                    self.bytes_per_element,
+                    min(self.min_bucket_size,
+                        max_size),
+                    max_size)
+
+        # all ranks must use the same buckets, the slowest rank decides
+        names = list(bucket_sizes.keys())
+        agreed = torch.tensor([bucket_sizes[name] for name in names],
+                              dtype=torch.long,
+                              device=self.device)
+        dist.all_reduce(agreed, op=dist.ReduceOp.MAX)
+        bucket_sizes = dict(zip(names, agreed.tolist()))
+        self.optimizer.set_bucket_sizes(**bucket_sizes)
+
+        dist.comms_logger.enabled, dist.comms_logger.prof_all = self.comms_logger_state
+        self.frozen = True
+        log_dist(
+            f"[BucketTuner] Tuned ZeRO bucket sizes after {self.num_steps} steps: "
+            f"{self.optimizer.get_bucket_sizes()} (configured {self.max_bucket_sizes})",
+            ranks=[0])
@@ -20,13 +20,22 @@ ZeRO optimization should be enabled as:
     "stage": [0|1|2],
     "stage3_max_live_parameters" : 1000000000,
     "stage3_max_reuse_distance" : 1000000000,
+    "stage3_max_cached_traces" : 1,
+    "stage3_secondary_partition" : [true|false],
     "allgather_partitions": [true|false],
     "allgather_bucket_size": 500000000,
     "max_group_size": 4e9,
     "reduce_scatter": [true|false],
+    "hierarchical_reduce_scatter": [true|false],
+    "gradient_quantization": {...},
+    "weight_quantization": {...},
+    "bucket_size_tuning": {...},
+    "prefetch_control": {...},
     "contiguous_gradients" : [true|false]
     "overlap_comm": [true|false],
     "reduce_bucket_size": 500000000,
+    "persistent_gradient_buckets": [true|false],
+    "local_gradient_accumulation": [true|false],
     "load_from_fp32_weights": [true|false],
     "cpu_offload": [true|false] (deprecated),
     "cpu_offload_params" : [true|false] (deprecated),
@@ -80,6 +89,119 @@ class ZeroStageEnum(int, Enum):
     max_stage = 3
 
 
+class GradientQuantizationDtypeEnum(str, Enum):
+    """ Enum for the data types gradients can be quantized to """
+    int8 = "int8"
+    fp8 = "fp8"
+
+
+class DeepSpeedZeroGradientQuantizationConfig(DeepSpeedConfigModel):
+    """ Set options for quantized gradient reduction. Valid with stage 1 and 2. """
+
+    enabled: bool = False
+    """ Quantizes the gradient buckets before communicating them. """
+
+    dtype: GradientQuantizationDtypeEnum = "int8"
+    """
+    Data type the gradients are communicated in. Supported options are `int8`
+    and `fp8` (e4m3).
+    """
+
+    block_size: int = Field(256, gt=0)
+    """ Number of gradient elements that share one fp32 scale. """
+
+    error_feedback: bool = False
+    """
+    Adds the quantization error of a gradient to the gradient of the next
+    step. Only applies to stage 2 with ``contiguous_gradients``.
+    """
+
+
+class DeepSpeedZeroWeightQuantizationConfig(DeepSpeedConfigModel):
+    """ Set options for the quantized parameter all-gather of stage 3. """
+
+    enabled: bool = False
+    """ Quantizes the parameter partitions gathered for the forward pass. """
+
+    dtype: GradientQuantizationDtypeEnum = "int8"
+    """
+    Data type the parameters are communicated in. Supported options are
+    `int8` and `fp8` (e4m3).
+    """
+
+    block_size: int = Field(256, gt=0)
+    """ Number of parameter elements that share one fp32 scale. """
+
+
+class DeepSpeedZeroBucketSizeTuningConfig(DeepSpeedConfigModel):
+    """ Set options for the runtime tuning of the ZeRO bucket sizes. """
+
+    enabled: bool = False
+    """
+    Tunes ``reduce_bucket_size`` and ``allgather_bucket_size`` (stage 1 and
+    2) or ``prefetch_bucket_size`` (stage 3) from the collective latencies
+    measured during the first steps. The configured sizes are upper bounds.
+    """
+
+    tuning_steps: int = Field(10, gt=1)
+    """
+    Number of steps the bucket sizes are swept over before they are frozen.
+    """
+
+    min_bucket_size: int = Field(pp_int(1e6), gt=0)
+    """ Smallest bucket size, in elements, that is swept and selected. """
+
+    launch_overhead_fraction: float = Field(0.1, gt=0, lt=1)
+    """
+    Largest fraction of the latency of a bucket collective spent on the
+    launch overhead. Smaller values select larger buckets.
+    """
+
+
+class DeepSpeedZeroPrefetchControlConfig(DeepSpeedConfigModel):
+    """ Set options for the adaptive control of the ZeRO stage 3 prefetch. """
+
+    enabled: bool = False
+    """
+    Adapts ``stage3_prefetch_bucket_size`` and ``stage3_max_live_parameters``
+    after every step from the peak device memory and the fraction of
+    parameters that were gathered on demand instead of prefetched.
+    """
+
+    min_prefetch_bucket_size: int = Field(pp_int(1e6), ge=0)
+    """ Lower bound of the prefetch bucket size. """
+
+    max_prefetch_bucket_size: Optional[int] = Field(None, ge=0)
+    """
+    Upper bound of the prefetch bucket size, defaults to
+    ``stage3_prefetch_bucket_size``.
+    """
+
+    min_live_parameters: int = Field(pp_int(1e7), ge=0)
+    """ Lower bound of the live parameter budget. """
+
+    max_live_parameters: Optional[int] = Field(None, ge=0)
+    """
+    Upper bound of the live parameter budget, defaults to
+    ``stage3_max_live_parameters``.
+    """
+
+    memory_headroom: float = Field(0.1, ge=0, lt=1)
+    """
+    Fraction of the device memory to keep free at the peak of a step. The
+    limits shrink when less memory is free.
+    """
+
+    max_exposed_fraction: float = Field(0.05, ge=0, le=1)
+    """
+    Largest fraction of the gathered parameter elements that may be fetched
+    on demand. The limits grow while more are.
+    """
+
+    adjust_factor: float = Field(1.5, gt=1)
+    """ Factor the limits grow or shrink by per step. """
+
+
 class DeepSpeedZeroConfig(DeepSpeedConfigModel):
     """
     Sets parameters for ZeRO optimizations.
@@ -103,12 +225,69 @@ class DeepSpeedZeroConfig(DeepSpeedConfigModel):
     Uses reduce or reduce scatter instead of allreduce to average gradients
     """
 
+    hierarchical_reduce_scatter: bool = False
+    """
+    Stage 1 and 2 optimization for multi-node training that averages gradients
+    in two levels: a reduce-scatter within the node, an allreduce across nodes
+    among the ranks with the same local rank and an allgather within the node.
+    Divides the inter-node traffic by the number of data parallel ranks per node.
+    """
+
+    gradient_quantization: Optional[DeepSpeedZeroGradientQuantizationConfig] = None
+    """
+    Stage 1 and 2 optimization that communicates gradient buckets as blockwise
+    quantized int8 or fp8 values with per-block scales, received gradients are
+    dequantized and summed in fp32. Expects a dictionary containing values for
+    :any:`DeepSpeedZeroGradientQuantizationConfig`.
+    """
+
+    weight_quantization: Optional[DeepSpeedZeroWeightQuantizationConfig] = None
+    """
+    Stage 3 optimization that all-gathers the parameters of the forward pass
+    as blockwise quantized int8 or fp8 values with per-block scales. The
+    partitions and the backward all-gathers stay in full precision. Expects a
+    dictionary containing values for :any:`DeepSpeedZeroWeightQuantizationConfig`.
+    """
+
     reduce_bucket_size: int = Field(pp_int(5e8), ge=0)
     """
     Number of elements reduced/allreduced at a time. Limits the memory required
     for the allgather for large model sizes
     """
 
+    local_gradient_accumulation: bool = False
+    """
+    Stage 2 optimization for gradient accumulation that sums the gradients of
+    the micro-steps before the accumulation boundary in a local buffer and
+    reduces them once at the boundary, instead of reducing the gradients of
+    every micro-step. Divides the gradient traffic by
+    ``gradient_accumulation_steps`` at the cost of a buffer of the size of the
+    bit16 model.
+    """
+
+    persistent_gradient_buckets: bool = False
+    """
+    Stage 1 and 2 optimization that keeps the gradient buckets (IPG buffers,
+    flattened allreduce buckets and padded gradient partitions) allocated and
+    reuses them across steps instead of allocating them every step. Avoids
+    allocator churn and fragmentation at the cost of keeping the buckets
+    allocated during the forward pass.
+    """
+
+    bucket_size_tuning: Optional[DeepSpeedZeroBucketSizeTuningConfig] = None
+    """
+    Tunes the bucket sizes at runtime from the collective latencies recorded
+    by the comms logger during the first steps. Expects a dictionary
+    containing values for :any:`DeepSpeedZeroBucketSizeTuningConfig`.
+    """
+
+    prefetch_control: Optional[DeepSpeedZeroPrefetchControlConfig] = None
+    """
+    Adapts the stage 3 prefetch bucket size and live parameter budget at
+    runtime. Expects a dictionary containing values for
+    :any:`DeepSpeedZeroPrefetchControlConfig`.
+    """
+
     allgather_partitions: bool = True
     """
     Chooses between allgather collective or a series of broadcast collectives
@@ -234,6 +413,23 @@ class DeepSpeedZeroConfig(DeepSpeedConfigModel):
     parameters. Smaller values use less memory, but perform more communication.
     """
 
+    max_cached_traces: int = Field(1, ge=1, alias="stage3_max_cached_traces")
+    """
+    Number of module execution traces kept for prefetching. When the execution
+    order diverges from the current trace, e.g. because of data dependent
+    control flow, prefetching continues with a cached trace that matches the
+    modules executed so far. The default of 1 invalidates the trace instead.
+    """
+
+    secondary_partition: bool = Field(False, alias="stage3_secondary_partition")
+    """
+    Keeps a secondary partition of the parameters released in the forward
+    pass, sharded across the ranks of the node only, so that the backward pass
+    gathers them within the node instead of across nodes. Costs up to the size
+    of the bit16 model divided by the number of ranks per node in memory until
+    the end of the backward pass.
+    """
+
     gather_16bit_weights_on_model_save: bool = Field(
         False,
         alias="stage3_gather_16bit_weights_on_model_save")
@@ -1,10 +1,12 @@
+import bisect
+
 import torch
 
 from deepspeed import comm as dist
 
 
 def print_rank_0(message):
-    if dist.get_rank() == 0:
+    if not dist.is_initialized() or dist.get_rank() == 0:
         print(message)
 
 
@@ -15,7 +17,16 @@ class ContiguousMemoryAllocator(object):
         #address to contiguous size available
         self.contiguous_sizes = {}
 
-        self.contiguous_sizes[0] = size
+        #end address to address of the contiguous free blocks, to coalesce
+        #a released block with the free block before it
+        self.contiguous_ends = {}
+
+        #(size, address) of the contiguous free blocks in ascending order,
+        #for best fit allocation. The best fit lookup is a O(log n) bisect,
+        #inserting and removing a block shifts the list and is O(n) memmove
+        self.contiguous_blocks = []
+
+        self._add_free_block(0, size)
 
         #tensor id to its address
         self.tensor_addresses = {}
@@ -133,7 +144,7 @@ class ContiguousMemoryAllocator(object):
     #this call reassigns the data of all the parameters using the tensor buffers
     def _reset_param_data(self):
         for id, tensor in self.tensor_map.items():
-            for param in self.id_to_params[id]:
+            for param in self.id_to_params.get(id, []):
                 param.data = tensor.narrow(0,
                                            0,
                                            param.numel()).view(param.data.shape).data
@@ -156,100 +167,82 @@ class ContiguousMemoryAllocator(object):
         self._consolidate_address(address, contiguous_size)
         self.largest_contiguous = self._largest_contiguous()
 
+    def _add_free_block(self, address, size):
+        self.contiguous_sizes[address] = size
+        self.contiguous_ends[address + size] = address
+        bisect.insort(self.contiguous_blocks, (size, address))
+
+    def _remove_free_block(self, address):
+        size = self.contiguous_sizes.pop(address)
+        del self.contiguous_ends[address + size]
+        del self.contiguous_blocks[bisect.bisect_left(self.contiguous_blocks,
+                                                      (size,
+                                                       address))]
+        return size
+
     def _consolidate_address(self, address, contiguous_size):
 
         #consolidate next buffer
         end_address = address + contiguous_size
         if end_address in self.contiguous_sizes:
-            contiguous_size += self.contiguous_sizes[end_address]
-            del self.contiguous_sizes[end_address]
+            contiguous_size += self._remove_free_block(end_address)
 
         #consolidate previous buffer
-        for addr, size in self.contiguous_sizes.items():
-            if addr + size == address:
-                del self.contiguous_sizes[addr]
-                contiguous_size += size
-                address = addr
-                break
-
-        self.contiguous_sizes[address] = contiguous_size
-
+        if address in self.contiguous_ends:
+            previous_address = self.contiguous_ends[address]
+            contiguous_size += self._remove_free_block(previous_address)
+            address = previous_address
+
+        self._add_free_block(address, contiguous_size)
+
+    def _move(self, src_address, dest_address, size):
+        #copies in chunks that do not overlap when moving a tensor by less than its size
+        chunk_size = src_address - dest_address
+        offset = 0
+        while offset < size:
+            copy_size = min(chunk_size, size - offset)
+            dest_buffer = self.buffer.narrow(0, dest_address + offset, copy_size)
+            src_buffer = self.buffer.narrow(0, src_address + offset, copy_size)
+            dest_buffer.data.copy_(src_buffer.data)
+            offset += copy_size
+
+    #moves all tensors to the start of the buffer in a single pass, which
+    #leaves a single contiguous free block at the end
     def _defragment_memory(self):
-        empty_addresses = sorted(self.contiguous_sizes.keys())
-        tensor_addresses = sorted(self.tensor_addresses.values())
-
-        tensor_index = 0
-
-        while tensor_index < len(tensor_addresses):
-
-            empty_addr = empty_addresses[0]
-            empty_size = self.contiguous_sizes[empty_addr]
-
-            tensor_addr = tensor_addresses[tensor_index]
-            tensor_size = self.tensor_sizes[tensor_addr]
+        dest_address = 0
+        for tensor_addr in sorted(self.tensor_ids.keys()):
             tensor_id = self.tensor_ids[tensor_addr]
-            tensor = self.tensor_map[self.tensor_ids[tensor_addr]]
+            tensor_size = self.tensor_sizes[tensor_addr]
+            tensor = self.tensor_map[tensor_id]
 
             assert tensor_size == tensor.numel(), \
                 "Size mismatch. {tensor_size} is allocated at addr {tensor_addr} but tensor size is {tensor.numel()} "
 
-            assert empty_addr != tensor_addr, \
-                f"Cannot have same empty address {empty_addr} and tensor address {tensor_addr}"
-
-            if empty_addr < tensor_addr:
-
-                if empty_size >= tensor_size:
-                    dest_buffer = self.buffer.narrow(0, empty_addr, tensor_size)
-                    src_buffer = self.buffer.narrow(0, tensor_addr, tensor_size)
-                    dest_buffer.data.copy_(src_buffer.data)
-                else:
+            if dest_address < tensor_addr:
+                self._move(tensor_addr, dest_address, tensor_size)
+                tensor.data = self.buffer.narrow(0, dest_address, tensor_size).data
 
-                    #print_rank_0(f'empty addr : {empty_addr}, empty size {empty_size} tensor addr {tensor_addr} tensor size {tensor_size}')
-                    src_addr = tensor_addr
-                    dest_addr = empty_addr
-                    while src_addr < (tensor_addr + tensor_size):
-                        copy_size = min(empty_size, tensor_addr + tensor_size - src_addr)
+                del self.tensor_ids[tensor_addr]
+                del self.tensor_sizes[tensor_addr]
+                self.tensor_ids[dest_address] = tensor_id
+                self.tensor_sizes[dest_address] = tensor_size
+                self.tensor_addresses[tensor_id] = dest_address
 
-                        dest_buffer = self.buffer.narrow(0, dest_addr, copy_size)
-                        src_buffer = self.buffer.narrow(0, src_addr, copy_size)
+            dest_address += tensor_size
 
-                        dest_buffer.data.copy_(src_buffer.data)
-
-                        src_addr += copy_size
-                        dest_addr += copy_size
-
-                self._replace_old_address_with_new(tensor_id, empty_addr)
-
-                tensor_index += 1
-
-            else:
-                tensor_index += 1
-
-            empty_addresses = sorted(self.contiguous_sizes.keys())
-
-    def _replace_old_address_with_new(self, tensor_id, new_address):
-
-        tensor = self.tensor_map[tensor_id]
-        tensor_size = tensor.numel()
-        tensor.data = self.buffer.narrow(0, new_address, tensor_size).data
-
-        self._release_tensor(tensor_id)
-        self._mark_as_occupied(new_address, tensor_size)
-
-        self.tensor_ids[new_address] = tensor_id
-        self.tensor_map[tensor_id] = tensor
-        self.tensor_addresses[tensor_id] = new_address
-        self.tensor_sizes[new_address] = tensor_size
+        self.contiguous_sizes = {}
+        self.contiguous_ends = {}
+        self.contiguous_blocks = []
+        if dest_address < self.total_size:
+            self._add_free_block(dest_address, self.total_size - dest_address)
+        self.largest_contiguous = self._largest_contiguous()
 
+    #best fit: the smallest free block that is large enough, the lowest
+    #address among blocks of the same size
     def _get_new_tensor_address(self, size):
-        tensor_address = None
-        for address, contiguous_size in self.contiguous_sizes.items():
-            if contiguous_size >= size and \
-                    (tensor_address is None or \
-                    contiguous_size < self.contiguous_sizes[tensor_address]):
-                tensor_address = address
-        assert tensor_address is not None, "address cannot be None"
-        return tensor_address
+        index = bisect.bisect_left(self.contiguous_blocks, (size, -1))
+        assert index < len(self.contiguous_blocks), "address cannot be None"
+        return self.contiguous_blocks[index][1]
 
     def _get_new_tensor(self, address, size):
         available_contiguous_size = self.contiguous_sizes[address]
@@ -270,16 +263,15 @@ class ContiguousMemoryAllocator(object):
         return new_tensor
 
     def _largest_contiguous(self):
-        if len(self.contiguous_sizes) > 0:
-            return max([size for _, size in self.contiguous_sizes.items()])
+        if len(self.contiguous_blocks) > 0:
+            return self.contiguous_blocks[-1][0]
         else:
             return 0
 
     def _mark_as_occupied(self, address, size):
-        available_contiguous_size = self.contiguous_sizes[address]
-        del self.contiguous_sizes[address]
+        available_contiguous_size = self._remove_free_block(address)
 
         if available_contiguous_size != size:
-            self.contiguous_sizes[address + size] = available_contiguous_size - size
+            self._add_free_block(address + size, available_contiguous_size - size)
 
         self.largest_contiguous = self._largest_contiguous()
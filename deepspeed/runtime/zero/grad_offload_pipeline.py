@@ -0,0 +1,95 @@
+"""
+Copyright (c) Microsoft Corporation
+Licensed under the MIT license.
+"""
+
+import queue
+import threading
+
+import torch
+
+
+class GradientOffloadPipeline:
+    """Copies gradients from the device to CPU tensors through a pool of
+    pinned staging buffers.
+
+    ``copy()`` splits a gradient into chunks of at most ``buffer_numel``
+    elements and issues an asynchronous device-to-host copy of each chunk into
+    a free staging buffer. A worker thread waits for each copy and writes or
+    adds the chunk into its CPU destination, then frees the staging buffer.
+    Device copies and host accumulation thus overlap with the backward pass,
+    ``copy()`` only blocks when all staging buffers are in use.
+    """
+    def __init__(self, buffer_count, buffer_numel, dtype, device, use_hpu=False):
+        self.buffer_numel = buffer_numel
+        self.device = device
+        self.use_hpu = use_hpu
+        self.buffers = []
+        self.free_buffers = queue.Queue()
+        for index in range(buffer_count):
+            zeros = torch.zeros(buffer_numel, dtype=dtype)
+            self.buffers.append(
+                zeros.pin_memory(device) if use_hpu else zeros.pin_memory())
+            self.free_buffers.put(index)
+
+        self.tasks = queue.Queue()
+        self.error = None
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def _record_event(self):
+        if self.use_hpu:
+            import habana_frameworks.torch as ht
+            event = ht.hpu.Event()
+        elif torch.cuda.is_available():
+            event = torch.cuda.Event()
+        else:
+            return None
+        event.record()
+        return event
+
+    def copy(self, src, dest, accumulate, on_done=None):
+        """Copies (or adds if ``accumulate``) the flat device tensor ``src``
+        into the flat CPU tensor ``dest``. ``on_done(dest)`` is called by the
+        worker thread once all of ``dest`` is written."""
+        assert src.numel() == dest.numel()
+        for offset in range(0, src.numel(), self.buffer_numel):
+            numel = min(self.buffer_numel, src.numel() - offset)
+            index = self.free_buffers.get()
+            staging = self.buffers[index].narrow(0, 0, numel)
+            staging.copy_(src.narrow(0, offset, numel), non_blocking=True)
+            last = offset + numel == src.numel()
+            self.tasks.put((index,
+                            self._record_event(),
+                            dest.narrow(0,
+                                        offset,
+                                        numel),
+                            accumulate,
+                            dest if last else None,
+                            on_done if last else None))
+
+    def _run(self):
+        while True:
+            index, event, dest, accumulate, full_dest, on_done = self.tasks.get()
+            try:
+                if event is not None:
+                    event.synchronize()
+                staging = self.buffers[index].narrow(0, 0, dest.numel())
+                if accumulate:
+                    dest.add_(staging)
+                else:
+                    dest.copy_(staging)
+                if on_done is not None:
+                    on_done(full_dest)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.free_buffers.put(index)
+                self.tasks.task_done()
+
+    def synchronize(self):
+        """Waits until all gradients issued so far are written."""
+        self.tasks.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
@@ -0,0 +1,460 @@
+"""
+Copyright (c) Microsoft Corporation
+Licensed under the MIT license.
+
+Per-rank peak memory planner for ZeRO configs. Unlike the
+``estimate_zero*_model_states_mem_needs*`` estimators, which count model
+states only, the planner also accounts for the communication buckets,
+gathered ZeRO-3 parameters, step buffers, activations (with activation
+checkpointing), pipeline buffers and allocator fragmentation.
+
+The model is built on the meta device, so planning needs no accelerator and
+no memory for the parameters. Example::
+
+    ds_mem_plan --model my_models:build_gpt --inputs my_models:sample_batch \\
+        --num_gpus 8 --config zero2.json zero3.json
+"""
+
+import argparse
+import importlib
+import json
+import math
+
+import torch
+from deepspeed.runtime.config import (get_fp16_enabled,
+                                      get_bfloat16_enabled,
+                                      get_gradient_accumulation_steps,
+                                      get_train_micro_batch_size_per_gpu)
+from deepspeed.runtime.zero.config import get_zero_config, ZeroStageEnum
+from deepspeed.runtime.zero.offload_config import OffloadDeviceEnum
+from deepspeed.runtime.activation_checkpointing.config import ACT_CHKPT, DeepSpeedActivationCheckpointingConfig
+
+# bytes per parameter of Adam's momentum and variance
+OPTIMIZER_STATE_BYTES = 8
+
+GPU = "gpu"
+CPU = "cpu"
+
+
+def build_meta_model(model_fn, *args, **kwargs):
+    """Builds the model returned by ``model_fn(*args, **kwargs)`` on the meta
+    device, without allocating memory for its parameters."""
+    with torch.device("meta"):
+        return model_fn(*args, **kwargs)
+
+
+def _tensor_bytes(tensors):
+    if torch.is_tensor(tensors):
+        return tensors.numel() * tensors.element_size()
+    if isinstance(tensors, (list, tuple)):
+        return sum(_tensor_bytes(tensor) for tensor in tensors)
+    if isinstance(tensors, dict):
+        return sum(_tensor_bytes(tensor) for tensor in tensors.values())
+    return 0
+
+
+def _default_checkpointed_modules(model):
+    # the layers of the largest ModuleList, e.g. the transformer blocks
+    module_lists = [m for m in model.modules() if isinstance(m, torch.nn.ModuleList)]
+    if not module_lists:
+        return []
+    layers = max(module_lists, key=lambda m: sum(p.numel() for p in m.parameters()))
+    return list(layers)
+
+
+class ModelMemoryStats:
+    """Parameter counts of ``model`` and, if ``inputs`` of one micro-batch
+    are given, the activation memory of a forward pass.
+
+    Activations are measured as the tensors autograd saves for the backward
+    pass. They are split into the tensors saved inside each call of the
+    ``checkpointed_modules`` (the layers of the largest ``ModuleList`` by
+    default), which activation checkpointing recomputes, and the tensors
+    saved outside of them.
+    """
+    def __init__(self, model, inputs=None, checkpointed_modules=None):
+        # shared params counted once, meta tensors have no data_ptr
+        params = list({id(p): p for p in model.parameters()}.values())
+        self.param_numels = [p.numel() for p in params]
+        self.total_params = sum(self.param_numels)
+        self.largest_param = max(self.param_numels, default=0)
+        layer_params = [
+            sum(p.numel() for p in m.parameters(recurse=False)) for m in model.modules()
+        ]
+        self.largest_layer_params = max(layer_params, default=0)
+
+        self.outside_activation_bytes = 0
+        self.checkpoint_input_bytes = []
+        self.checkpointed_activation_bytes = []
+        if inputs is not None:
+            if checkpointed_modules is None:
+                checkpointed_modules = _default_checkpointed_modules(model)
+            self._measure_activations(model, inputs, checkpointed_modules)
+
+    def _measure_activations(self, model, inputs, checkpointed_modules):
+        # saved tensors are kept alive so that their ids stay unique
+        saved = {}
+        depth = [0]
+        param_ids = {id(p) for p in model.parameters()}
+
+        def pack(tensor):
+            # weights saved for the backward pass are no activations
+            base = tensor if tensor._base is None else tensor._base
+            if id(base) not in param_ids and id(tensor) not in saved:
+                saved[id(tensor)] = tensor
+                if depth[0] > 0:
+                    self.checkpointed_activation_bytes[-1] += _tensor_bytes(tensor)
+                else:
+                    self.outside_activation_bytes += _tensor_bytes(tensor)
+            return tensor
+
+        kept_inputs = {}
+
+        def pre_hook(module, module_inputs):
+            if depth[0] == 0:
+                tensors = [
+                    tensor for tensor in module_inputs
+                    if torch.is_tensor(tensor) and id(tensor) not in kept_inputs
+                ]
+                kept_inputs.update((id(tensor), tensor) for tensor in tensors)
+                self.checkpoint_input_bytes.append(_tensor_bytes(tensors))
+                self.checkpointed_activation_bytes.append(0)
+            depth[0] += 1
+
+        def post_hook(module, module_inputs, outputs):
+            depth[0] -= 1
+
+        handles = []
+        for module in checkpointed_modules:
+            handles.append(module.register_forward_pre_hook(pre_hook))
+            handles.append(module.register_forward_hook(post_hook))
+        try:
+            with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+                if isinstance(inputs, dict):
+                    model(**inputs)
+                elif isinstance(inputs, (list, tuple)):
+                    model(*inputs)
+                else:
+                    model(inputs)
+        finally:
+            for handle in handles:
+                handle.remove()
+
+    @property
+    def activation_bytes(self):
+        """Activation memory of a forward pass without checkpointing."""
+        return self.outside_activation_bytes + sum(self.checkpointed_activation_bytes)
+
+
+def _add(memory, device, component, num_bytes):
+    if num_bytes > 0:
+        memory[device][component] = memory[device].get(component, 0) + int(num_bytes)
+
+
+def estimate_memory_needs(stats,
+                          config,
+                          num_gpus_per_node=1,
+                          num_nodes=1,
+                          model_parallel_size=1,
+                          pipeline_stages=1,
+                          fragmentation_factor=1.1):
+    """Estimates the peak memory of one rank training the model of ``stats``
+    with the DeepSpeed ``config`` dict and Adam.
+
+    Parameters and activations are assumed to be split evenly across the
+    model parallel ranks and pipeline stages. Transient GPU allocations are
+    scaled by ``fragmentation_factor`` to account for allocator fragmentation.
+
+    Returns:
+        A dict mapping ``"gpu"`` and ``"cpu"`` to dicts of the bytes of each
+        component at the GPU memory peak.
+    """
+    world_size = num_nodes * num_gpus_per_node
+    assert world_size % (model_parallel_size * pipeline_stages) == 0, \
+        f"world size {world_size} is not divisible by model parallel size {model_parallel_size} " \
+        f"times pipeline stages {pipeline_stages}"
+    dp_size = world_size // (model_parallel_size * pipeline_stages)
+
+    zero_config = get_zero_config(config)
+    checkpointing_config = DeepSpeedActivationCheckpointingConfig(config)
+    stage = zero_config.stage
+    mixed_precision = get_fp16_enabled(config) or get_bfloat16_enabled(config)
+    param_bytes = 2 if mixed_precision else 4
+    # fp32 master weights and the optimizer states
+    optimizer_bytes = (4 if mixed_precision else 0) + OPTIMIZER_STATE_BYTES
+    offload_optimizer = zero_config.offload_optimizer is not None and \
+        zero_config.offload_optimizer.device == OffloadDeviceEnum.cpu
+    offload_param = stage == ZeroStageEnum.weights and zero_config.offload_param is not None and \
+        zero_config.offload_param.device == OffloadDeviceEnum.cpu
+    optimizer_device = CPU if offload_optimizer else GPU
+
+    model_params = math.ceil(stats.total_params /
+                             (model_parallel_size * pipeline_stages))
+    partition_params = math.ceil(model_params / dp_size)
+    largest_layer = math.ceil(stats.largest_layer_params / model_parallel_size)
+    largest_param = math.ceil(stats.largest_param / model_parallel_size)
+
+    persistent = {GPU: {}, CPU: {}}
+    train = {GPU: {}, CPU: {}}
+    step = {GPU: {}, CPU: {}}
+
+    # model states
+    if stage == ZeroStageEnum.disabled:
+        _add(persistent, GPU, "params", param_bytes * model_params)
+        _add(persistent, GPU, "gradients", param_bytes * model_params)
+        _add(persistent, GPU, "optimizer states", optimizer_bytes * model_params)
+    elif stage in [ZeroStageEnum.optimizer_states, ZeroStageEnum.gradients]:
+        _add(persistent, GPU, "params", param_bytes * model_params)
+        if stage == ZeroStageEnum.optimizer_states:
+            _add(persistent, GPU, "gradients", param_bytes * model_params)
+        elif not offload_optimizer:
+            # offloaded gradients are copied to the fp32 gradients directly
+            _add(persistent, GPU, "gradients", param_bytes * partition_params)
+        _add(persistent,
+             optimizer_device,
+             "optimizer states",
+             optimizer_bytes * partition_params)
+        if offload_optimizer:
+            _add(persistent, CPU, "fp32 gradients", 4 * partition_params)
+            _add(persistent, GPU, "offload buffers", param_bytes * largest_param)
+        else:
+            _add(step, GPU, "fp32 gradients", 4 * partition_params)
+
+        reduce_bucket = zero_config.reduce_bucket_size
+        num_buckets = 2 if zero_config.contiguous_gradients and zero_config.overlap_comm else 1
+        _add(train, GPU, "reduce buckets", param_bytes * reduce_bucket * num_buckets)
+    else:
+        persistent_numels = [
+            numel for numel in stats.param_numels
+            if numel <= zero_config.param_persistence_threshold
+        ]
+        persistent_params = min(sum(persistent_numels),
+                                zero_config.model_persistence_threshold)
+        _add(persistent,
+             CPU if offload_param else GPU,
+             "params",
+             param_bytes * partition_params)
+        _add(persistent, GPU, "persistent params", param_bytes * persistent_params)
+        _add(persistent, optimizer_device, "gradients", param_bytes * partition_params)
+        _add(persistent,
+             optimizer_device,
+             "optimizer states",
+             optimizer_bytes * partition_params)
+        fp32_grad_params = min(zero_config.sub_group_size, partition_params)
+        _add(persistent if offload_optimizer else step,
+             optimizer_device,
+             "fp32 gradients",
+             4 * fp32_grad_params)
+
+        live_params = max(
+            largest_layer,
+            min(zero_config.max_live_parameters,
+                largest_layer + zero_config.prefetch_bucket_size))
+        _add(train, GPU, "gathered params", param_bytes * min(model_params, live_params))
+        if zero_config.contiguous_gradients:
+            _add(train,
+                 GPU,
+                 "reduce buckets",
+                 param_bytes * zero_config.reduce_bucket_size)
+
+    # activations of the first pipeline stage, which holds the most micro-batches
+    micro_batches = min(pipeline_stages, get_gradient_accumulation_steps(config) or 1)
+    inner_bytes = sum(stats.checkpointed_activation_bytes) / model_parallel_size
+    if stats.checkpoint_input_bytes and ACT_CHKPT in config:
+        # the inputs of checkpointed layers are kept, one layer is recomputed at a time
+        input_bytes = sum(stats.checkpoint_input_bytes)
+        if checkpointing_config.partition_activations:
+            input_bytes /= model_parallel_size
+        checkpoint_device = CPU if checkpointing_config.cpu_checkpointing else GPU
+        _add(train,
+             checkpoint_device,
+             "checkpointed activations",
+             input_bytes * micro_batches / pipeline_stages)
+        _add(train,
+             GPU,
+             "recomputed activations",
+             max(stats.checkpointed_activation_bytes) / model_parallel_size)
+    else:
+        _add(train, GPU, "activations", inner_bytes * micro_batches / pipeline_stages)
+    _add(train,
+         GPU,
+         "activations",
+         stats.outside_activation_bytes * micro_batches / pipeline_stages)
+    if pipeline_stages > 1:
+        # input and output activations of each pipe buffer
+        _add(train,
+             GPU,
+             "pipe buffers",
+             2 * micro_batches * max(stats.checkpoint_input_bytes,
+                                     default=0))
+
+    # the activations and the step buffers are not live at the same time
+    peak = max([train, step], key=lambda phase: sum(phase[GPU].values()))
+    memory = {GPU: {}, CPU: {}}
+    for phase in [persistent, peak]:
+        for device in [GPU, CPU]:
+            for component, num_bytes in phase[device].items():
+                _add(memory, device, component, num_bytes)
+    _add(memory,
+         GPU,
+         "fragmentation",
+         sum(peak[GPU].values()) * (fragmentation_factor - 1))
+    return memory
+
+
+def _format_config(config):
+    zero_config = get_zero_config(config)
+    options = [f"stage={int(zero_config.stage)}"]
+    if zero_config.offload_optimizer is not None:
+        options.append(f"offload_optimizer={zero_config.offload_optimizer.device}")
+    if zero_config.stage == ZeroStageEnum.weights and zero_config.offload_param is not None:
+        options.append(f"offload_param={zero_config.offload_param.device}")
+    checkpointing_config = DeepSpeedActivationCheckpointingConfig(config)
+    if checkpointing_config.partition_activations:
+        options.append("partition_activations")
+    if checkpointing_config.cpu_checkpointing:
+        options.append("cpu_checkpointing")
+    return ", ".join(options)
+
+
+def print_memory_plan(stats,
+                      configs,
+                      num_gpus_per_node=1,
+                      num_nodes=1,
+                      model_parallel_size=1,
+                      pipeline_stages=1,
+                      fragmentation_factor=1.1,
+                      names=None,
+                      verbose=False):
+    """Prints the estimated peak memory per CPU (node) and per GPU for each
+    of the candidate ``configs``, see ``estimate_memory_needs``."""
+    nodes_str = "nodes" if num_nodes > 1 else "node"
+    gpus_str = "GPUs" if num_gpus_per_node > 1 else "GPU"
+    print(
+        "Estimated peak memory for a:\n"
+        f"HW: Setup with {num_nodes} {nodes_str}, {num_gpus_per_node} {gpus_str} per node, "
+        f"model parallel size {model_parallel_size}, {pipeline_stages} pipeline stages.\n"
+        f"SW: Model with {int(stats.total_params/1e6)}M total params, "
+        f"{int(stats.largest_layer_params/1e6)}M largest layer params, "
+        f"{stats.activation_bytes/2**30:.2f}GB activations per micro-batch.")
+    print("  per CPU  |  per GPU |   Config")
+    for index, config in enumerate(configs):
+        memory = estimate_memory_needs(stats,
+                                       config,
+                                       num_gpus_per_node=num_gpus_per_node,
+                                       num_nodes=num_nodes,
+                                       model_parallel_size=model_parallel_size,
+                                       pipeline_stages=pipeline_stages,
+                                       fragmentation_factor=fragmentation_factor)
+        cpu_mem = sum(memory[CPU].values()) * num_gpus_per_node
+        gpu_mem = sum(memory[GPU].values())
+        name = f"{names[index]}: " if names is not None else ""
+        description = f"{name}{_format_config(config)}"
+        print(f" {cpu_mem/2**30:7.2f}GB | {gpu_mem/2**30:6.2f}GB | {description}")
+        if verbose:
+            for device in [GPU, CPU]:
+                for component, num_bytes in memory[device].items():
+                    print(f"{'':23}{device} {component}: {num_bytes/2**30:.2f}GB")
+
+
+def _default_configs():
+    configs = []
+    for stage in [1, 2, 3]:
+        for offload in [False, True]:
+            zero_config = {"stage": stage}
+            if offload:
+                zero_config["offload_optimizer"] = {"device": "cpu"}
+            configs.append({"bf16": {"enabled": True}, "zero_optimization": zero_config})
+    return configs
+
+
+def _load_callable(path):
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def parse_arguments(args=None):
+    parser = argparse.ArgumentParser(
+        description="Estimate the per-rank peak memory of candidate DeepSpeed configs.")
+    parser.add_argument(
+        "--model",
+        type=str,
+        required=True,
+        help="'module:function' returning the model, called on the meta device")
+    parser.add_argument(
+        "--inputs",
+        type=str,
+        default=None,
+        help="'module:function' returning the inputs of one micro-batch, called on the "
+        "meta device with the micro batch size. Activations are ignored if not given.")
+    parser.add_argument("--config",
+                        type=str,
+                        nargs="+",
+                        default=None,
+                        help="Candidate DeepSpeed config json files, "
+                        "ZeRO stages 1 to 3 with and without CPU offload by default")
+    parser.add_argument("--num_nodes", type=int, default=1)
+    parser.add_argument("--num_gpus", type=int, default=1, help="GPUs per node")
+    parser.add_argument("--model_parallel_size", type=int, default=1)
+    parser.add_argument("--pipeline_stages", type=int, default=1)
+    parser.add_argument("--checkpointed_module",
+                        type=str,
+                        default=None,
+                        help="Class name of the activation checkpointed layers, "
+                        "the layers of the largest ModuleList by default")
+    parser.add_argument("--fragmentation_factor", type=float, default=1.1)
+    parser.add_argument("--verbose",
+                        action="store_true",
+                        help="Print the memory of each component")
+    return parser.parse_args(args)
+
+
+def cli_main(args=None):
+    args = parse_arguments(args)
+    if args.config is None:
+        names, configs = None, _default_configs()
+    else:
+        names = args.config
+        configs = []
+        for path in args.config:
+            with open(path, "r") as f:
+                configs.append(json.load(f))
+
+    model = build_meta_model(_load_callable(args.model))
+    checkpointed_modules = None
+    if args.checkpointed_module is not None:
+        checkpointed_modules = [
+            m for m in model.modules() if type(m).__name__ == args.checkpointed_module
+        ]
+
+    # activations are measured once per micro batch size
+    stats_by_batch_size = {}
+    for config in configs:
+        micro_batch_size = get_train_micro_batch_size_per_gpu(config) or 1
+        if micro_batch_size not in stats_by_batch_size:
+            inputs = None
+            if args.inputs is not None:
+                inputs = build_meta_model(_load_callable(args.inputs), micro_batch_size)
+            stats_by_batch_size[micro_batch_size] = ModelMemoryStats(
+                model,
+                inputs,
+                checkpointed_modules)
+
+    for micro_batch_size, stats in stats_by_batch_size.items():
+        batch_configs = []
+        batch_names = [] if names is not None else None
+        for index, config in enumerate(configs):
+            if (get_train_micro_batch_size_per_gpu(config) or 1) == micro_batch_size:
+                batch_configs.append(config)
+                if names is not None:
+                    batch_names.append(names[index])
+        print(f"\nMicro batch size {micro_batch_size}:")
+        print_memory_plan(stats,
+                          batch_configs,
+                          num_gpus_per_node=args.num_gpus,
+                          num_nodes=args.num_nodes,
+                          model_parallel_size=args.model_parallel_size,
+                          pipeline_stages=args.pipeline_stages,
+                          fragmentation_factor=args.fragmentation_factor,
+                          names=batch_names,
+                          verbose=args.verbose)
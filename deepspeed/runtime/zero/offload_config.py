@@ -87,6 +87,27 @@ class DeepSpeedZeroOffloadOptimizerConfig(DeepSpeedConfigModel):
 
     fast_init: bool = False
     """ Enable fast optimizer initialization when offloading to NVMe. """
+
+    pipeline_grad_offload: bool = False
+    """
+    For stage 1 and 2 with CPU offload, copy gradients to CPU through a pool
+    of pinned staging buffers and accumulate them in fp32 on CPU in a worker
+    thread, overlapping both with the backward pass.
+    """
+
+    grad_buffer_count: int = Field(4, gt=0)
+    """ Number of pinned staging buffers of ``pipeline_grad_offload``. """
+
+    grad_buffer_size: int = Field(pp_int(1e7), gt=0)
+    """ Number of gradient elements of each staging buffer. """
+
+    overlap_step: bool = False
+    """
+    For stage 1 and 2 with CPU offload and DeepSpeedCPUAdam, run the optimizer
+    step in a worker thread, chunk by chunk, and all-gather the updated
+    weights of each chunk when the next forward pass first uses them. This
+    overlaps the CPU optimizer step with the next forward pass.
+    """
     @validator("pipeline_read", "pipeline_write", always=True)
     def set_pipeline(cls, field_value, values):
         values["pipeline"] = field_value or values.get("pipeline", False)
@@ -0,0 +1,162 @@
+"""
+Copyright (c) Microsoft Corporation
+Licensed under the MIT license.
+"""
+
+import queue
+import threading
+
+import torch
+from deepspeed import comm as dist
+
+
+class OverlappedOptimizerStep:
+    """Runs the DeepSpeedCPUAdam step of ZeRO-Offload in a worker thread and
+    gathers the updated bit16 weights on their first use in the next forward
+    pass.
+
+    The partitions of all param groups are split into chunks of at most
+    ``chunk_numel`` elements, ordered by chunk index and then by group. The
+    worker thread unscales the gradients of each chunk, updates it with
+    DeepSpeedCPUAdam and converts it to bit16 in a pinned staging buffer.
+    ``gather_until()`` uploads the chunks up to a position and all-gathers
+    them from the main thread, in chunk order, so that all ranks issue the
+    same collectives in the same order.
+    """
+    def __init__(self,
+                 cpu_adam,
+                 fp32_partitions,
+                 bit16_partitions,
+                 dp_process_groups,
+                 chunk_numel,
+                 use_hpu=False):
+        self.cpu_adam = cpu_adam
+        self.fp32_partitions = fp32_partitions
+        self.bit16_partitions = bit16_partitions
+        self.dp_process_groups = dp_process_groups
+        self.chunk_numel = chunk_numel
+        self.use_hpu = use_hpu
+
+        self.staging = []
+        for partitions in bit16_partitions:
+            zeros = torch.zeros(partitions[0].numel(), dtype=partitions[0].dtype)
+            if use_hpu:
+                self.staging.append(zeros.pin_memory(partitions[0].device))
+            else:
+                self.staging.append(zeros.pin_memory())
+
+        self.chunks = []
+        self.positions = {}
+        num_chunks = max((partitions[0].numel() + chunk_numel - 1) // chunk_numel
+                         for partitions in bit16_partitions)
+        for chunk_index in range(num_chunks):
+            for group_no, partitions in enumerate(bit16_partitions):
+                offset = chunk_index * chunk_numel
+                if offset < partitions[0].numel():
+                    numel = min(chunk_numel, partitions[0].numel() - offset)
+                    self.positions[(group_no, chunk_index)] = len(self.chunks)
+                    self.chunks.append((group_no, offset, numel))
+        self.ready = [threading.Event() for _ in self.chunks]
+        self.next_gather = len(self.chunks)
+        self.upload_event = None
+
+        self.tasks = queue.Queue()
+        self.error = None
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    @property
+    def pending(self):
+        """Whether chunks of the last step are not gathered yet."""
+        return self.next_gather < len(self.chunks)
+
+    def last_position(self, group_no, start, end):
+        """Position of the last chunk holding elements ``[start, end)`` of the
+        flattened group ``group_no``, or -1 if there is none."""
+        partitions = self.bit16_partitions[group_no]
+        partition_numel = partitions[0].numel()
+        last = -1
+        for rank in range(len(partitions)):
+            partition_start = rank * partition_numel
+            partition_end = min(end, partition_start + partition_numel) - partition_start
+            if max(start, partition_start) - partition_start < partition_end:
+                chunk_index = (partition_end - 1) // self.chunk_numel
+                last = max(last, self.positions[(group_no, chunk_index)])
+        return last
+
+    def launch(self, hyperparams, grad_scale):
+        """Starts the step of all chunks. ``hyperparams`` holds the optimizer
+        hyperparameters of each group at the time of the step, the gradients
+        are divided by ``grad_scale``."""
+        assert not self.pending, "the previous step must be gathered first"
+        # the staging buffers are reused once the last upload completed
+        if self.upload_event is not None:
+            self.upload_event.synchronize()
+            self.upload_event = None
+        steps = [
+            self.cpu_adam.begin_slice_step(partition)
+            for partition in self.fp32_partitions
+        ]
+        for ready in self.ready:
+            ready.clear()
+        self.next_gather = 0
+        self.tasks.put((hyperparams, steps, grad_scale))
+
+    def _run(self):
+        while True:
+            hyperparams, steps, grad_scale = self.tasks.get()
+            position = 0
+            try:
+                for position, (group_no, offset, numel) in enumerate(self.chunks):
+                    partition = self.fp32_partitions[group_no]
+                    partition.grad.narrow(0, offset, numel).mul_(1. / grad_scale)
+                    self.cpu_adam.step_slice(partition,
+                                             hyperparams[group_no],
+                                             steps[group_no],
+                                             offset,
+                                             numel)
+                    staging = self.staging[group_no].narrow(0, offset, numel)
+                    staging.copy_(partition.data.narrow(0, offset, numel))
+                    self.ready[position].set()
+            except Exception as e:
+                self.error = e
+                # wake up the main thread, gather_until() raises the error
+                for ready in self.ready[position:]:
+                    ready.set()
+
+    def _record_event(self):
+        if self.use_hpu:
+            import habana_frameworks.torch as ht
+            event = ht.hpu.Event()
+        elif torch.cuda.is_available():
+            event = torch.cuda.Event()
+        else:
+            return None
+        event.record()
+        return event
+
+    def gather_until(self, position):
+        """Uploads and all-gathers the chunks up to ``position``, waiting for
+        the worker thread to finish them."""
+        while self.next_gather <= position and self.pending:
+            self.ready[self.next_gather].wait()
+            if self.error is not None:
+                error, self.error = self.error, None
+                self.next_gather = len(self.chunks)
+                raise error
+            group_no, offset, numel = self.chunks[self.next_gather]
+            partitions = self.bit16_partitions[group_no]
+            partition_id = dist.get_rank(group=self.dp_process_groups[group_no])
+            shard_list = [partition.narrow(0, offset, numel) for partition in partitions]
+            staging = self.staging[group_no].narrow(0, offset, numel)
+            shard_list[partition_id].copy_(staging, non_blocking=True)
+            dist.all_gather(shard_list,
+                            shard_list[partition_id],
+                            self.dp_process_groups[group_no])
+            self.next_gather += 1
+            if not self.pending:
+                self.upload_event = self._record_event()
+
+    def synchronize(self):
+        """Gathers all chunks of the last step."""
+        self.gather_until(len(self.chunks) - 1)
@@ -12,7 +12,9 @@ from deepspeed.runtime.zero.offload_config import OffloadDeviceEnum
 from deepspeed.runtime.zero.partition_parameters import _init_external_params
 from deepspeed.runtime.zero.partition_parameters import *
 from deepspeed.runtime.zero.partitioned_param_coordinator import PartitionedParameterCoordinator, iter_params
+from deepspeed.runtime.comm.quantized_collectives import BlockQuantizer
 from deepspeed import comm as dist
+from deepspeed.utils import groups
 
 FWD_MODULE_STACK = list()
 
@@ -181,9 +183,12 @@ class DeepSpeedZeRoOffload(object):
                  prefetch_bucket_size=50000000,
                  max_reuse_distance=1000000000,
                  max_live_parameters=1000000000,
+                 max_cached_traces=1,
                  param_persistence_threshold=100000,
                  model_persistence_threshold=sys.maxsize,
                  offload_param_config=None,
+                 weight_quantization_config=None,
+                 secondary_partition=False,
                  mpu=None,
                  use_hpu=False,
                  no_cuda=False):
@@ -221,6 +226,30 @@ class DeepSpeedZeRoOffload(object):
         self._prefetch_bucket_sz = int(prefetch_bucket_size)
         self._max_reuse_distance_in_numel = int(max_reuse_distance)
         self._max_available_parameters_in_numel = int(max_live_parameters)
+        self._max_cached_traces = int(max_cached_traces)
+        # forward all-gathers send blockwise quantized partitions
+        self._weight_quantizer = None
+        if weight_quantization_config is not None and weight_quantization_config.enabled:
+            self._weight_quantizer = BlockQuantizer(weight_quantization_config.dtype,
+                                                    weight_quantization_config.block_size)
+
+        # the backward pass gathers parameters within the node, see
+        # PartitionedParameterCoordinator.release_sub_module()
+        self._secondary_group = None
+        zero_params = [p for p in module.parameters() if is_zero_param(p)]
+        if secondary_partition and zero_params:
+            hierarchical_groups = groups._create_hierarchical_data_parallel_groups(
+                zero_params[0].ds_process_group,
+                get_current_device(self.use_hpu,
+                                   self.no_cuda))
+            if hierarchical_groups is None:
+                if dist.get_rank() == 0:
+                    logger.warning(
+                        "Secondary parameter partitions need parameters partitioned on several "
+                        "nodes with the same number (>1) of ranks per node, gathering the "
+                        "backward parameters from all ranks.")
+            else:
+                self._secondary_group = hierarchical_groups[0]
         self.__allgather_stream = create_stream(self.use_hpu, self.no_cuda
         ) if overlap_comm else get_default_stream(self.use_hpu, self.no_cuda)
 
@@ -253,12 +282,35 @@ class DeepSpeedZeRoOffload(object):
                 _max_available_parameters_in_numel,
                 allgather_stream=self.__allgather_stream,
                 prefetch_nvme=self.offload_device == OffloadDeviceEnum.nvme,
+                max_cached_traces=self._max_cached_traces,
+                weight_quantizer=self._weight_quantizer,
+                secondary_group=self._secondary_group,
                 use_hpu=self.use_hpu,
                 no_cuda=self.no_cuda
             )
 
         return self.param_coordinators[training]
 
+    def set_prefetch_bucket_size(self, prefetch_bucket_size):
+        self._prefetch_bucket_sz = int(prefetch_bucket_size)
+        for param_coordinator in self.param_coordinators.values():
+            param_coordinator.set_prefetch_bucket_size(self._prefetch_bucket_sz)
+
+    def set_max_live_parameters(self, max_live_parameters):
+        self._max_available_parameters_in_numel = int(max_live_parameters)
+        for param_coordinator in self.param_coordinators.values():
+            param_coordinator.set_max_live_parameters(
+                self._max_available_parameters_in_numel)
+
+    def pop_fetch_stats(self):
+        """Number of parameter elements gathered on demand and in total by all
+        coordinators since the last call."""
+        stats = [
+            param_coordinator.pop_fetch_stats()
+            for param_coordinator in self.param_coordinators.values()
+        ]
+        return sum(demand for demand, _ in stats), sum(total for _, total in stats)
+
     def _convert_to_zero_parameters(self, ds_config, module, mpu):
         non_zero_params = [p for p in module.parameters() if not is_zero_param(p)]
         if non_zero_params:
@@ -470,7 +522,7 @@ class DeepSpeedZeRoOffload(object):
         param_coordinator.trace_prologue(sub_module)
         if param_coordinator.is_record_trace():
             param_coordinator.record_module(sub_module)
-        param_coordinator.fetch_sub_module(sub_module)
+        param_coordinator.fetch_sub_module(sub_module, forward=True)
 
         see_memory_usage(
             f"Before sub module function {sub_module.__class__.__name__} after fetch",
@@ -483,7 +535,7 @@ class DeepSpeedZeRoOffload(object):
             force=False)
 
         param_coordinator = self.get_param_coordinator(training=sub_module.training)
-        param_coordinator.release_sub_module(sub_module)
+        param_coordinator.release_sub_module(sub_module, forward=True)
 
         see_memory_usage(
             f"After sub module function {sub_module.__class__.__name__}  {sub_module.id} after release",
@@ -495,7 +547,7 @@ class DeepSpeedZeRoOffload(object):
         param_coordinator.trace_prologue(sub_module)
         if param_coordinator.is_record_trace():
             param_coordinator.record_module(sub_module)
-        param_coordinator.fetch_sub_module(sub_module)
+        param_coordinator.fetch_sub_module(sub_module, forward=False)
 
     @torch.no_grad()
     def post_sub_module_backward_function(self, sub_module):
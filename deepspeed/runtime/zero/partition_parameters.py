@@ -557,12 +557,18 @@ class AllGatherCoalescedHandle:
         partitions: List[Tensor],
         world_size: int,
         use_hpu=False,
-        no_cuda=False
+        no_cuda=False,
+        quantizer=None,
+        secondary=False
     ) -> None:
         self.__allgather_handle = allgather_handle
         self.__params = params
         self.__partitions = partitions
         self.__world_size = world_size
+        # the partitions are packed by quantizer if given
+        self.__quantizer = quantizer
+        # the partitions are the secondary partitions of the params
+        self.__secondary = secondary
         self.__complete = False
         self.use_hpu = use_hpu
         self.no_cuda = no_cuda
@@ -579,19 +585,30 @@ class AllGatherCoalescedHandle:
 
         instrument_w_nvtx(self.__allgather_handle.wait)()
 
+        rank_partitions = self.__partitions
+        if self.__quantizer is not None:
+            partition_sz = sum(p.ds_tensor.ds_numel for p in self.__params)
+            rank_partitions = [
+                self.__quantizer.unpack(packed,
+                                        partition_sz).to(self.__params[0].dtype)
+                for packed in self.__partitions
+            ]
+
         # split the single tensor out into individual tensors
         param_offset = 0
         for param in self.__params:
             assert param.ds_status == ZeroParamStatus.INFLIGHT, f"expected param {param.ds_summary()} to be inflight"
+            partition_numel = param.ds_secondary_tensor.numel(
+            ) if self.__secondary else param.ds_tensor.ds_numel
             partitions: List[Tensor] = []
             for rank in range(self.__world_size):
-                param_start = rank * param.ds_tensor.ds_numel
+                param_start = rank * partition_numel
                 if param_start < param.ds_numel:
-                    part_to_copy = self.__partitions[rank].narrow(
+                    part_to_copy = rank_partitions[rank].narrow(
                         0,
                         param_offset,
                         min(param.ds_numel - param_start,
-                            param.ds_tensor.ds_numel))
+                            partition_numel))
                     partitions.append(part_to_copy)
 
             param.data = instrument_w_nvtx(torch.cat)(partitions).view(param.ds_shape)
@@ -600,7 +617,7 @@ class AllGatherCoalescedHandle:
             for part_to_copy in partitions:
                 record_stream(part_to_copy, self.use_hpu, self.no_cuda)
 
-            param_offset += param.ds_tensor.ds_numel
+            param_offset += partition_numel
 
         self.__complete = True
 
@@ -895,7 +912,14 @@ class Init(InsertPostInitMethodToModuleSubClasses):
 
         @instrument_w_nvtx
         def all_gather_coalesced(params: Iterable[Parameter],
-                                 safe_mode: bool = False) -> AllGatherCoalescedHandle:
+                                 safe_mode: bool = False,
+                                 quantizer=None,
+                                 secondary_group=None) -> AllGatherCoalescedHandle:
+            """Gathers ``params`` in one all-gather. If ``quantizer`` is given,
+            the partitions are sent blockwise quantized and the gathered
+            parameters are their dequantized values. If ``secondary_group`` is
+            given, the ``ds_secondary_tensor`` partitions of the params are
+            gathered within that group instead."""
 
             # fetches from nvme if the partition is not available and in nvme
             self._ensure_availability_of_partitioned_params(params)
@@ -924,7 +948,64 @@ class Init(InsertPostInitMethodToModuleSubClasses):
                 # otherwise could mix data between tensors.
                 assert_ints_same_as_other_ranks([p.ds_tensor.ds_numel for p in params])
 
-            if len(params) == 1:
+            if secondary_group is not None:
+                secondary_world_size = dist.get_world_size(group=secondary_group)
+                partition_sz = sum(p.ds_secondary_tensor.numel() for p in params)
+                flat_tensor = torch.empty(partition_sz * secondary_world_size,
+                                          dtype=get_only_unique_item(p.dtype
+                                                                     for p in params),
+                                          device=get_current_device(self.use_hpu, self.no_cuda),
+                                          requires_grad=False)
+                partitions = [
+                    flat_tensor.narrow(0,
+                                       partition_sz * i,
+                                       partition_sz) for i in range(secondary_world_size)
+                ]
+                secondary_rank = dist.get_rank(group=secondary_group)
+                torch.cat([p.ds_secondary_tensor for p in params],
+                          out=partitions[secondary_rank])
+                handle = _dist_allgather_fn(partitions[secondary_rank],
+                                            flat_tensor,
+                                            secondary_group)
+
+                return AllGatherCoalescedHandle(
+                    allgather_handle=handle,
+                    params=params,
+                    partitions=partitions,
+                    world_size=secondary_world_size,
+                    use_hpu=self.use_hpu,
+                    no_cuda=self.no_cuda,
+                    secondary=True
+                )
+            elif quantizer is not None:
+                partition_sz = sum(p.ds_tensor.ds_numel for p in params)
+                packed_sz = quantizer.packed_numel(partition_sz)
+                packed_tensor = torch.empty(packed_sz * self.world_size,
+                                            dtype=torch.uint8,
+                                            device=get_current_device(self.use_hpu, self.no_cuda),
+                                            requires_grad=False)
+                packed_partitions = [
+                    packed_tensor.narrow(0,
+                                         packed_sz * i,
+                                         packed_sz) for i in range(self.world_size)
+                ]
+                quantizer.pack(
+                    torch.cat([p.ds_tensor.to(get_current_device(self.use_hpu, self.no_cuda)) for p in params]),
+                    out=packed_partitions[self.rank])
+                handle = _dist_allgather_fn(packed_partitions[self.rank],
+                                            packed_tensor,
+                                            self.ds_process_group)
+
+                return AllGatherCoalescedHandle(
+                    allgather_handle=handle,
+                    params=params,
+                    partitions=packed_partitions,
+                    world_size=self.world_size,
+                    use_hpu=self.use_hpu,
+                    no_cuda=self.no_cuda,
+                    quantizer=quantizer
+                )
+            elif len(params) == 1:
                 # have an opportunity to avoid some intermediate memory allocations
                 param, = params
                 param_buffer = torch.empty(
@@ -6,7 +6,7 @@ Licensed under the MIT license.
 from dataclasses import dataclass
 import collections
 from collections import UserDict
-from typing import Deque, Set
+from typing import Deque, Set, Tuple
 from torch.cuda import Event, Stream
 
 from deepspeed import comm as dist
@@ -68,6 +68,9 @@ class PartitionedParameterCoordinator:
         max_available_parameters_in_numel: int,
         allgather_stream: Stream,
         prefetch_nvme: bool = False,
+        max_cached_traces: int = 1,
+        weight_quantizer=None,
+        secondary_group=None,
         use_hpu=False,
         no_cuda=False
     ) -> None:
@@ -80,6 +83,13 @@ class PartitionedParameterCoordinator:
         # sequence of submodules/parameters in forward pass + backward pass
         self.__submodule_order: Iterable[Module] = []
         self.__param_order: Iterable[__class__.__ParamInTrace] = []
+        # completed traces of the different execution paths of the network,
+        # keyed by their module ids in least recently used order
+        self.__trace_cache: collections.OrderedDict = collections.OrderedDict()
+        self.__max_cached_traces: int = max_cached_traces
+        # distinguishes the release decisions cached for different traces
+        self.__trace_id: int = 0
+        self.__n_traces_recorded: int = 0
         self.__most_recent_step_id_param_fetched_for = collections.defaultdict(
             lambda: int(-1e10))
         self.__step_id_module_fetched_for = collections.defaultdict(
@@ -94,6 +104,16 @@ class PartitionedParameterCoordinator:
         self.__param_queue: Deque[__class__.__ParamInTrace] = None
         self.__prefetch_bucket_sz: int = prefetch_bucket_sz
         self.__prefetch_nvme: bool = prefetch_nvme
+        # quantizes the all-gathers of the forward pass, see fetch_sub_module()
+        self.__weight_quantizer = weight_quantizer
+        # params released in the forward pass keep a partition within this
+        # group, which the backward pass gathers from, see release_sub_module()
+        self.__secondary_group = secondary_group
+        self.__params_with_secondary: Set[Parameter] = set()
+        # number of parameter elements gathered when they were needed, i.e.
+        # not prefetched, and in total since the last pop_fetch_stats()
+        self.__n_demand_fetched_numel: int = 0
+        self.__n_fetched_numel: int = 0
         self.hierarchy: int = 0
         self.use_hpu = use_hpu
         self.no_cuda = no_cuda
@@ -114,6 +134,22 @@ class PartitionedParameterCoordinator:
         # TODO. make this configurable via JSON
         self.__max_ongoing_fetch_events: int = 2
 
+    def set_prefetch_bucket_size(self, prefetch_bucket_sz: int) -> None:
+        """Changes the number of parameter elements prefetched ahead."""
+        self.__prefetch_bucket_sz = prefetch_bucket_sz
+
+    def set_max_live_parameters(self, max_available_parameters_in_numel: int) -> None:
+        """Changes the number of parameter elements that can be gathered at once."""
+        self.__max_n_available_params = max_available_parameters_in_numel
+
+    def pop_fetch_stats(self) -> Tuple[int, int]:
+        """Returns the number of parameter elements gathered on demand and in
+        total since the last call."""
+        stats = (self.__n_demand_fetched_numel, self.__n_fetched_numel)
+        self.__n_demand_fetched_numel = 0
+        self.__n_fetched_numel = 0
+        return stats
+
     """Tracing and Tracking
     TODO. consider performing trace before initializing PartitionedParameterCoordinator
     and passing trace results into constructor. This way all the code in here can
@@ -147,14 +183,68 @@ class PartitionedParameterCoordinator:
 
     def trace_prologue(self, sub_module: Module) -> None:
         if self.is_complete_trace():
-            # sub_module must match expectation else invalidate trace cache
-            if sub_module != self.__submodule_order[self.__step_id]:
-                expected_module_id = self.__submodule_order[self.__step_id].id
-                debug_rank0(
-                    f"Invalidate trace cache @ step {self.__step_id}: "
-                    f"expected module {expected_module_id}, but got module {sub_module.id}"
-                )
-                self._invalidate_trace()
+            # sub_module must match expectation else switch to another cached
+            # trace or invalidate trace cache
+            if self.__step_id >= len(self.__submodule_order) or \
+                    sub_module != self.__submodule_order[self.__step_id]:
+                if self._switch_to_cached_trace(sub_module):
+                    return
+                expected_module_id = self.__submodule_order[self.__step_id].id \
+                    if self.__step_id < len(self.__submodule_order) else None
+                self._drain_inflight_params()
+                if self.__max_cached_traces > 1:
+                    debug_rank0(
+                        f"Record new trace @ step {self.__step_id}: "
+                        f"expected module {expected_module_id}, but got module {sub_module.id}"
+                    )
+                    self._record_from_current_step()
+                else:
+                    debug_rank0(
+                        f"Invalidate trace cache @ step {self.__step_id}: "
+                        f"expected module {expected_module_id}, but got module {sub_module.id}"
+                    )
+                    self._invalidate_trace()
+
+    def _record_from_current_step(self) -> None:
+        """Records the rest of the current forward+backward as a new trace that
+        starts with the modules executed so far."""
+        self.__submodule_order = list(self.__submodule_order[:self.__step_id])
+        self.__param_order = []
+        self.__param_queue = None
+        self.__step_id_module_fetched_for = collections.defaultdict(
+            lambda: collections.deque())
+        for step_id, sub_module in enumerate(self.__submodule_order):
+            self.__step_id_module_fetched_for[sub_module.id].append(step_id)
+        self.__trace_mode = ZeRoTraceMode.RECORD
+
+    def _switch_to_cached_trace(self, sub_module: Module) -> bool:
+        """Continues the current forward+backward with a cached trace that
+        matches the modules executed so far followed by ``sub_module``."""
+        executed_ids = tuple(m.id for m in self.__submodule_order[:self.__step_id])
+        for trace_key, trace in self.__trace_cache.items():
+            submodule_order, param_order, trace_id = trace
+            if len(trace_key) > self.__step_id and trace_key[self.__step_id] == sub_module.id \
+                    and trace_key[:self.__step_id] == executed_ids:
+                break
+        else:
+            return False
+
+        debug_rank0(f"Switch to cached trace {trace_id} @ step {self.__step_id}")
+        # prefetches of the previous trace may not be used by the cached one
+        self._drain_inflight_params()
+        self.__submodule_order = submodule_order
+        self.__param_order = param_order
+        self.__trace_id = trace_id
+        self.__param_queue = collections.deque(
+            p for p in param_order if p.step_id_last_used_at >= self.__step_id)
+        self.__most_recent_step_id_param_fetched_for = collections.defaultdict(
+            lambda: int(-1e10))
+        return True
+
+    def _drain_inflight_params(self) -> None:
+        for param in list(self.__inflight_param_registry.keys()):
+            with get_stream(self.__allgather_stream, self.use_hpu, self.no_cuda):
+                self.__inflight_param_registry.pop(param).wait()
 
     def record_module(self, sub_module: Module) -> None:
         """adds sub module to trace"""
@@ -206,6 +296,8 @@ class PartitionedParameterCoordinator:
                 self.__submodule_order = tuple(self.__submodule_order)  # freeze
                 self.__param_order = tuple(self.__param_order)  # freeze
                 self.__trace_mode = ZeRoTraceMode.COMPLETE
+                self.__n_traces_recorded += 1
+                self.__trace_id = self.__n_traces_recorded
                 print_rank_0(
                     f"completed record trace: {[m.id for m in self.__submodule_order]}",
                     force=False)
@@ -213,6 +305,9 @@ class PartitionedParameterCoordinator:
                 # Enable trace recording for next forward/backward pass
                 self.__trace_mode = ZeRoTraceMode.RECORD
 
+        if self.is_complete_trace():
+            self._cache_trace()
+
         self.__param_queue = collections.deque(self.__param_order)  # reset fetch queue
         self.__most_recent_step_id_param_fetched_for = collections.defaultdict(
             lambda: int(-1e10))
@@ -220,6 +315,22 @@ class PartitionedParameterCoordinator:
             lambda: collections.deque())
         self.__step_id = 0
         self.__n_available_params = 0
+        self._release_secondary_partitions()
+
+    def _release_secondary_partitions(self) -> None:
+        # the secondary partitions are stale once the parameters are updated
+        for param in self.__params_with_secondary:
+            param.ds_secondary_tensor = None
+        self.__params_with_secondary.clear()
+
+    def _cache_trace(self) -> None:
+        trace_key = tuple(m.id for m in self.__submodule_order)
+        self.__trace_cache.pop(trace_key, None)
+        self.__trace_cache[trace_key] = (self.__submodule_order,
+                                         self.__param_order,
+                                         self.__trace_id)
+        while len(self.__trace_cache) > self.__max_cached_traces:
+            self.__trace_cache.popitem(last=False)
 
     def _dump_params(self, tag, sub_module, params, step_id=None):
         if step_id is None:
@@ -240,11 +351,14 @@ class PartitionedParameterCoordinator:
 
     @instrument_w_nvtx
     @torch.no_grad()
-    def fetch_sub_module(self, current_submodule: Module) -> None:
+    def fetch_sub_module(self, current_submodule: Module, forward: bool = False) -> None:
         """This method does the following (in order):
         1. kick off fetch for parameters in immediately required sub module
         2. kick off fetch for next few parameters we will need later (prefetch)
         3. block on parameters in immediately required sub module
+
+        With a weight quantizer, the parameters fetched during the forward pass
+        are gathered quantized.
         """
         debug_rank0(
             f"{self.__step_id}: M{current_submodule.id}({type(current_submodule).__name__}) P{[p.ds_id for p in iter_params(current_submodule)]} "
@@ -259,7 +373,9 @@ class PartitionedParameterCoordinator:
         # kick off all gather for params in the immediately required submodule
         for param in params_to_fetch:
             debug_rank0(f"-fetch: {param.ds_summary()}")
-        self.__all_gather_params(params_to_fetch)
+            if param.ds_status == ZeroParamStatus.NOT_AVAILABLE:
+                self.__n_demand_fetched_numel += param.ds_numel
+        self.__all_gather_params(params_to_fetch, forward)
 
         # wait for parameters in the immediately needed submodule to become available
         for param in params_to_fetch:
@@ -352,7 +468,7 @@ class PartitionedParameterCoordinator:
 
                 for param in params_to_prefetch:
                     debug_rank0(f"-prefetch: {param.ds_summary()}")
-                self.__all_gather_params(params_to_prefetch)
+                self.__all_gather_params(params_to_prefetch, forward)
 
                 if self.__prefetch_nvme:
                     self.__prefetch_nvme_param_partitions()
@@ -361,17 +477,23 @@ class PartitionedParameterCoordinator:
 
     @instrument_w_nvtx
     @torch.no_grad()
-    def release_sub_module(self, submodule: Module) -> None:
+    def release_sub_module(self, submodule: Module, forward: bool = False) -> None:
         """release the parameters of a sub module, assuming they meet conditions to
-        be released."""
+        be released.
+
+        With a secondary group, the parameters released in the forward pass
+        of a training module keep a secondary partition for the backward pass.
+        """
+        keep_secondary = forward and submodule.training and self.__secondary_group is not None
         params_to_release = (self.__params_to_release(submodule,
-                                                      self.__step_id)
+                                                      self.__step_id,
+                                                      self.__trace_id)
                              if self.is_complete_trace() else set(
                                  p.ds_id for p in iter_params(submodule)))
         for param in iter_params(submodule):
             param.ds_active_sub_modules.discard(submodule.id)
             if param.ds_id in params_to_release and not param.is_external_param:
-                self.__release_param(param)
+                self.__release_param(param, keep_secondary)
 
     @instrument_w_nvtx
     @torch.no_grad()
@@ -386,12 +508,14 @@ class PartitionedParameterCoordinator:
             param.ds_active_sub_modules.clear()
             self.__release_param(param)
 
+        self._release_secondary_partitions()
+
         for param in iter_params(module, recurse=True):
             if param.ds_status != ZeroParamStatus.NOT_AVAILABLE:
                 raise RuntimeError(f"{param.ds_summary()} expected to be released")
 
     @instrument_w_nvtx
-    def __all_gather_params(self, params: Set[Parameter]) -> None:
+    def __all_gather_params(self, params: Set[Parameter], forward: bool) -> None:
         """for each partitioned parameter, kick off an async allgather and store
         the work handle for the in flight parameters."""
         partitioned_params = []
@@ -399,14 +523,30 @@ class PartitionedParameterCoordinator:
             if param.ds_status == ZeroParamStatus.NOT_AVAILABLE:
                 partitioned_params.append(param)
                 self.__n_available_params += param.ds_numel
+                self.__n_fetched_numel += param.ds_numel
 
         if partitioned_params:
-            with get_stream(self.__allgather_stream, self.use_hpu, self.no_cuda):
-                handle = partitioned_params[0].all_gather_coalesced(partitioned_params)
+            # the backward pass gathers the params with a secondary partition
+            # within the secondary group
+            secondary_params = [] if forward else [
+                p for p in partitioned_params if p in self.__params_with_secondary
+            ]
+            primary_params = [
+                p for p in partitioned_params if p not in set(secondary_params)
+            ]
+            for params_to_gather, gather_kwargs in (
+                    (primary_params, {"quantizer": self.__weight_quantizer if forward else None}),
+                    (secondary_params, {"secondary_group": self.__secondary_group})):
+                if not params_to_gather:
+                    continue
+                with get_stream(self.__allgather_stream, self.use_hpu, self.no_cuda):
+                    handle = params_to_gather[0].all_gather_coalesced(
+                        params_to_gather,
+                        **gather_kwargs)
 
-            for param in partitioned_params:
-                assert param.ds_status == ZeroParamStatus.INFLIGHT, param.ds_summary()
-                self.__inflight_param_registry[param] = handle
+                for param in params_to_gather:
+                    assert param.ds_status == ZeroParamStatus.INFLIGHT, param.ds_summary()
+                    self.__inflight_param_registry[param] = handle
 
             # Release swap buffers for persisted params on nvme since they will never be partitioned or evicted from GPU
             swap_persisted_params = [
@@ -419,17 +559,31 @@ class PartitionedParameterCoordinator:
                         swap_persisted_params)
 
     @instrument_w_nvtx
-    def __release_param(self, param: Parameter) -> None:
+    def __release_param(self, param: Parameter, keep_secondary: bool = False) -> None:
         if param.ds_status == ZeroParamStatus.AVAILABLE and not param.ds_active_sub_modules:
             debug_rank0(f"-release: {param.ds_summary()}")
+            if keep_secondary and not param.ds_persist and param not in self.__params_with_secondary:
+                self.__save_secondary_partition(param)
             param.partition()
             self.__n_available_params -= param.ds_numel
 
+    def __save_secondary_partition(self, param: Parameter) -> None:
+        world_size = dist.get_world_size(group=self.__secondary_group)
+        rank = dist.get_rank(group=self.__secondary_group)
+        partition_numel = math.ceil(param.ds_numel / world_size)
+        start = min(rank * partition_numel, param.ds_numel)
+        end = min(start + partition_numel, param.ds_numel)
+        secondary = torch.zeros(partition_numel, dtype=param.dtype, device=param.device)
+        secondary.narrow(0, 0, end - start).copy_(param.data.view(-1).narrow(0, start, end - start))
+        param.ds_secondary_tensor = secondary
+        self.__params_with_secondary.add(param)
+
     @instrument_w_nvtx
     @functools.lru_cache(maxsize=None)
     def __params_to_release(self,
                             submodule_to_release: Module,
-                            step_id: int) -> Set[int]:
+                            step_id: int,
+                            trace_id: int) -> Set[int]:
         if not self.is_complete_trace():
             raise RuntimeError("expected trace to be complete")
 
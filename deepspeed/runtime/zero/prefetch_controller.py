@@ -0,0 +1,123 @@
+"""
+Copyright (c) Microsoft Corporation
+Licensed under the MIT license.
+"""
+
+import torch
+from deepspeed import comm as dist
+from deepspeed.utils import log_dist
+
+
+def adjust_prefetch_limit(limit,
+                          min_limit,
+                          max_limit,
+                          peak_memory_fraction,
+                          max_memory_fraction,
+                          exposed_fraction,
+                          max_exposed_fraction,
+                          factor):
+    """New value of a prefetch limit after a step. The limit shrinks by
+    ``factor`` when the peak memory exceeded ``max_memory_fraction`` of the
+    device memory, and grows by ``factor`` when more than
+    ``max_exposed_fraction`` of the gathered parameters were not prefetched
+    and the memory allows it. Stays within [min_limit, max_limit]."""
+    if peak_memory_fraction > max_memory_fraction:
+        limit = int(limit / factor)
+    elif exposed_fraction > max_exposed_fraction:
+        limit = int(limit * factor)
+    return min(max(limit, min_limit), max_limit)
+
+
+class ZeroPrefetchController:
+    """Adapts the prefetch bucket size and the live parameter budget of ZeRO
+    stage 3 after every step.
+
+    The controller watches the peak device memory of the step and the
+    fraction of the gathered parameters that were fetched on demand, i.e.
+    whose all-gather latency was exposed because they were not prefetched.
+    Both limits shrink when the peak memory leaves less than
+    ``memory_headroom`` of the device memory free, and grow while
+    all-gathers are exposed and memory is available. All ranks apply the
+    smallest limits, as the prefetches are collectives.
+    """
+    def __init__(self, optimizer, control_config, device, use_hpu=False):
+        self.optimizer = optimizer
+        self.device = device
+        self.use_hpu = use_hpu
+        self.max_memory_fraction = 1 - control_config.memory_headroom
+        self.max_exposed_fraction = control_config.max_exposed_fraction
+        self.factor = control_config.adjust_factor
+
+        limits = optimizer.get_prefetch_limits()
+        prefetch_limit = limits["prefetch_bucket_size"]
+        live_limit = limits["max_live_parameters"]
+        min_prefetch = min(control_config.min_prefetch_bucket_size, prefetch_limit)
+        max_prefetch = control_config.max_prefetch_bucket_size or prefetch_limit
+        min_live = min(control_config.min_live_parameters, live_limit)
+        max_live = control_config.max_live_parameters or live_limit
+        self.bounds = {
+            "prefetch_bucket_size": (min_prefetch,
+                                     max_prefetch),
+            "max_live_parameters": (min_live,
+                                    max_live),
+        }
+
+        self.total_memory = self._total_memory()
+        if self.total_memory is None:
+            log_dist(
+                "[PrefetchController] Device memory is unknown, the limits only grow up to their bounds",
+                ranks=[0])
+        self._reset_peak_memory()
+
+    def _memory_module(self):
+        if self.use_hpu:
+            import habana_frameworks.torch.hpu as hpu
+            return hpu
+        return torch.cuda if torch.cuda.is_available() else None
+
+    def _total_memory(self):
+        if self.use_hpu:
+            return self._memory_module().memory_stats().get("Limit")
+        if torch.cuda.is_available():
+            return torch.cuda.get_device_properties(self.device).total_memory
+        return None
+
+    def _peak_memory(self):
+        memory = self._memory_module()
+        return memory.max_memory_allocated() if memory is not None else 0
+
+    def _reset_peak_memory(self):
+        memory = self._memory_module()
+        if memory is not None:
+            memory.reset_peak_memory_stats()
+
+    def step(self):
+        """Called after every optimizer step."""
+        demand_numel, fetched_numel = self.optimizer.get_prefetch_stats()
+        exposed_fraction = demand_numel / fetched_numel if fetched_numel else 0.
+        peak_memory_fraction = self._peak_memory(
+        ) / self.total_memory if self.total_memory else 0.
+        self._reset_peak_memory()
+
+        limits = self.optimizer.get_prefetch_limits()
+        names = list(self.bounds.keys())
+        new_limits = [
+            adjust_prefetch_limit(limits[name],
+                                  *self.bounds[name],
+                                  peak_memory_fraction,
+                                  self.max_memory_fraction,
+                                  exposed_fraction,
+                                  self.max_exposed_fraction,
+                                  self.factor) for name in names
+        ]
+
+        # ranks must prefetch the same parameters, the most constrained decides
+        agreed = torch.tensor(new_limits, dtype=torch.long, device=self.device)
+        dist.all_reduce(agreed, op=dist.ReduceOp.MIN)
+        new_limits = dict(zip(names, agreed.tolist()))
+        if new_limits != limits:
+            self.optimizer.set_prefetch_limits(**new_limits)
+            log_dist(
+                f"[PrefetchController] peak memory {peak_memory_fraction:.2f}, "
+                f"exposed all-gathers {exposed_fraction:.2f}: {new_limits}",
+                ranks=[0])
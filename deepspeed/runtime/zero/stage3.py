@@ -88,6 +88,7 @@ class DeepSpeedZeroOptimizer_Stage3(ZeROOptimizer):
                  prefetch_bucket_size=50000000,
                  max_reuse_distance=1000000000,
                  max_live_parameters=1000000000,
+                 max_cached_traces=1,
                  param_persistence_threshold=100000,
                  model_persistence_threshold=sys.maxsize,
                  dp_process_group=None,
@@ -95,6 +96,8 @@ class DeepSpeedZeroOptimizer_Stage3(ZeROOptimizer):
                  overlap_comm=False,
                  offload_optimizer_config=None,
                  offload_param_config=None,
+                 weight_quantization_config=None,
+                 secondary_partition=False,
                  sub_group_size=1000000000000,
                  mpu=None,
                  clip_grad=0.0,
@@ -163,9 +166,12 @@ class DeepSpeedZeroOptimizer_Stage3(ZeROOptimizer):
             prefetch_bucket_size=prefetch_bucket_size,
             max_reuse_distance=max_reuse_distance,
             max_live_parameters=max_live_parameters,
+            max_cached_traces=max_cached_traces,
             param_persistence_threshold=param_persistence_threshold,
             model_persistence_threshold=model_persistence_threshold,
             offload_param_config=offload_param_config,
+            weight_quantization_config=weight_quantization_config,
+            secondary_partition=secondary_partition,
             mpu=mpu,
             use_hpu=self.use_hpu,
             no_cuda=self.no_cuda)
@@ -252,6 +258,7 @@ class DeepSpeedZeroOptimizer_Stage3(ZeROOptimizer):
         self.all_reduce_print = False
 
         self.prefetch_elements = int(prefetch_bucket_size)
+        self.max_live_parameters = int(max_live_parameters)
 
         self.contiguous_gradients = contiguous_gradients
 
@@ -1087,6 +1094,45 @@ class DeepSpeedZeroOptimizer_Stage3(ZeROOptimizer):
             f"{tag}: elems in_bucket {self.elements_in_ipg_bucket} param {param_elems} max_percent {percent_of_bucket_size}",
             force=False)
 
+    def get_bucket_sizes(self):
+        return {
+            "reduce_bucket_size": self.reduce_bucket_size,
+            "prefetch_bucket_size": self.prefetch_elements
+        }
+
+    def set_bucket_sizes(self, reduce_bucket_size=None, prefetch_bucket_size=None):
+        """Changes the bucket sizes from the next forward pass on, all ranks
+        must set the same sizes."""
+        if reduce_bucket_size is not None:
+            self.reduce_bucket_size = int(reduce_bucket_size)
+            if self.contiguous_gradients:
+                # the contiguous gradient buffer is allocated once
+                self.reduce_bucket_size = min(self.reduce_bucket_size,
+                                              self.__ipg_bucket_flat_buffer.numel())
+        if prefetch_bucket_size is not None:
+            self.prefetch_elements = int(prefetch_bucket_size)
+            self.parameter_offload.set_prefetch_bucket_size(self.prefetch_elements)
+
+    def get_prefetch_limits(self):
+        return {
+            "prefetch_bucket_size": self.prefetch_elements,
+            "max_live_parameters": self.max_live_parameters
+        }
+
+    def set_prefetch_limits(self, prefetch_bucket_size=None, max_live_parameters=None):
+        """Changes the parameter prefetch limits from the next forward pass on,
+        all ranks must set the same limits."""
+        if prefetch_bucket_size is not None:
+            self.set_bucket_sizes(prefetch_bucket_size=prefetch_bucket_size)
+        if max_live_parameters is not None:
+            self.max_live_parameters = int(max_live_parameters)
+            self.parameter_offload.set_max_live_parameters(self.max_live_parameters)
+
+    def get_prefetch_stats(self):
+        """Number of parameter elements gathered on demand and in total since
+        the last call."""
+        return self.parameter_offload.pop_fetch_stats()
+
     ###############Idependent Partition Gradient ########################
     def reduce_independent_p_g_buckets_and_remove_grads(self, param, i):
         #print_rank_0(f"Inside reduce ipg buckets. {debug_param2name_id_shape(param)}, ipg elements {self.elements_in_ipg_bucket}, reduce bucket size {self.reduce_bucket_size}", force=True)
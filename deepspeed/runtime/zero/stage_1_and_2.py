@@ -4,13 +4,14 @@ Copyright 2019 The Microsoft DeepSpeed Team
 
 import torch
 import os
+import math
 from deepspeed import comm as dist
 from torch import inf
 from packaging import version as pkg_version
 from collections import OrderedDict
 
 from deepspeed.runtime import ZeROOptimizer
-from deepspeed.runtime.fp16.loss_scaler import LossScaler, DynamicLossScaler
+from deepspeed.runtime.fp16.loss_scaler import LossScaler, DynamicLossScaler, DeviceDynamicLossScaler
 from deepspeed.runtime.utils import (bwc_tensor_model_parallel_rank,
                                      get_global_norm,
                                      see_memory_usage,
@@ -24,10 +25,14 @@ from deepspeed.runtime.utils import (bwc_tensor_model_parallel_rank,
                                      reorder_optimizer_groups)
 from deepspeed.runtime.zero.config import ZeroStageEnum
 from deepspeed.runtime.zero.offload_config import OffloadDeviceEnum
+from deepspeed.runtime.zero.grad_offload_pipeline import GradientOffloadPipeline
+from deepspeed.runtime.zero.overlapped_step import OverlappedOptimizerStep
+from deepspeed.runtime.zero.bucket_arena import BucketArena
+from deepspeed.runtime.comm.quantized_collectives import BlockQuantizer, all_to_all_quant_reduce, quant_all_reduce
 
 from deepspeed.ops.adam import DeepSpeedCPUAdam
 from deepspeed.ops.op_builder import UtilsBuilder
-from deepspeed.utils import logger
+from deepspeed.utils import logger, groups
 from deepspeed.moe.utils import is_moe_param
 from deepspeed.git_version_info import version
 
@@ -134,8 +139,13 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                  expert_parallel_group=None,
                  expert_data_parallel_group=None,
                  reduce_scatter=True,
+                 hierarchical_reduce_scatter=False,
+                 gradient_quantization=None,
+                 persistent_gradient_buckets=False,
+                 local_gradient_accumulation=False,
                  overlap_comm=False,
                  cpu_offload=False,
+                 offload_optimizer_config=None,
                  mpu=None,
                  clip_grad=0.0,
                  communication_data_type=torch.float16,
@@ -148,6 +158,7 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                  has_moe_layers=False,
                  fp16_master_weights_and_gradients=False,
                  elastic_checkpoint=False,
+                 deferred_overflow_check=False,
                  use_hpu=False,
                  no_cuda=False):
 
@@ -204,6 +215,36 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
         self.dp_process_group = dp_process_group
 
+        # intra-node and inter-node groups of dp_process_group, see _hierarchical_all_reduce()
+        self.hierarchical_dp_groups = None
+        if hierarchical_reduce_scatter and reduce_scatter:
+            self.hierarchical_dp_groups = groups._create_hierarchical_data_parallel_groups(
+                self.dp_process_group,
+                self.get_current_device())
+            if self.hierarchical_dp_groups is None and dist.get_rank() == 0:
+                logger.warning(
+                    "Hierarchical reduce scatter needs data parallel ranks on several nodes "
+                    "with the same number (>1) of ranks per node, using flat reductions.")
+
+        # communicates gradient buckets as blockwise quantized tensors, see average_tensor()
+        self.gradient_quantizer = None
+        self.gradient_quantization_error_feedback = False
+        self.quantization_residuals = {}
+        if gradient_quantization is not None and gradient_quantization.enabled:
+            if self.hierarchical_dp_groups is not None:
+                if dist.get_rank() == 0:
+                    logger.warning(
+                        "Hierarchical reduce scatter is not supported with gradient "
+                        "quantization, using quantized flat reductions.")
+                self.hierarchical_dp_groups = None
+            self.gradient_quantizer = BlockQuantizer(gradient_quantization.dtype,
+                                                     gradient_quantization.block_size)
+            self.gradient_quantization_error_feedback = gradient_quantization.error_feedback
+
+        # gradient buckets reused across steps instead of allocated per step
+        self.bucket_arena = BucketArena(
+            self.get_current_device()) if persistent_gradient_buckets else None
+
         #expert parallel group
         self.ep_process_group = expert_parallel_group
 
@@ -257,6 +298,23 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         self.ignore_unused_parameters = ignore_unused_parameters
         self.round_robin_gradients = round_robin_gradients
 
+        # gradients of micro-steps before the accumulation boundary are summed
+        # locally and reduced once at the boundary, see _accumulate_grad_locally()
+        self.local_gradient_accumulation = False
+        if local_gradient_accumulation and gradient_accumulation_steps > 1:
+            if not self.partition_gradients:
+                logger.warning(
+                    "Local gradient accumulation only applies to stage 2, stage 1 "
+                    "already reduces gradients at the accumulation boundary only.")
+            elif self.cpu_offload:
+                logger.warning(
+                    "Local gradient accumulation is not supported with CPU offload, "
+                    "reducing gradients every micro-step.")
+            else:
+                self.local_gradient_accumulation = True
+        self.local_grad_buffers = None
+        self.locally_accumulated_ids = set()
+
         self.extra_large_param_to_reduce = None
         self.fp16_master_weights_and_gradients = fp16_master_weights_and_gradients
 
@@ -524,11 +582,44 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             for param in param_group:
                 self.is_param_in_current_partition[self.get_param_id(param)] = False
 
+        # gradients copied to the fp32 partition, see pipelined_copy_grad_to_fp32_buffer()
+        self.grad_offload_pipeline = None
+        # CPU optimizer step overlapped with the next forward pass, see register_overlapped_step_hooks()
+        self.overlapped_step = None
         if self.cpu_offload:
             self.accumulated_grads_in_cpu = {}
             self.norm_for_param_grads = {}
             self.local_overflow = False
             self.grad_position = {}
+            if offload_optimizer_config is not None and offload_optimizer_config.pipeline_grad_offload:
+                self.grad_offload_pipeline = GradientOffloadPipeline(
+                    offload_optimizer_config.grad_buffer_count,
+                    min(offload_optimizer_config.grad_buffer_size,
+                        largest_param_numel),
+                    self.dtype,
+                    self.get_current_device(),
+                    use_hpu=self.use_hpu)
+                # parameters whose gradient was copied in the current accumulation window
+                self.offloaded_grad_ids = set()
+            if offload_optimizer_config is not None and offload_optimizer_config.overlap_step:
+                if type(self.optimizer) != DeepSpeedCPUAdam or self.has_moe_layers:
+                    logger.warning(
+                        "overlap_step requires DeepSpeedCPUAdam and no MoE layers, "
+                        "running the optimizer step before returning from step()")
+                else:
+                    dp_size = dist.get_world_size(group=self.dp_process_group)
+                    chunk_numel = max(
+                        self.nccl_start_alignment_factor,
+                        int(self.allgather_bucket_size) // dp_size //
+                        self.nccl_start_alignment_factor *
+                        self.nccl_start_alignment_factor)
+                    self.overlapped_step = OverlappedOptimizerStep(
+                        self.optimizer,
+                        self.single_partition_of_fp32_groups,
+                        self.parallel_partitioned_bit16_groups,
+                        self.real_dp_process_group,
+                        chunk_numel,
+                        use_hpu=self.use_hpu)
             zeros = torch.zeros(
                 largest_param_numel,
                 device=self.device,
@@ -597,13 +688,27 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             self.loss_scaler = LossScaler(scale=loss_scale_value)
             cur_iter = 0
         else:
-            if dynamic_loss_args is None:
+            if deferred_overflow_check and (cpu_offload or has_moe_layers):
+                logger.warning(
+                    "Deferred overflow check is not supported with CPU offload or MoE layers, disabling it."
+                )
+                deferred_overflow_check = False
+            if deferred_overflow_check:
+                self.loss_scaler = DeviceDynamicLossScaler(
+                    device=self.get_current_device(),
+                    **(dynamic_loss_args or {}))
+            elif dynamic_loss_args is None:
                 self.loss_scaler = DynamicLossScaler()
             else:
                 self.loss_scaler = DynamicLossScaler(**dynamic_loss_args)
 
             self.dynamic_loss_scale = True
 
+        # overflow flag and loss scale stay on device, see read_deferred_overflows()
+        self.deferred_overflow_check = isinstance(self.loss_scaler,
+                                                  DeviceDynamicLossScaler)
+        self.deferred_overflow = None
+
         # TODO SW-83502 - add support for HPU mem monitor
         if torch.cuda.is_available():
             see_memory_usage("Before initializing optimizer states", force=True)
@@ -752,6 +857,16 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
         return reordered_tensors, reordered_indices
 
+    def _get_ipg_buffer(self, index):
+        # gradients in the IPG buffer are either copied out or released after
+        # the reduction only in stage 2 without offload, otherwise they stay
+        # views of the buffer, which must not be reused
+        if self.bucket_arena is not None and self.partition_gradients and not self.cpu_offload:
+            return self.bucket_arena.get(f"ipg_{index}", self.reduce_bucket_size, self.dtype)
+        return torch.empty(int(self.reduce_bucket_size),
+                           dtype=self.dtype,
+                           device=self.get_current_device())
+
     def _release_ipg_buffers(self):
         if self.contiguous_gradients:
             self.ipg_buffer = None
@@ -790,9 +905,7 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         # with PP we must create ipg buffer, since backward is handled outside zero
         if pipeline_parallel and self.contiguous_gradients:
             self.ipg_buffer = []
-            buf_0 = torch.empty(int(self.reduce_bucket_size),
-                                dtype=self.dtype,
-                                device=self.get_current_device())
+            buf_0 = self._get_ipg_buffer(0)
             self.ipg_buffer.append(buf_0)
             self.ipg_index = 0
 
@@ -843,6 +956,13 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                         partition_id)
 
     def independent_gradient_partition_epilogue(self):
+        if self.local_gradient_accumulation:
+            if not self.is_gradient_accumulation_boundary:
+                # all gradients of the micro-step were accumulated locally
+                self._release_ipg_buffers()
+                return
+            self._reduce_local_grads()
+
         self.report_ipg_memory_usage(f"In ipg_epilogue before reduce_ipg_grads", 0)
         self.reduce_ipg_grads()
         self.report_ipg_memory_usage(f"In ipg_epilogue after reduce_ipg_grads", 0)
@@ -857,6 +977,11 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             # It is safe to clear previously reduced grads of other partitions
             self._clear_previous_reduced_grads()
 
+        # copies of earlier micro steps complete in the background
+        if self.grad_offload_pipeline is not None and self.is_gradient_accumulation_boundary:
+            self.grad_offload_pipeline.synchronize()
+            self.offloaded_grad_ids.clear()
+
         if self.cpu_offload is False:
             for i, _ in enumerate(self.bit16_groups):
 
@@ -988,6 +1113,24 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             f"{tag}: elems in_bucket {self.elements_in_ipg_bucket} param {param_elems} max_percent {percent_of_bucket_size}"
         )
 
+    def get_bucket_sizes(self):
+        return {
+            "reduce_bucket_size": self.reduce_bucket_size,
+            "allgather_bucket_size": self.allgather_bucket_size
+        }
+
+    def set_bucket_sizes(self, reduce_bucket_size=None, allgather_bucket_size=None):
+        """Changes the bucket sizes from the next backward pass on, all ranks
+        must set the same sizes."""
+        if reduce_bucket_size is not None:
+            self.reduce_bucket_size = int(reduce_bucket_size)
+        if allgather_bucket_size is not None:
+            # keeps the shard starts aligned, see the assertion in __init__
+            alignment = self.nccl_start_alignment_factor
+            self.allgather_bucket_size = max(
+                alignment,
+                int(allgather_bucket_size) // alignment * alignment)
+
     # create a flat tensor aligned at the alignment boundary
     def flatten_dense_tensors_aligned(self, tensor_list, alignment):
         return self.flatten(align_dense_tensors(tensor_list, alignment))
@@ -1077,6 +1220,17 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                 self.gradient_reduction_w_predivide(tensor)
                 return
 
+            # MoE params are reduced over their own groups
+            if self.hierarchical_dp_groups is not None and not self.ipg_bucket_has_moe_params:
+                tensor.div_(dist.get_world_size(group=self.dp_process_group))
+                tensor_to_reduce = tensor
+                if self.communication_data_type != tensor.dtype:
+                    tensor_to_reduce = tensor.to(self.communication_data_type)
+                self._hierarchical_all_reduce(tensor_to_reduce)
+                if self.communication_data_type != tensor.dtype:
+                    tensor.copy_(tensor_to_reduce)
+                return
+
             # Accumulate destination ranks and bucket offsets for each gradient slice.
             # Note: potential future optimization, record access pattern of parameters
             # in backward pass and partition gradients w.r.t. access pattern so that our
@@ -1139,6 +1293,10 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             if not self.ipg_bucket_has_moe_params:
                 tensor.div_(dist.get_world_size(group=self.dp_process_group))
 
+            if self.gradient_quantizer is not None and not self.ipg_bucket_has_moe_params:
+                self._quantized_reduce_scatter(tensor, rank_and_offsets)
+                return
+
             tensor_to_reduce = tensor
             if self.communication_data_type != tensor.dtype:
                 tensor_to_reduce = tensor.to(self.communication_data_type)
@@ -1165,6 +1323,91 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             if self.communication_data_type != tensor.dtype:
                 tensor.copy_(tensor_to_reduce)
 
+    def _quantized_reduce_scatter(self, tensor, rank_and_offsets):
+        """Sums the slices of ``tensor`` into the ranks that own them with
+        quantized communication, the slices of other ranks are left unreduced
+        like with a reduce. With error feedback, the quantization error of
+        each gradient is added back to its gradient of the next step. The
+        errors are kept unscaled and in fp32, so they follow changes of the
+        loss scale and do not underflow in fp16.
+        """
+        rank_ranges = [[] for _ in range(dist.get_world_size(group=self.dp_process_group))]
+        for dst, bucket_offset, numel in rank_and_offsets:
+            rank_ranges[dst].append((int(bucket_offset), int(numel)))
+
+        residual = None
+        if self.gradient_quantization_error_feedback:
+            loss_scale = self.loss_scale
+            residual = torch.cat([
+                self.quantization_residuals.get(
+                    param_id,
+                    torch.zeros(param.numel(),
+                                dtype=torch.float32,
+                                device=tensor.device))
+                for _,
+                param,
+                param_id in self.params_in_ipg_bucket
+            ]).mul_(loss_scale)
+
+        all_to_all_quant_reduce(tensor,
+                                rank_ranges,
+                                self.gradient_quantizer,
+                                group=self.dp_process_group,
+                                residual=residual)
+
+        if residual is not None:
+            residual.div_(loss_scale)
+            offset = 0
+            for _, param, param_id in self.params_in_ipg_bucket:
+                self.quantization_residuals[param_id] = residual.narrow(
+                    0,
+                    offset,
+                    param.numel())
+                offset += param.numel()
+
+    def _hierarchical_all_reduce(self, tensor):
+        """All-reduces ``tensor`` over the data parallel group in two levels:
+        a reduce-scatter within the node, an all-reduce of the local chunk
+        across nodes among the ranks with the same local rank, and an
+        all-gather within the node. Each rank only sends 1/local_world_size
+        of the tensor over the inter-node links.
+        """
+        intra_node_group, inter_node_group = self.hierarchical_dp_groups
+        local_world_size = dist.get_world_size(group=intra_node_group)
+        local_rank = dist.get_rank(group=intra_node_group)
+        chunk_numel = tensor.numel() // local_world_size
+
+        async_handles = []
+        if chunk_numel > 0:
+            chunks = list(
+                tensor.narrow(0,
+                              0,
+                              chunk_numel * local_world_size).chunk(local_world_size))
+            local_chunk = torch.empty_like(chunks[local_rank])
+            async_handles.append(
+                dist.reduce_scatter(local_chunk,
+                                    chunks,
+                                    group=intra_node_group))
+            async_handles.append(dist.all_reduce(local_chunk, group=inter_node_group))
+            async_handles.append(
+                dist.all_gather(chunks,
+                                local_chunk,
+                                group=intra_node_group))
+
+        # the last elements that do not split evenly between the local ranks
+        remainder_numel = tensor.numel() - chunk_numel * local_world_size
+        if remainder_numel > 0:
+            async_handles.append(
+                dist.all_reduce(tensor.narrow(0,
+                                              chunk_numel * local_world_size,
+                                              remainder_numel),
+                                group=self.dp_process_group))
+
+        if not get_use_hpu():
+            for handle in async_handles:
+                if handle is not None:
+                    handle.wait()
+
     ##############################################################################
     ############################# CPU Offload Methods#############################
     ##############################################################################
@@ -1306,6 +1549,37 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         dest_tensor.copy_(src_tensor, non_blocking=True)
         param.grad = None  #offload only
 
+    def pipelined_copy_grad_to_fp32_buffer(self, param):
+        """Accumulates the gradient of ``param`` into the fp32 partition on CPU
+        through the gradient offload pipeline. At the accumulation boundary
+        the norm and overflow of the accumulated gradient are computed on CPU
+        once it is complete."""
+        param_id = self.get_param_id(param)
+
+        [i, source_offset, dest_offset, num_elements] = self.grad_position[param_id]
+
+        dest_tensor = self.single_partition_of_fp32_groups[i].grad.view(-1).narrow(
+            0,
+            dest_offset,
+            num_elements)
+        src_tensor = param.grad.view(-1).narrow(0, source_offset, num_elements)
+
+        # the first gradient of an accumulation window overwrites the last step
+        accumulate = param_id in self.offloaded_grad_ids
+        self.offloaded_grad_ids.add(param_id)
+
+        on_done = None
+        if self.is_gradient_accumulation_boundary:
+
+            def on_done(accumulated_grad):
+                norm = accumulated_grad.double().norm(2)
+                self.norm_for_param_grads[param_id] = norm
+                if not math.isfinite(norm.item()):
+                    self.local_overflow = True
+
+        self.grad_offload_pipeline.copy(src_tensor, dest_tensor, accumulate, on_done)
+        param.grad = None  #offload only
+
     def complete_grad_norm_calculation_for_cpu_offload(self, params):
         total_norm = 0.0
         norm_type = 2.0
@@ -1354,6 +1628,10 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
     ############################################################################################
     def copy_grads_in_partition(self, param):
+        if self.grad_offload_pipeline is not None:
+            self.pipelined_copy_grad_to_fp32_buffer(param)
+            return
+
         if self.cpu_offload:
 
             if self.gradient_accumulation_steps > 1:
@@ -1451,7 +1729,51 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         self.elements_in_ipg_bucket = 0
         #####################################################################
 
+    def _local_grad_view(self, param, i):
+        # the buffers are aligned with the flat bit16 groups, so that the
+        # gradients of a partition are contiguous
+        if self.local_grad_buffers is None:
+            self.local_grad_buffers = [
+                torch.empty_like(flat) for flat in self.bit16_groups_flat
+            ]
+        flat = self.bit16_groups_flat[i]
+        offset = (param.data_ptr() - flat.data_ptr()) // flat.element_size()
+        return self.local_grad_buffers[i].narrow(0, offset, param.numel()).view_as(param)
+
+    def _accumulate_grad_locally(self, param, i):
+        """Before the accumulation boundary, sums the gradient of ``param``
+        into the local gradient buffer instead of reducing it. At the
+        boundary, adds the local sum to the gradient, which is then reduced
+        once. Returns whether the reduction is skipped."""
+        param_id = self.get_param_id(param)
+        local_grad = self._local_grad_view(param, i)
+        if not self.is_gradient_accumulation_boundary:
+            if param_id in self.locally_accumulated_ids:
+                local_grad.add_(param.grad)
+            else:
+                local_grad.copy_(param.grad)
+                self.locally_accumulated_ids.add(param_id)
+            param.grad = None
+            return True
+
+        if param_id in self.locally_accumulated_ids:
+            param.grad.add_(local_grad)
+            self.locally_accumulated_ids.remove(param_id)
+        return False
+
+    def _reduce_local_grads(self):
+        # parameters without a gradient in the boundary micro-step
+        for i, group in enumerate(self.bit16_groups):
+            for param in group:
+                param_id = self.get_param_id(param)
+                if param_id in self.locally_accumulated_ids:
+                    self.locally_accumulated_ids.remove(param_id)
+                    param.grad = self._local_grad_view(param, i)
+                    self.reduce_independent_p_g_buckets_and_remove_grads(param, i)
+
     def reduce_ready_partitions_and_remove_grads(self, param, i):
+        if self.local_gradient_accumulation and self._accumulate_grad_locally(param, i):
+            return
         if self.partition_gradients or self.is_gradient_accumulation_boundary:
             self.reduce_independent_p_g_buckets_and_remove_grads(param, i)
 
@@ -1524,7 +1846,10 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
     ######################Reduction Related Methods##############################
     def allreduce_bucket(self, bucket, rank=None, log=None, communication_data_type=None):
         rank = None
-        tensor = self.flatten(bucket)
+        if self.bucket_arena is not None:
+            tensor = self.bucket_arena.flatten("allreduce_bucket", bucket)
+        else:
+            tensor = self.flatten(bucket)
 
         tensor_to_allreduce = tensor
 
@@ -1534,11 +1859,21 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             communication_data_type = self.communication_data_type
 
         if communication_data_type != tensor.dtype:
-            tensor_to_allreduce = tensor.to(communication_data_type)
+            if self.bucket_arena is not None:
+                tensor_to_allreduce = self.bucket_arena.get(
+                    "allreduce_bucket",
+                    tensor.numel(),
+                    communication_data_type).copy_(tensor)
+            else:
+                tensor_to_allreduce = tensor.to(communication_data_type)
 
         tensor_to_allreduce.div_(dist.get_world_size(group=self.dp_process_group))
 
-        if rank is None:
+        if rank is None and self.gradient_quantizer is not None:
+            quant_all_reduce(tensor_to_allreduce,
+                             self.gradient_quantizer,
+                             group=self.dp_process_group)
+        elif rank is None:
             #    "All Reducing"
             dist.all_reduce(tensor_to_allreduce, group=self.dp_process_group)
         else:
@@ -1746,6 +2081,99 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
         return total_norm
 
+    def _counts_for_grad_norm(self, param):
+        # Pipeline parallelism may replicate parameters. Avoid multi-counting.
+        if hasattr(param, PIPE_REPLICATED) and param.ds_pipe_replicated:
+            return False
+        return is_model_parallel_parameter(param) or (self.model_parallel_rank == 0)
+
+    def _get_flat_grad_partition(self, i):
+        if self.bucket_arena is not None:
+            return self.bucket_arena.flatten(f"grad_partition_{i}",
+                                             self.averaged_gradients[i],
+                                             int(self.partition_size[i]))
+        # If we are last partition, ensure we have same size grads and partition size, if not pad with zero tensors
+        partition_id = dist.get_rank(group=self.real_dp_process_group[i])
+        if partition_id == dist.get_world_size(group=self.real_dp_process_group[i]) - 1:
+            return self.flatten_dense_tensors_aligned(self.averaged_gradients[i],
+                                                      int(self.partition_size[i]))
+        return self.flatten(self.averaged_gradients[i])
+
+    def _fused_grad_sum_squares(self):
+        """Computes the global sum of squares of the gradients in one pass over
+        the flat gradient partition of each group.
+
+        An inf/nan gradient makes the sum of squares inf/nan, so the overflow
+        flag is read from the same reduction as the norm. Gradients that do not
+        count towards the norm (replicated or non model parallel parameters)
+        are summed separately and only used for the overflow flag. Both sums
+        are reduced with a single all-reduce per process group.
+
+        Returns the reduced device tensor [sum of squares of the norm, sum of
+        squares only checked for overflow] and a list with the flat (bit16)
+        gradient partition of each group, or None for the groups whose flat
+        partition was dropped. Only a single group keeps its flat partition,
+        so that at most one group partition is alive at a time like in the
+        optimizer step.
+        """
+        sum_squares = torch.zeros(2, dtype=torch.float64, device=self.get_current_device())
+        num_groups = len(self.bit16_groups)
+        flat_grad_partitions = [None] * num_groups
+        for i in range(num_groups):
+            flat_grad_partition = self._get_flat_grad_partition(i)
+            if num_groups == 1:
+                flat_grad_partitions[i] = flat_grad_partition
+            params = self.params_in_partition[i]
+            if all(self._counts_for_grad_norm(p) for p in params):
+                sum_squares[0] += torch.norm(flat_grad_partition,
+                                             2,
+                                             dtype=torch.float64).square()
+            else:
+                for g, p in zip(self.averaged_gradients[i], params):
+                    index = 0 if self._counts_for_grad_norm(p) else 1
+                    sum_squares[index] += torch.norm(g, 2, dtype=torch.float64).square()
+            del flat_grad_partition
+
+        sum_squares = sum_squares.float()
+        dist.all_reduce(sum_squares, op=dist.ReduceOp.SUM, group=self.dp_process_group)
+        self._model_parallel_all_reduce(tensor=sum_squares, op=dist.ReduceOp.SUM)
+        return sum_squares, flat_grad_partitions
+
+    def _fused_norm_and_overflow(self):
+        """Returns the scaled global L2 gradient norm, the overflow flag and the
+        flat gradient partitions, reading the norm back with a single host sync.
+        """
+        sum_squares, flat_grad_partitions = self._fused_grad_sum_squares()
+        norm_sum_squares, other_sum_squares = sum_squares.tolist()
+        overflow = not math.isfinite(norm_sum_squares + other_sum_squares)
+        return math.sqrt(norm_sum_squares) if not overflow else -1.0, overflow, flat_grad_partitions
+
+    def _deferred_norm_and_overflow(self):
+        """Same as _fused_norm_and_overflow, but returns the norm and the
+        overflow flag as device tensors without synchronizing with the host.
+        """
+        sum_squares, flat_grad_partitions = self._fused_grad_sum_squares()
+        overflow = ~torch.isfinite(sum_squares.sum())
+        norm = torch.where(overflow, torch.full_like(sum_squares[0], -1.0), sum_squares[0].sqrt())
+        return norm, overflow, flat_grad_partitions
+
+    def read_deferred_overflows(self):
+        """Returns the number of steps skipped because of an overflow since the
+        last call. With deferred_overflow_check this synchronizes with the device,
+        otherwise overflows are reported by the ``overflow`` attribute and this
+        returns 0.
+        """
+        if not self.deferred_overflow_check:
+            return 0
+        prev_scale = self.loss_scale.item()
+        overflow_count = self.loss_scaler.read_overflows()
+        if overflow_count > 0 and dist.get_rank() == 0:
+            logger.info(
+                "[deepspeed] OVERFLOW! Skipped {} steps, loss scale: {}".format(
+                    overflow_count,
+                    prev_scale))
+        return overflow_count
+
     # creates a flat fused tensor from the tensor list starting at the first_offset
     # in the first tensor of the list. If there are not enough elements in the tensor
     # list then the flat tensor will be padded with zeros
@@ -1882,23 +2310,59 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             self.optimizer.step()
         self.optimizer.param_groups = original_param_groups
 
+    def _masked_optimizer_step(self, group_no, overflow):
+        # runs the step and reverts it on device if overflow is set, host side
+        # optimizer state (e.g. the step count of fused optimizers) still advances
+        fp32_partition = self.single_partition_of_fp32_groups[group_no]
+        state = self.optimizer.state[fp32_partition]
+        saved_state = {
+            key: value.clone()
+            for key,
+            value in state.items()
+            if torch.is_tensor(value) and value.device == fp32_partition.device
+        }
+        saved_partition = fp32_partition.data.clone()
+        self._optimizer_step(group_no)
+        fp32_partition.data.copy_(
+            torch.where(overflow,
+                        saved_partition,
+                        fp32_partition.data))
+        for key, value in saved_state.items():
+            state[key].copy_(torch.where(overflow, value, state[key]))
+        # states created by this step, e.g. the Adam moments on the first
+        # step, are reset to zero as if the step had not been taken
+        for key, value in state.items():
+            if key not in saved_state and torch.is_tensor(
+                    value) and value.device == fp32_partition.device:
+                value.copy_(torch.where(overflow, torch.zeros_like(value), value))
+
     def step(self, closure=None):
         """
         Not supporting closure.
         """
         self.micro_step_id = -1
+        self.wait_overlapped_step()
 
         see_memory_usage(f"In step before checking overflow")
 
         # First compute norm for all group so we know if there is overflow
-        self.check_overflow()
+        flat_grad_partitions = None
+        if self.cpu_offload or self.has_moe_layers:
+            self.check_overflow()
+        elif self.deferred_overflow_check:
+            # the step is always taken and reverted on device on overflow
+            scaled_global_grad_norm, self.deferred_overflow, flat_grad_partitions = self._deferred_norm_and_overflow()
+            self.overflow = False
+        else:
+            scaled_global_grad_norm, self.overflow, flat_grad_partitions = self._fused_norm_and_overflow()
         OPTIMIZER_ALLGATHER = 'optimizer_allgather'
         OPTIMIZER_GRADIENTS = 'optimizer_gradients'
         OPTIMIZER_STEP = 'optimizer_step'
         timer_names = [OPTIMIZER_ALLGATHER, OPTIMIZER_GRADIENTS, OPTIMIZER_STEP]
 
         prev_scale = self.loss_scale
-        self._update_scale(self.overflow)
+        if not self.deferred_overflow_check:
+            self._update_scale(self.overflow)
         if self.overflow:
             if dist.get_rank() == 0:
                 logger.info(
@@ -1909,6 +2373,8 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
             see_memory_usage('After overflow before clearing gradients')
             self.zero_grad()
+            # the quantization errors of the skipped step are not carried over
+            self.quantization_residuals.clear()
             if self.cpu_offload:
                 self.reset_cpu_buffers()
             else:
@@ -1922,10 +2388,27 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
         # Step 1:- Calculate gradient norm using fp-16 grads
         see_memory_usage('Before norm calculation')
-        scaled_global_grad_norm = self.scaled_global_norm()
+        if flat_grad_partitions is None:
+            scaled_global_grad_norm = self.scaled_global_norm()
         self._global_grad_norm = scaled_global_grad_norm / self.loss_scale
 
         see_memory_usage('After norm before optimizer')
+        if self.overlapped_step is not None:
+            # the step runs in a worker thread, the updated weights are
+            # gathered on first use in the next forward pass
+            self.start_timers(timer_names)
+            hyperparams = [{
+                key: value
+                for key,
+                value in group.items() if key != 'params'
+            } for group in self.optimizer.param_groups]
+            self.overlapped_step.launch(hyperparams,
+                                        self._combined_grad_scale(scaled_global_grad_norm))
+            self.reset_cpu_buffers()
+            self.stop_timers(timer_names)
+            self.log_timers(timer_names)
+            return
+
         # Step 2:- run optimizer and upscaling simultaneously
         for i, group in enumerate(self.bit16_groups):
             self.start_timers([OPTIMIZER_GRADIENTS])
@@ -1951,16 +2434,14 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                 self.free_grad_in_param_list(self.params_not_in_partition[i])
 
                 # create a flat gradients for parameters updated by this process
-                # If we are last partition, ensure we have same size grads and partition size, if not pad with zero tensors
-                if partition_id == dist.get_world_size(
-                        group=self.real_dp_process_group[i]) - 1:
-                    single_grad_partition = self.flatten_dense_tensors_aligned(
-                        self.averaged_gradients[i],
-                        int(self.partition_size[i])).to(
-                            self.single_partition_of_fp32_groups[i].dtype)
+                if flat_grad_partitions is None or flat_grad_partitions[i] is None:
+                    flat_grad_partition = self._get_flat_grad_partition(i)
                 else:
-                    single_grad_partition = self.flatten(self.averaged_gradients[i]).to(
-                        self.single_partition_of_fp32_groups[i].dtype)
+                    flat_grad_partition = flat_grad_partitions[i]
+                    flat_grad_partitions[i] = None
+                single_grad_partition = flat_grad_partition.to(
+                    self.single_partition_of_fp32_groups[i].dtype)
+                del flat_grad_partition
                 assert single_grad_partition.numel() == self.partition_size[i], \
                     "averaged gradients have different number of elements that partition size {} {} {} {}".format(
                         single_grad_partition.numel(), self.partition_size[i], i, partition_id)
@@ -1977,7 +2458,10 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
                 # Step 3:- run the optimizer if no offloading
                 self.start_timers([OPTIMIZER_STEP])
-                self._optimizer_step(i)
+                if self.deferred_overflow_check:
+                    self._masked_optimizer_step(i, self.deferred_overflow)
+                else:
+                    self._optimizer_step(i)
                 # Step 4:- get rid of the fp32 gradients. Not needed anymore
                 self.single_partition_of_fp32_groups[i].grad = None
                 del single_grad_partition
@@ -1990,6 +2474,15 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         if self.cpu_offload:
             self.reset_cpu_buffers()
 
+        if self.deferred_overflow_check:
+            for residual in self.quantization_residuals.values():
+                residual.copy_(
+                    torch.where(self.deferred_overflow,
+                                torch.zeros_like(residual),
+                                residual))
+            # gradients are unscaled with the scale they were computed with
+            self._update_scale(self.deferred_overflow)
+
         self.start_timers([OPTIMIZER_ALLGATHER])
 
         # Gather the updated weights from everyone.
@@ -2011,8 +2504,46 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
         return
 
+    def wait_overlapped_step(self):
+        """Waits for the optimizer step overlapped with the forward pass and
+        gathers the remaining updated weights. Must be called by all ranks."""
+        if self.overlapped_step is not None and self.overlapped_step.pending:
+            self.overlapped_step.synchronize()
+
+    def register_overlapped_step_hooks(self, module):
+        """Registers forward pre-hooks on the submodules of ``module`` that
+        gather the weights of the overlapped optimizer step on first use."""
+        if self.overlapped_step is None:
+            return
+
+        positions = {}
+        for i, group in enumerate(self.bit16_groups):
+            flat = self.bit16_groups_flat[i]
+            for param in group:
+                start = (param.data_ptr() - flat.data_ptr()) // flat.element_size()
+                positions[id(param)] = self.overlapped_step.last_position(
+                    i,
+                    start,
+                    start + param.numel())
+
+        def make_hook(position):
+            def gather_weights(module, inputs):
+                if self.overlapped_step.pending:
+                    self.overlapped_step.gather_until(position)
+
+            return gather_weights
+
+        for submodule in module.modules():
+            submodule_positions = [
+                positions[id(param)] for param in submodule.parameters(recurse=False)
+                if id(param) in positions
+            ]
+            if submodule_positions:
+                submodule.register_forward_pre_hook(make_hook(max(submodule_positions)))
+
     @torch.no_grad()
     def update_lp_params(self):
+        self.wait_overlapped_step()
         for i, (bit16_partitions, fp32_partition) in enumerate(zip(self.parallel_partitioned_bit16_groups, self.single_partition_of_fp32_groups)):
             partition_id = dist.get_rank(group=self.real_dp_process_group[i])
             bit16_partitions[partition_id].data.copy_(fp32_partition.data)
@@ -2033,14 +2564,21 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                 dist.all_reduce(scaled_norm_tensor, group=self.real_dp_process_group[i])
                 norm_groups[i] = scaled_norm_tensor.item()
 
-    def unscale_and_clip_grads(self, grad_groups_flat, total_norm):
+    def _combined_grad_scale(self, total_norm):
         # compute combined scale factor for this group
         combined_scale = self.loss_scale
         if self.clip_grad > 0.:
             # norm is in fact norm*scale
             clip = ((total_norm / self.loss_scale) + 1e-6) / self.clip_grad
-            if clip > 1:
+            if torch.is_tensor(clip):
+                # the norm is kept on device with deferred_overflow_check
+                combined_scale = torch.clamp(clip, min=1.0) * self.loss_scale
+            elif clip > 1:
                 combined_scale = clip * self.loss_scale
+        return combined_scale
+
+    def unscale_and_clip_grads(self, grad_groups_flat, total_norm):
+        combined_scale = self._combined_grad_scale(total_norm)
 
         for grad in grad_groups_flat:
             if isinstance(grad, list):
@@ -2147,20 +2685,18 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         2. scaled_loss = fp32_loss*loss_scale
         3. scaled_loss.backward(), which accumulates scaled gradients into the ``.grad`` attributes of the model's fp16 leaves
         """
+        # the overlapped step reads the fp32 gradients the backward pass writes
+        self.wait_overlapped_step()
         self.micro_step_id += 1
 
         if self.contiguous_gradients:
             self.ipg_buffer = []
-            buf_0 = torch.empty(int(self.reduce_bucket_size),
-                                dtype=self.dtype,
-                                device=self.get_current_device())
+            buf_0 = self._get_ipg_buffer(0)
             self.ipg_buffer.append(buf_0)
 
             # Use double buffers to avoid data access conflict when overlap_comm is enabled.
             if self.overlap_comm:
-                buf_1 = torch.empty(int(self.reduce_bucket_size),
-                                    dtype=self.dtype,
-                                    device=self.get_current_device())
+                buf_1 = self._get_ipg_buffer(1)
                 self.ipg_buffer.append(buf_1)
             self.ipg_index = 0
 
@@ -2203,7 +2739,10 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             return self.loss_scaler.cur_scale
 
     def _set_loss_scale(self, value):
-        self.loss_scaler.cur_scale = value
+        if torch.is_tensor(self.loss_scaler.cur_scale):
+            self.loss_scaler.cur_scale.fill_(value)
+        else:
+            self.loss_scaler.cur_scale = value
 
     loss_scale = property(_get_loss_scale, _set_loss_scale)
     cur_scale = property(_get_loss_scale, _set_loss_scale)
@@ -2254,6 +2793,7 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
             checkpoint['optimizer'] = optimizer.state_dict()
             torch.save(checkpoint, "saved.pth")
         """
+        self.wait_overlapped_step()
         state_dict = {}
         state_dict['loss_scaler'] = self.loss_scaler
         state_dict['dynamic_loss_scale'] = self.dynamic_loss_scale
@@ -2308,6 +2848,7 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
 
     # Restore base optimizer fp32 weights from ZeRO fp16 or bfloat16 weights
     def _restore_from_bit16_weights(self):
+        self.wait_overlapped_step()
         for group_id, (bit16_partitions, fp32_partition) in enumerate(zip(self.parallel_partitioned_bit16_groups, self.single_partition_of_fp32_groups)):
             partition_id = dist.get_rank(group=self.real_dp_process_group[group_id])
             fp32_partition.data.copy_(bit16_partitions[partition_id].data)
@@ -2388,6 +2929,7 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
                         load_optimizer_states=True,
                         load_from_fp32_weights=False,
                         checkpoint_folder=None):
+        self.wait_overlapped_step()
         if checkpoint_folder:
             self._load_universal_checkpoint(checkpoint_folder,
                                             load_optimizer_states,
@@ -2457,6 +2999,16 @@ class DeepSpeedZeroOptimizer(ZeROOptimizer):
         dp_rank = dist.get_rank(group=self.dp_process_group)
         current_rank_sd = state_dict_list[dp_rank]
         self.loss_scaler = current_rank_sd.get('loss_scaler', self.loss_scaler)
+        # the loss scaler is kept on the device of the current run's mode
+        if self.deferred_overflow_check and isinstance(self.loss_scaler,
+                                                       DynamicLossScaler):
+            self.loss_scaler = DeviceDynamicLossScaler.from_scaler(
+                self.loss_scaler,
+                self.get_current_device())
+        elif isinstance(self.loss_scaler, DeviceDynamicLossScaler):
+            self.loss_scaler = self.loss_scaler.to_host_scaler()
+        self.deferred_overflow_check = isinstance(self.loss_scaler,
+                                                  DeviceDynamicLossScaler)
         self.dynamic_loss_scale = current_rank_sd.get('dynamic_loss_scale',
                                                       self.dynamic_loss_scale)
         self.overflow = current_rank_sd.get('overflow', self.overflow)
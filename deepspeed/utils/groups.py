@@ -24,9 +24,12 @@ Copyright 2021 The Microsoft DeepSpeed Team
  For inference and other new scenarios, the code will be either reused or added to this file.
 """
 
+import os
+import torch
 from deepspeed import comm as dist
 
 from deepspeed.utils import log_dist
+from deepspeed.accelerator import get_accelerator
 from deepspeed.utils.exceptions import DeprecatedException
 
 # Expert parallel group that the current rank belongs to.
@@ -35,6 +38,8 @@ _EXPERT_PARALLEL_GROUP = {}
 _EXPERT_DATA_PARALLEL_GROUP = {}
 # dist world group needs to be cloned for some cases
 _WORLD_GROUP = None
+# Intra-node and inter-node groups of the data parallel groups, keyed by the ranks of the data parallel group.
+_HIERARCHICAL_DATA_PARALLEL_GROUPS = {}
 # global object to maintain mpu object if passed by a Megatron client
 mpu = None
 # global object that stores tensor parallel world size for experts
@@ -323,6 +328,101 @@ def _clone_world_group():
     return _WORLD_GROUP
 
 
+def _get_local_world_size():
+    """Get the number of ranks per node, consecutive ranks are assumed to share a node."""
+    for env in ["LOCAL_SIZE", "LOCAL_WORLD_SIZE", "OMPI_COMM_WORLD_LOCAL_SIZE"]:
+        if env in os.environ:
+            return int(os.environ[env])
+    return get_accelerator().device_count()
+
+
+def _get_hierarchical_data_parallel_ranks(dp_ranks, local_world_size):
+    """Generate the intra-node and inter-node ranks of a data parallel group.
+
+    Arguments:
+        dp_ranks: sorted global ranks of the data parallel group
+        local_world_size: number of ranks per node
+
+    Returns:
+        Tuple of the intra-node ranks and the inter-node ranks, or None if the
+        data parallel group is on a single node, has a single rank per node or
+        its nodes hold different numbers of its ranks.
+
+    Let's say we have 2 nodes of 4 GPUs, g0 ... g7, and a model parallel size
+    of 2, so the data parallel groups are [g0, g2, g4, g6] and [g1, g3, g5, g7].
+    The present function will create:
+        4 intra-node groups:
+            [g0, g2], [g4, g6], [g1, g3], [g5, g7]
+        4 inter-node groups:
+            [g0, g4], [g2, g6], [g1, g5], [g3, g7]
+    """
+    nodes = {}
+    for rank in dp_ranks:
+        nodes.setdefault(rank // local_world_size, []).append(rank)
+    intra_node_ranks = list(nodes.values())
+    if len(intra_node_ranks) == 1 or len(intra_node_ranks[0]) == 1 or any(
+            len(node) != len(intra_node_ranks[0]) for node in intra_node_ranks):
+        return None
+    inter_node_ranks = [list(local_ranks) for local_ranks in zip(*intra_node_ranks)]
+    return intra_node_ranks, inter_node_ranks
+
+
+def _create_hierarchical_data_parallel_groups(dp_group, device):
+    """
+    Create the intra-node and inter-node groups of a data parallel group, used
+    to reduce within the node first and then across nodes.
+
+    All ranks must call this function, the data parallel groups of all ranks
+    are gathered on ``device`` to create the groups in the same order.
+
+    Returns:
+        Tuple of the intra-node and inter-node group of the caller rank, or
+        None, see _get_hierarchical_data_parallel_ranks.
+    """
+    assert dist.is_initialized(), "dist is not initialized"
+    dp_world_size = dist.get_world_size(group=dp_group)
+    dp_ranks = tuple(
+        sorted(dist.get_global_rank(dp_group,
+                                    i) for i in range(dp_world_size)))
+    if dp_ranks in _HIERARCHICAL_DATA_PARALLEL_GROUPS:
+        return _HIERARCHICAL_DATA_PARALLEL_GROUPS[dp_ranks]
+
+    local_world_size = _get_local_world_size()
+    all_dp_ranks = [
+        torch.zeros(dp_world_size,
+                    dtype=torch.long,
+                    device=device) for _ in range(dist.get_world_size())
+    ]
+    dist.all_gather(all_dp_ranks,
+                    torch.tensor(dp_ranks,
+                                 dtype=torch.long,
+                                 device=device),
+                    async_op=False)
+    all_dp_ranks = sorted(set(tuple(ranks.tolist()) for ranks in all_dp_ranks))
+
+    for ranks in all_dp_ranks:
+        hierarchical_ranks = _get_hierarchical_data_parallel_ranks(
+            ranks,
+            local_world_size)
+        if hierarchical_ranks is None:
+            _HIERARCHICAL_DATA_PARALLEL_GROUPS[ranks] = None
+            continue
+
+        created_groups = []
+        for level_ranks in hierarchical_ranks:
+            for group_ranks in level_ranks:
+                group = dist.new_group(ranks=group_ranks)
+                if dist.get_rank() in group_ranks:
+                    created_groups.append(group)
+        if dist.get_rank() in ranks:
+            _HIERARCHICAL_DATA_PARALLEL_GROUPS[ranks] = tuple(created_groups)
+
+    log_dist(
+        f'Created hierarchical data parallel groups for data parallel ranks {all_dp_ranks}',
+        [0])
+    return _HIERARCHICAL_DATA_PARALLEL_GROUPS[dp_ranks]
+
+
 def _get_data_parallel_group():
     """Get the data parallel group the caller rank belongs to."""
     assert dist.is_initialized(), \
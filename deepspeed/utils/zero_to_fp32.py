@@ -6,18 +6,27 @@
 # application.
 #
 # example: python zero_to_fp32.py . pytorch_model.bin
+#
+# The rank partitions are merged one optimizer file at a time into a buffer backed by a temporary
+# file next to the output file, so peak memory is about one optimizer file per worker on top of the
+# page cache. Use --workers N to merge N files in parallel.
 
 import argparse
 import torch
 import glob
 import math
+import multiprocessing
 import os
 import re
+import shutil
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 # while this script doesn't use deepspeed to recover data, since the checkpoints are pickled with
 # DeepSpeed data structures it has to be available in the current python environment.
 from deepspeed.utils import logger
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import load as load_checkpoint_file
 from deepspeed.checkpoint.constants import (DS_VERSION,
                                             OPTIMIZER_STATE_DICT,
                                             SINGLE_PARTITION_OF_FP32_GROUPS,
@@ -75,8 +84,13 @@ def get_optim_files(checkpoint_dir):
     return optim_files
 
 
+def load_file(file):
+    # also understands the mmap checkpoint format and incremental checkpoint references
+    return load_checkpoint_file(file, map_location=device)
+
+
 def parse_model_state(file):
-    state_dict = torch.load(file, map_location=device)
+    state_dict = load_file(file)
 
     if BUFFER_NAMES not in state_dict:
         raise ValueError(f"{file} is not a model state checkpoint")
@@ -97,17 +111,28 @@ def parse_model_state(file):
     return buffers, param_shapes, ds_version
 
 
-def parse_optim_states(files, ds_checkpoint_dir):
+def get_fp32_groups_key(zero_stage):
+    # the groups are named differently in each stage
+    if zero_stage == 2:
+        return SINGLE_PARTITION_OF_FP32_GROUPS
+    elif zero_stage == 3:
+        return FP32_FLAT_GROUPS
+    else:
+        raise ValueError(f"unknown zero stage {zero_stage}")
+
 
+def parse_optim_states(files, ds_checkpoint_dir):
+    """
+    Reads the zero stage and dp world size from the first optimizer file. The fp32 partitions
+    themselves are only loaded later, one rank file at a time, by ``load_fp32_flat_groups``.
+    """
     total_files = len(files)
-    state_dicts = []
-    for f in files:
-        state_dicts.append(torch.load(f, map_location=device))
+    optim_state = load_file(files[0])[OPTIMIZER_STATE_DICT]
 
-    if not ZERO_STAGE in state_dicts[0][OPTIMIZER_STATE_DICT]:
+    if not ZERO_STAGE in optim_state:
         raise ValueError(f"{files[0]} is not a zero checkpoint")
-    zero_stage = state_dicts[0][OPTIMIZER_STATE_DICT][ZERO_STAGE]
-    world_size = state_dicts[0][OPTIMIZER_STATE_DICT][PARTITION_COUNT]
+    zero_stage = optim_state[ZERO_STAGE]
+    world_size = optim_state[PARTITION_COUNT]
 
     # For ZeRO-2 each param group can have different partition_count as data parallelism for expert
     # parameters can be different from data parallelism for non-expert parameters. So we can just
@@ -122,46 +147,38 @@ def parse_optim_states(files, ds_checkpoint_dir):
             "Possibly due to an overwrite of an old checkpoint, or a checkpoint didn't get saved by one or more processes."
         )
 
-    # the groups are named differently in each stage
-    if zero_stage == 2:
-        fp32_groups_key = SINGLE_PARTITION_OF_FP32_GROUPS
-    elif zero_stage == 3:
-        fp32_groups_key = FP32_FLAT_GROUPS
-    else:
-        raise ValueError(f"unknown zero stage {zero_stage}")
+    get_fp32_groups_key(zero_stage)
+
+    return zero_stage, world_size
 
-    if zero_stage == 2:
-        fp32_flat_groups = [
-            state_dicts[i][OPTIMIZER_STATE_DICT][fp32_groups_key]
-            for i in range(len(state_dicts))
-        ]
-    elif zero_stage == 3:
-        # if there is more than one param group, there will be multiple flattened tensors - one
-        # flattened tensor per group - for simplicity merge them into a single tensor
-        #
-        # XXX: could make the script more memory efficient for when there are multiple groups - it
-        # will require matching the sub-lists of param_shapes for each param group flattened tensor
-
-        fp32_flat_groups = [
-            torch.cat(state_dicts[i][OPTIMIZER_STATE_DICT][fp32_groups_key],
-                      0) for i in range(len(state_dicts))
-        ]
 
-    return zero_stage, world_size, fp32_flat_groups
+def load_fp32_flat_groups(file, zero_stage):
+    # keep only the fp32 partitions, the optimizer moments are dropped right away
+    fp32_flat_groups = load_file(file)[OPTIMIZER_STATE_DICT][get_fp32_groups_key(
+        zero_stage)]
 
+    if zero_stage == 3:
+        # if there is more than one param group (or sub group), there will be multiple flattened
+        # tensors - for simplicity merge them into a single tensor
+        fp32_flat_groups = torch.cat(fp32_flat_groups, 0)
 
-def _get_fp32_state_dict_from_zero_checkpoint(ds_checkpoint_dir):
+    return fp32_flat_groups
+
+
+def _get_fp32_state_dict_from_zero_checkpoint(ds_checkpoint_dir, workers=1, backing_file=None):
     """
     Returns fp32 state_dict reconstructed from ds checkpoint
 
     Args:
         - ``ds_checkpoint_dir``: path to the deepspeed checkpoint folder (where the optimizer files are)
+        - ``workers``: number of processes merging the rank partitions in parallel
+        - ``backing_file``: optional file backing the merged params instead of memory
 
     """
     print(f"Processing zero checkpoint '{ds_checkpoint_dir}'")
 
     optim_files = get_optim_files(ds_checkpoint_dir)
-    zero_stage, world_size, fp32_flat_groups = parse_optim_states(optim_files, ds_checkpoint_dir)
+    zero_stage, world_size = parse_optim_states(optim_files, ds_checkpoint_dir)
     print(
         f"Detected checkpoint of type zero stage {zero_stage}, world_size: {world_size}")
 
@@ -172,13 +189,17 @@ def _get_fp32_state_dict_from_zero_checkpoint(ds_checkpoint_dir):
     if zero_stage == 2:
         return _get_fp32_state_dict_from_zero2_checkpoint(world_size,
                                                           param_shapes,
-                                                          fp32_flat_groups,
-                                                          buffers)
+                                                          optim_files,
+                                                          buffers,
+                                                          workers,
+                                                          backing_file)
     elif zero_stage == 3:
         return _get_fp32_state_dict_from_zero3_checkpoint(world_size,
                                                           param_shapes,
-                                                          fp32_flat_groups,
-                                                          buffers)
+                                                          optim_files,
+                                                          buffers,
+                                                          workers,
+                                                          backing_file)
 
 
 def _has_callable(obj, fn):
@@ -186,41 +207,40 @@ def _has_callable(obj, fn):
     return callable(attr)
 
 
-def _get_fp32_state_dict_from_zero2_checkpoint(world_size,
-                                               param_shapes,
-                                               fp32_flat_groups,
-                                               buffers):
+def _shape_numel(shape):
+    return shape.numel() if _has_callable(shape, 'numel') else math.prod(shape)
 
-    # Reconstruction protocol:
-    #
-    # XXX: document this
 
-    if debug:
-        for i in range(world_size):
-            for j in range(len(fp32_flat_groups[0])):
-                print(
-                    f"{FP32_FLAT_GROUPS}[{i}][{j}].shape={fp32_flat_groups[i][j].shape}")
-
-    # XXX: memory usage doubles here (zero2)
-    num_param_groups = len(fp32_flat_groups[0])
-    merged_single_partition_of_fp32_groups = []
-    for i in range(num_param_groups):
-        merged_partitions = [sd[i] for sd in fp32_flat_groups]
-        full_single_fp32_vector = torch.cat(merged_partitions, 0)
-        merged_single_partition_of_fp32_groups.append(full_single_fp32_vector)
-    avail_numel = sum([
-        full_single_fp32_vector.numel()
-        for full_single_fp32_vector in merged_single_partition_of_fp32_groups
-    ])
+def _allocate_fp32_params(param_shapes, shared, backing_file=None):
+    """
+    Allocates a single flat fp32 buffer holding all params and returns it together with the
+    offset of each param inside of it. Every param of the consolidated state_dict is a view into
+    this buffer, so the merged weights are kept in memory exactly once. With ``backing_file`` the
+    buffer is a shared mapping of that file, so it lives in the page cache instead.
+    """
+    offsets = OrderedDict()
+    total_numel = 0
+    for shapes in param_shapes:
+        for name, shape in shapes.items():
+            offsets[name] = total_numel
+            total_numel += _shape_numel(shape)
 
-    if debug:
-        wanted_params = sum([len(shapes) for shapes in param_shapes])
-        wanted_numel = sum(
-            [sum(shape.numel() for shape in shapes.values()) for shapes in param_shapes])
-        # not asserting if there is a mismatch due to possible padding
-        print(f"Have {avail_numel} numels to process.")
-        print(f"Need {wanted_numel} numels in {wanted_params} params.")
+    if backing_file is not None:
+        # forked workers write into the same shared file mapping
+        return torch.from_file(backing_file,
+                               shared=True,
+                               size=total_numel,
+                               dtype=torch.float32), offsets
+
+    flat_params = torch.empty(total_numel, dtype=torch.float32, device=device)
+    if shared:
+        # workers are forked and write their partitions straight into the parent's buffer
+        flat_params.share_memory_()
+
+    return flat_params, offsets
 
+
+def _build_state_dict(flat_params, offsets, param_shapes, buffers):
     state_dict = OrderedDict()
 
     # buffers
@@ -229,28 +249,153 @@ def _get_fp32_state_dict_from_zero2_checkpoint(world_size,
         print(f"added {len(buffers)} buffers")
 
     # params
-    # XXX: for huge models that can't fit into the host's RAM we will have to recode this to support
-    # out-of-core computing solution
-    total_numel = 0
     total_params = 0
-    for shapes, full_single_fp32_vector in zip(param_shapes, merged_single_partition_of_fp32_groups):
-        offset = 0
-        avail_numel = full_single_fp32_vector.numel()
+    for shapes in param_shapes:
         for name, shape in shapes.items():
-
-            unpartitioned_numel = shape.numel() if _has_callable(shape, 'numel') else math.prod(shape)
-            total_numel += unpartitioned_numel
+            state_dict[name] = flat_params.narrow(0,
+                                                  offsets[name],
+                                                  _shape_numel(shape)).view(shape)
             total_params += 1
 
-            if debug:
-                print(
-                    f"{name} full shape: {shape} unpartitioned numel {unpartitioned_numel} "
-                )
-            state_dict[name] = full_single_fp32_vector.narrow(
-                0,
-                offset,
-                unpartitioned_numel).view(shape)
-            offset += unpartitioned_numel
+    print(
+        f"Reconstructed fp32 state dict with {total_params} params {flat_params.numel()} elements"
+    )
+
+    return state_dict
+
+
+# state shared with the merge workers, set in the parent before forking
+_merge_context = None
+
+
+def _init_merge_context(context):
+    global _merge_context
+    _merge_context = context
+
+
+def _merge_rank_partitions(merge_fn, rank, optim_file):
+    zero_stage, world_size, param_shapes, flat_params, offsets = _merge_context
+    fp32_flat_groups = load_fp32_flat_groups(optim_file, zero_stage)
+    return merge_fn(rank,
+                    world_size,
+                    param_shapes,
+                    fp32_flat_groups,
+                    flat_params,
+                    offsets)
+
+
+def _shared_memory_available(numel):
+    # share_memory_() places the buffer in /dev/shm, which is small by default in containers
+    try:
+        return shutil.disk_usage("/dev/shm").free >= numel * 4
+    except OSError:
+        return False
+
+
+def _merge_all_ranks(zero_stage,
+                     world_size,
+                     param_shapes,
+                     optim_files,
+                     merge_fn,
+                     workers,
+                     backing_file=None):
+    """
+    Copies the fp32 partitions of every rank into the consolidated flat buffer. Only one rank
+    file per worker is held in memory at any time.
+    """
+    if workers > 1 and backing_file is None:
+        total_numel = sum(_shape_numel(shape) for shapes in param_shapes for shape in shapes.values())
+        if not _shared_memory_available(total_numel):
+            logger.warning(
+                f"/dev/shm cannot hold the {total_numel * 4} bytes of merged fp32 params, "
+                "merging with a single worker")
+            workers = 1
+    flat_params, offsets = _allocate_fp32_params(param_shapes,
+                                                 shared=workers > 1,
+                                                 backing_file=backing_file)
+    context = (zero_stage, world_size, param_shapes, flat_params, offsets)
+    ranks = list(range(len(optim_files)))
+
+    if workers > 1:
+        print(f"Merging {len(optim_files)} partitions with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("fork"),
+                                 initializer=_init_merge_context,
+                                 initargs=(context,
+                                           )) as executor:
+            rank_numels = list(
+                executor.map(partial(_merge_rank_partitions,
+                                     merge_fn),
+                             ranks,
+                             optim_files))
+    else:
+        _init_merge_context(context)
+        rank_numels = [
+            _merge_rank_partitions(merge_fn,
+                                   rank,
+                                   optim_file) for rank,
+            optim_file in zip(ranks,
+                              optim_files)
+        ]
+        _init_merge_context(None)
+
+    return flat_params, offsets, rank_numels
+
+
+def _merge_zero2_rank_partitions(rank,
+                                 world_size,
+                                 param_shapes,
+                                 fp32_flat_groups,
+                                 flat_params,
+                                 offsets):
+    # Reconstruction protocol: each param group is flattened (and padded so it splits evenly
+    # across the dp ranks) and rank r owns the r-th equal sized slice of it. Copy the part of every
+    # param that overlaps with this rank's slice.
+    for shapes, partition in zip(param_shapes, fp32_flat_groups):
+        partition_numel = partition.numel()
+        partition_start = rank * partition_numel
+        partition_end = partition_start + partition_numel
+
+        param_start = 0
+        for name, shape in shapes.items():
+            param_end = param_start + _shape_numel(shape)
+            start = max(param_start, partition_start)
+            end = min(param_end, partition_end)
+            if start < end:
+                flat_params.narrow(0,
+                                   offsets[name] + start - param_start,
+                                   end - start).copy_(
+                                       partition.narrow(0,
+                                                        start - partition_start,
+                                                        end - start))
+            param_start = param_end
+
+    return [partition.numel() for partition in fp32_flat_groups]
+
+
+def _get_fp32_state_dict_from_zero2_checkpoint(world_size,
+                                               param_shapes,
+                                               optim_files,
+                                               buffers,
+                                               workers=1,
+                                               backing_file=None):
+
+    flat_params, offsets, rank_numels = _merge_all_ranks(2,
+                                                         world_size,
+                                                         param_shapes,
+                                                         optim_files,
+                                                         _merge_zero2_rank_partitions,
+                                                         workers,
+                                                         backing_file)
+
+    if debug:
+        for i in range(world_size):
+            for j in range(len(rank_numels[0])):
+                print(f"{SINGLE_PARTITION_OF_FP32_GROUPS}[{i}][{j}].numel={rank_numels[i][j]}")
+
+    for group_id, shapes in enumerate(param_shapes):
+        offset = sum(_shape_numel(shape) for shape in shapes.values())
+        avail_numel = sum(numels[group_id] for numels in rank_numels)
 
         # Z2 started to align to 2*world_size to improve nccl performance. Therefore both offset and
         # avail_numel can differ by anywhere between 0..2*world_size. Due to two unrelated complex
@@ -275,11 +420,7 @@ def _get_fp32_state_dict_from_zero2_checkpoint(world_size,
             raise ValueError(
                 f"consumed {offset} numels out of {avail_numel} - something is wrong")
 
-    print(
-        f"Reconstructed fp32 state dict with {total_params} params {total_numel} elements"
-    )
-
-    return state_dict
+    return _build_state_dict(flat_params, offsets, param_shapes, buffers)
 
 
 def zero3_partitioned_param_info(unpartitioned_numel, world_size):
@@ -289,80 +430,75 @@ def zero3_partitioned_param_info(unpartitioned_numel, world_size):
     return partitioned_numel, padding_numel
 
 
-def _get_fp32_state_dict_from_zero3_checkpoint(world_size,
-                                               param_shapes,
-                                               fp32_flat_groups,
-                                               buffers):
-
-    # Reconstruction protocol: For zero3 we need to zip the partitions together at boundary of each
-    # param, re-consolidating each param, while dealing with padding if any
-
-    avail_numel = fp32_flat_groups[0].numel() * world_size
-    # merge list of dicts, preserving order
-    param_shapes = {k: v for d in param_shapes for k, v in d.items()}
+def _merge_zero3_rank_partitions(rank,
+                                 world_size,
+                                 param_shapes,
+                                 fp32_flat_group,
+                                 flat_params,
+                                 offsets):
+    # Reconstruction protocol: every param is partitioned on its own, rank r holding the r-th
+    # slice of it (the last slices being padded), and the rank's partitions of all params are laid
+    # out back to back in its flat group.
+    partition_offset = 0
+    for shapes in param_shapes:
+        for name, shape in shapes.items():
+            unpartitioned_numel = _shape_numel(shape)
+            partitioned_numel, _ = zero3_partitioned_param_info(unpartitioned_numel, world_size)
+            start = rank * partitioned_numel
+            numel = min(partitioned_numel, unpartitioned_numel - start)
+            if numel > 0:
+                flat_params.narrow(0,
+                                   offsets[name] + start,
+                                   numel).copy_(
+                                       fp32_flat_group.narrow(0,
+                                                              partition_offset,
+                                                              numel))
+            partition_offset += partitioned_numel
+
+    if partition_offset != fp32_flat_group.numel():
+        raise ValueError(
+            f"consumed {partition_offset} numels out of {fp32_flat_group.numel()} in partition of rank {rank} - something is wrong"
+        )
 
-    if debug:
-        for i in range(world_size):
-            print(f"{FP32_FLAT_GROUPS}[{i}].shape={fp32_flat_groups[i].shape}")
+    return fp32_flat_group.numel()
 
-        wanted_params = len(param_shapes)
-        wanted_numel = sum(shape.numel() for shape in param_shapes.values())
-        # not asserting if there is a mismatch due to possible padding
-        print(f"Have {avail_numel} numels to process.")
-        print(f"Need {wanted_numel} numels in {wanted_params} params.")
 
-    state_dict = OrderedDict()
+def _get_fp32_state_dict_from_zero3_checkpoint(world_size,
+                                               param_shapes,
+                                               optim_files,
+                                               buffers,
+                                               workers=1,
+                                               backing_file=None):
+
+    flat_params, offsets, rank_numels = _merge_all_ranks(3,
+                                                         world_size,
+                                                         param_shapes,
+                                                         optim_files,
+                                                         _merge_zero3_rank_partitions,
+                                                         workers,
+                                                         backing_file)
 
-    # buffers
-    state_dict.update(buffers)
     if debug:
-        print(f"added {len(buffers)} buffers")
-
-    # params
-    # XXX: for huge models that can't fit into the host's RAM we will have to recode this to support
-    # out-of-core computing solution
-    offset = 0
-    total_numel = 0
-    total_params = 0
-    for name, shape in param_shapes.items():
-
-        unpartitioned_numel = shape.numel()
-        total_numel += unpartitioned_numel
-        total_params += 1
-
-        partitioned_numel, partitioned_padding_numel = zero3_partitioned_param_info(unpartitioned_numel, world_size)
-
-        if debug:
-            print(
-                f"{total_params} {name} full shape: {shape} partition0 numel={partitioned_numel} partitioned_padding_numel={partitioned_padding_numel}"
-            )
-
-        # XXX: memory usage doubles here
-        state_dict[name] = torch.cat(
-            tuple(fp32_flat_groups[i].narrow(0,
-                                             offset,
-                                             partitioned_numel)
-                  for i in range(world_size)),
-            0).narrow(0,
-                      0,
-                      unpartitioned_numel).view(shape)
-        offset += partitioned_numel
-
-    offset *= world_size
+        for i in range(world_size):
+            print(f"{FP32_FLAT_GROUPS}[{i}].numel={rank_numels[i]}")
 
     # Sanity check
+    avail_numel = sum(rank_numels)
+    offset = world_size * sum(
+        zero3_partitioned_param_info(_shape_numel(shape),
+                                     world_size)[0] for shapes in param_shapes
+        for shape in shapes.values())
     if offset != avail_numel:
         raise ValueError(
             f"consumed {offset} numels out of {avail_numel} - something is wrong")
 
-    print(
-        f"Reconstructed fp32 state dict with {total_params} params {total_numel} elements"
-    )
-
-    return state_dict
+    return _build_state_dict(flat_params, offsets, param_shapes, buffers)
 
 
-def get_fp32_state_dict_from_zero_checkpoint(checkpoint_dir, tag=None):
+def get_fp32_state_dict_from_zero_checkpoint(checkpoint_dir,
+                                             tag=None,
+                                             workers=1,
+                                             backing_file=None):
     """
     Convert ZeRO 2 or 3 checkpoint into a single fp32 consolidated state_dict that can be loaded with
     ``load_state_dict()`` and used for training without DeepSpeed or shared with others, for example
@@ -371,6 +507,11 @@ def get_fp32_state_dict_from_zero_checkpoint(checkpoint_dir, tag=None):
     Args:
         - ``checkpoint_dir``: path to the desired checkpoint folder
         - ``tag``: checkpoint tag used as a unique identifier for checkpoint. If not provided will attempt to load tag in 'latest' file. e.g., ``global_step14``
+        - ``workers``: number of processes merging the per-rank optimizer files in parallel. The
+          merged params are placed in /dev/shm to share them with the workers, a single worker is
+          used if it is too small.
+        - ``backing_file``: optional path of a temporary file holding the merged params instead of
+          memory. It must be kept as long as the returned state_dict is used.
 
     Returns:
         - pytorch ``state_dict``
@@ -408,10 +549,13 @@ def get_fp32_state_dict_from_zero_checkpoint(checkpoint_dir, tag=None):
     if not os.path.isdir(ds_checkpoint_dir):
         raise FileNotFoundError(f"Directory '{ds_checkpoint_dir}' doesn't exist")
 
-    return _get_fp32_state_dict_from_zero_checkpoint(ds_checkpoint_dir)
+    return _get_fp32_state_dict_from_zero_checkpoint(ds_checkpoint_dir, workers, backing_file)
 
 
-def convert_zero_checkpoint_to_fp32_state_dict(checkpoint_dir, output_file, tag=None):
+def convert_zero_checkpoint_to_fp32_state_dict(checkpoint_dir,
+                                               output_file,
+                                               tag=None,
+                                               workers=1):
     """
     Convert ZeRO 2 or 3 checkpoint into a single fp32 consolidated ``state_dict`` file that can be
     loaded with ``torch.load(file)`` + ``load_state_dict()`` and used for training without DeepSpeed.
@@ -420,11 +564,25 @@ def convert_zero_checkpoint_to_fp32_state_dict(checkpoint_dir, output_file, tag=
         - ``checkpoint_dir``: path to the desired checkpoint folder. (one that contains the tag-folder, like ``global_step14``)
         - ``output_file``: path to the pytorch fp32 state_dict output file (e.g. path/pytorch_model.bin)
         - ``tag``: checkpoint tag used as a unique identifier for checkpoint. If not provided will attempt to load tag in the file named ``latest`` in the checkpoint folder, e.g., ``global_step14``
+        - ``workers``: number of processes merging the per-rank optimizer files in parallel
     """
 
-    state_dict = get_fp32_state_dict_from_zero_checkpoint(checkpoint_dir, tag)
-    print(f"Saving fp32 state dict to {output_file}")
-    torch.save(state_dict, output_file)
+    # the merged params are written to a file next to the output and only go through the page
+    # cache, so neither the weights nor the /dev/shm buffer of the workers take memory
+    backing_file = f"{output_file}.merging"
+    try:
+        state_dict = get_fp32_state_dict_from_zero_checkpoint(checkpoint_dir,
+                                                              tag,
+                                                              workers,
+                                                              backing_file)
+        # all params are views into one flat buffer, so they are serialized as a single storage
+        # without another copy of the weights
+        print(f"Saving fp32 state dict to {output_file}")
+        torch.save(state_dict, output_file)
+        del state_dict
+    finally:
+        if os.path.exists(backing_file):
+            os.remove(backing_file)
 
 
 def load_state_dict_from_zero_checkpoint(model, checkpoint_dir, tag=None):
@@ -479,9 +637,17 @@ if __name__ == "__main__":
         help=
         "path to the pytorch fp32 state_dict output file (e.g. path/checkpoint-12/pytorch_model.bin)"
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes merging the per-rank optimizer files in parallel")
     parser.add_argument("-d", "--debug", action='store_true', help="enable debug")
     args = parser.parse_args()
 
     debug = args.debug
 
-    convert_zero_checkpoint_to_fp32_state_dict(args.checkpoint_dir, args.output_file)
+    convert_zero_checkpoint_to_fp32_state_dict(args.checkpoint_dir,
+                                               args.output_file,
+                                               workers=args.workers)
@@ -63,7 +63,8 @@ extras_require = {
     'autotuning_ml': fetch_requirements('requirements/requirements-autotuning-ml.txt'),
     'sparse_attn': fetch_requirements('requirements/requirements-sparse_attn.txt'),
     'inf': fetch_requirements('requirements/requirements-inf.txt'),
-    'sd': fetch_requirements('requirements/requirements-sd.txt')
+    'sd': fetch_requirements('requirements/requirements-sd.txt'),
+    'ckpt_compression': fetch_requirements('requirements/requirements-ckpt-compression.txt')
 }
 
 # Add specific cupy version to both onebit extension variants
@@ -299,7 +300,8 @@ setup(name='deepspeed',
           'bin/ds_report',
           'bin/ds_bench',
           'bin/dsr',
-          'bin/ds_elastic'
+          'bin/ds_elastic',
+          'bin/ds_mem_plan'
       ],
       classifiers=[
           'Programming Language :: Python :: 3.6',
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# benchmark of ContiguousMemoryAllocator with the parameter sizes of a
+# transformer model, fetched and released in a sliding window like ZeRO-3
+# does in the forward and backward pass
+#
+# usage:
+# ./contiguous_allocator_bench.py --hidden 1024 --layers 24 --steps 3
+
+import argparse
+import random
+import time
+
+import torch
+import deepspeed.runtime.zero.contiguous_memory_allocator as allocator_module
+from deepspeed.runtime.zero.contiguous_memory_allocator import ContiguousMemoryAllocator
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--hidden", type=int, default=1024)
+parser.add_argument("--layers", type=int, default=24)
+parser.add_argument("--steps", type=int, default=3)
+parser.add_argument("--window",
+                    type=int,
+                    default=32,
+                    help="number of parameters fetched at once")
+parser.add_argument("--buffer_fraction",
+                    type=float,
+                    default=0.05,
+                    help="buffer size as a fraction of the model size")
+args = parser.parse_args()
+
+# silence the per allocation logging
+allocator_module.print_rank_0 = lambda message: None
+
+
+def transformer_param_sizes(hidden, layers):
+    h = hidden
+    layer = [h, h, 3 * h * h, 3 * h, h * h, h, h, h, 4 * h * h, 4 * h, 4 * h * h, h]
+    return [32000 * h] + layer * layers + [h, h]
+
+
+sizes = transformer_param_sizes(args.hidden, args.layers)
+# forward then backward order
+trace = sizes + sizes[::-1]
+largest_window = max(
+    sum(sizes[i:i + args.window]) for i in range(len(sizes) - args.window + 1))
+buffer_size = max(int(sum(sizes) * args.buffer_fraction), largest_window)
+
+mem = ContiguousMemoryAllocator(buffer_size, torch.half, 'cpu')
+defragmentations = 0
+original_defragment = mem._defragment_memory
+
+
+def counting_defragment():
+    global defragmentations
+    defragmentations += 1
+    original_defragment()
+
+
+mem._defragment_memory = counting_defragment
+
+random.seed(0)
+live = []
+start = time.time()
+num_allocations = 0
+for step in range(args.steps):
+    for size in trace:
+        while live and (len(live) >= args.window or mem.total_free < size):
+            # release a random older parameter, as reuse keeps some alive
+            mem.release_tensor(live.pop(random.randrange(min(len(live), 4))))
+        live.append(mem.allocate_tensor(size))
+        num_allocations += 1
+    while live:
+        mem.release_tensor(live.pop())
+elapsed = time.time() - start
+
+print(f"params {len(sizes)}, buffer {buffer_size / 2**20:.1f}M elements, "
+      f"{num_allocations} allocations in {elapsed:.3f}s "
+      f"({elapsed / num_allocations * 1e6:.1f} us per allocation), "
+      f"{defragmentations} defragmentations")
@@ -0,0 +1,110 @@
+import os
+import pytest
+import torch
+
+from deepspeed.runtime.checkpoint_engine.async_checkpoint_engine import AsyncCheckpointEngine
+
+from unit.common import DistributedTest
+from unit.simple_model import *
+
+from unit.checkpoint.common import checkpoint_correctness_verification
+
+
+class TestAsyncCheckpoint(DistributedTest):
+    world_size = 1
+
+    def test_async_save(self, tmpdir):
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "checkpoint": {
+                "async_save": True
+            }
+        }
+        hidden_dim = 10
+        models = [SimpleModel(hidden_dim=hidden_dim) for _ in range(2)]
+        checkpoint_correctness_verification(config_dict=config_dict,
+                                            models=models,
+                                            hidden_dim=hidden_dim,
+                                            tmpdir=tmpdir,
+                                            load_optimizer_states=True,
+                                            load_lr_scheduler_states=False,
+                                            fp16=False)
+
+
+def test_async_engine_snapshot_is_isolated(tmpdir):
+    engine = AsyncCheckpointEngine()
+    weight = torch.ones(4)
+    path = os.path.join(tmpdir, "model.pt")
+
+    engine.create("tag1")
+    engine.save({"weight": weight, "step": 1}, path)
+    # Updates after save() must not leak into the checkpoint.
+    weight.add_(1)
+    engine.commit("tag1")
+    engine.wait()
+
+    loaded = engine.load(path)
+    assert loaded["step"] == 1
+    assert torch.equal(loaded["weight"], torch.ones(4))
+
+
+def test_async_engine_double_buffering(tmpdir):
+    engine = AsyncCheckpointEngine()
+    paths = [os.path.join(tmpdir, f"model{i}.pt") for i in range(3)]
+    for i, path in enumerate(paths):
+        engine.create(f"tag{i}")
+        engine.save({"weight": torch.full((8, ), float(i))}, path)
+        engine.commit(f"tag{i}")
+    engine.wait()
+
+    for i, path in enumerate(paths):
+        assert torch.equal(engine.load(path)["weight"], torch.full((8, ), float(i)))
+
+
+def test_async_engine_reuses_buffers(tmpdir):
+    engine = AsyncCheckpointEngine()
+    for i in range(6):
+        tag = f"tag{i}"
+        os.makedirs(os.path.join(tmpdir, tag))
+        engine.create(tag)
+        state_dict = {"weight": torch.full((8, ), float(i)), "bias": torch.ones(2)}
+        for name in ["model.pt", "optim.pt"]:
+            engine.save(state_dict, os.path.join(tmpdir, tag, name))
+        engine.commit(tag)
+    engine.wait()
+
+    # one buffer per tensor of a tag in each buffer set
+    assert [len(buffers) for buffers in engine._buffers] == [4, 4]
+    for i in range(6):
+        loaded = engine.load(os.path.join(tmpdir, f"tag{i}", "optim.pt"))
+        assert torch.equal(loaded["weight"], torch.full((8, ), float(i)))
+
+
+def test_async_engine_on_persisted(tmpdir):
+    engine = AsyncCheckpointEngine()
+    path = os.path.join(tmpdir, "model.pt")
+    persisted = []
+
+    engine.create("tag1")
+    engine.save({"weight": torch.ones(4)}, path)
+    engine.commit("tag1")
+    # runs on the writer thread once the file is written
+    engine.on_persisted("tag1", lambda: persisted.append(os.path.isfile(path)))
+    engine.wait()
+    assert persisted == [True]
+
+    # a failed write does not run the callback
+    engine.create("tag2")
+    engine.save({"weight": torch.ones(4)}, os.path.join(tmpdir, "missing", "model.pt"))
+    engine.commit("tag2")
+    engine.on_persisted("tag2", lambda: persisted.append(True))
+    with pytest.raises(Exception):
+        engine.wait()
+    assert persisted == [True]
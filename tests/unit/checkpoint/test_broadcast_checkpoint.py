@@ -0,0 +1,72 @@
+import pytest
+import deepspeed
+import deepspeed.comm as dist
+
+from unit.common import DistributedTest
+from unit.simple_model import *
+
+from unit.checkpoint.common import checkpoint_correctness_verification
+
+
+@pytest.mark.parametrize('zero_stage', [0, 2, 3])
+class TestBroadcastLoadCheckpoint(DistributedTest):
+    world_size = 2
+
+    def test_load_broadcast(self, tmpdir, zero_stage):
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "zero_optimization": {
+                "stage": zero_stage
+            },
+            "checkpoint": {
+                "load_broadcast": True
+            }
+        }
+        hidden_dim = 10
+        models = [SimpleModel(hidden_dim=hidden_dim) for _ in range(2)]
+        checkpoint_correctness_verification(config_dict=config_dict,
+                                            models=models,
+                                            hidden_dim=hidden_dim,
+                                            tmpdir=tmpdir,
+                                            load_optimizer_states=True,
+                                            load_lr_scheduler_states=True,
+                                            fp16=False)
+
+
+class TestBroadcastLoadZero3ClientState(DistributedTest):
+    world_size = 2
+
+    def test_per_rank_client_state(self, tmpdir):
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "zero_optimization": {
+                "stage": 3
+            },
+            "checkpoint": {
+                "load_broadcast": True
+            }
+        }
+        hidden_dim = 10
+        model = SimpleModel(hidden_dim=hidden_dim)
+        model, _, _, _ = deepspeed.initialize(config=config_dict,
+                                              model=model,
+                                              model_parameters=model.parameters())
+        # ZeRO-3 saves a model states file per data parallel rank, the files
+        # must not be replaced by the one of the first rank on load
+        model.save_checkpoint(tmpdir, tag="1", client_state={"rank": dist.get_rank()})
+        _, client_state = model.load_checkpoint(tmpdir, tag="1")
+        assert client_state["rank"] == dist.get_rank()
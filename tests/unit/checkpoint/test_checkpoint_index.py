@@ -0,0 +1,67 @@
+import os
+import torch
+
+import deepspeed.checkpoint.checkpoint_index as checkpoint_index
+from deepspeed.checkpoint import DeepSpeedCheckpoint, CHECKPOINT_INDEX_FILE
+
+
+def _create_checkpoint(ckpt_dir):
+    model_states = {
+        "iteration": 42,
+        "args": {
+            "hidden_size": 8
+        },
+        "module": {
+            "weight": torch.randn(8)
+        }
+    }
+    torch.save(model_states, os.path.join(ckpt_dir, "mp_rank_00_model_states.pt"))
+    torch.save({"optimizer_state_dict": {}},
+               os.path.join(ckpt_dir,
+                            "zero_pp_rank_0_mp_rank_00_optim_states.pt"))
+    for layer_id in ["01", "03", "04"]:
+        layer_file = os.path.join(ckpt_dir, f"layer_{layer_id}-model_00-model_states.pt")
+        torch.save({"weight": torch.randn(8, 4)}, layer_file)
+
+
+def test_checkpoint_index_is_cached(tmpdir, monkeypatch):
+    _create_checkpoint(tmpdir)
+
+    loaded_files = []
+    load_cpu = checkpoint_index.load_cpu
+
+    def counting_load_cpu(file):
+        loaded_files.append(os.path.basename(file))
+        return load_cpu(file)
+
+    monkeypatch.setattr(checkpoint_index, "load_cpu", counting_load_cpu)
+
+    ds_checkpoint = DeepSpeedCheckpoint(str(tmpdir))
+    assert ds_checkpoint.get_iteration() == 42
+    assert ds_checkpoint.get_args() == {"hidden_size": 8}
+    assert ds_checkpoint.get_checkpoint_info() is None
+    assert loaded_files == ["mp_rank_00_model_states.pt"]
+    assert os.path.isfile(os.path.join(tmpdir, CHECKPOINT_INDEX_FILE))
+    # the index must not be mistaken for a checkpoint file
+    assert all(CHECKPOINT_INDEX_FILE not in f for f in ds_checkpoint.file_list)
+
+    # a new instance reads the global state from the on-disk index
+    loaded_files.clear()
+    ds_checkpoint = DeepSpeedCheckpoint(str(tmpdir))
+    assert ds_checkpoint.get_iteration() == 42
+    assert loaded_files == []
+
+    assert len(ds_checkpoint.get_transformer_state(tp_index=0, pp_index=0)) == 1
+
+
+def test_checkpoint_index_invalidation(tmpdir):
+    _create_checkpoint(tmpdir)
+    assert DeepSpeedCheckpoint(str(tmpdir)).get_iteration() == 42
+
+    model_file = os.path.join(tmpdir, "mp_rank_00_model_states.pt")
+    sd = torch.load(model_file)
+    sd["iteration"] = 43
+    sd["module"]["bias"] = torch.randn(8)
+    torch.save(sd, model_file)
+
+    assert DeepSpeedCheckpoint(str(tmpdir)).get_iteration() == 43
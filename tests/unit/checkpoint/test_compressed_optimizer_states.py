@@ -0,0 +1,126 @@
+import os
+import pytest
+import torch
+
+from deepspeed.runtime.checkpoint_engine.state_compression import compress_optimizer_state_dict, decompress_state_dict, is_compressed_tensor
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+
+from unit.common import DistributedTest
+from unit.simple_model import *
+
+from unit.checkpoint.common import checkpoint_correctness_verification
+
+
+@pytest.mark.parametrize('codec', ["zstd", "lz4"])
+class TestCompressedOptimizerStates(DistributedTest):
+    world_size = 2
+
+    def test_lossless(self, tmpdir, codec):
+        pytest.importorskip("zstandard" if codec == "zstd" else "lz4")
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "zero_optimization": {
+                "stage": 2
+            },
+            "checkpoint": {
+                "optimizer_state_compression": {
+                    "codec": codec
+                }
+            }
+        }
+        hidden_dim = 10
+        models = [SimpleModel(hidden_dim=hidden_dim) for _ in range(2)]
+        checkpoint_correctness_verification(config_dict=config_dict,
+                                            models=models,
+                                            hidden_dim=hidden_dim,
+                                            tmpdir=tmpdir,
+                                            load_optimizer_states=True,
+                                            load_lr_scheduler_states=False,
+                                            fp16=False)
+
+
+def _adam_state_dict():
+    return {
+        "base_optimizer_state": {
+            "state": {
+                0: {
+                    "step": 10,
+                    "exp_avg": torch.randn(5000),
+                    "exp_avg_sq": torch.rand(5000) * 1e-3
+                },
+                1: {
+                    "step": 10,
+                    "exp_avg": torch.randn(3,
+                                           7).bfloat16(),
+                    "exp_avg_sq": torch.rand(3,
+                                             7).bfloat16()
+                }
+            }
+        },
+        "single_partition_of_fp32_groups": [torch.randn(100)]
+    }
+
+
+@pytest.mark.parametrize('codec', ["zstd", "lz4"])
+def test_lossless_roundtrip(tmpdir, codec):
+    pytest.importorskip("zstandard" if codec == "zstd" else "lz4")
+    sd = _adam_state_dict()
+    compressed = compress_optimizer_state_dict(sd, codec=codec)
+
+    state = compressed["base_optimizer_state"]["state"]
+    assert is_compressed_tensor(state[0]["exp_avg"])
+    assert is_compressed_tensor(state[1]["exp_avg_sq"])
+    # only the Adam moments are compressed, the original state dict is untouched
+    assert torch.is_tensor(compressed["single_partition_of_fp32_groups"][0])
+    assert torch.is_tensor(sd["base_optimizer_state"]["state"][0]["exp_avg"])
+
+    path = os.path.join(tmpdir, "optim_states.pt")
+    torch.save(compressed, path)
+    loaded = TorchCheckpointEngine().load(path)
+    for param_id, param_state in sd["base_optimizer_state"]["state"].items():
+        for key in ["exp_avg", "exp_avg_sq"]:
+            loaded_tensor = loaded["base_optimizer_state"]["state"][param_id][key]
+            assert loaded_tensor.dtype == param_state[key].dtype
+            assert torch.equal(loaded_tensor, param_state[key])
+
+
+def test_quantized_exp_avg_sq():
+    sd = _adam_state_dict()
+    compressed = compress_optimizer_state_dict(sd,
+                                               quantize_exp_avg_sq=True,
+                                               block_size=256)
+    state = compressed["base_optimizer_state"]["state"]
+    assert torch.is_tensor(state[0]["exp_avg"])
+    assert state[0]["exp_avg_sq"]["ds_compressed_tensor"]["data"].dtype == torch.uint8
+
+    decompressed = decompress_state_dict(compressed)["base_optimizer_state"]["state"][0]
+    original = sd["base_optimizer_state"]["state"][0]["exp_avg_sq"]
+    assert decompressed["exp_avg_sq"].shape == original.shape
+
+
+def test_quantized_exp_avg_sq_adam_update():
+    # second moments spanning many orders of magnitude, with exact zeros
+    generator = torch.Generator().manual_seed(0)
+    exp_avg = torch.randn(4096, generator=generator) * 1e-4
+    exp_avg_sq = torch.exp(torch.randn(4096, generator=generator) * 3) * 1e-8
+    exp_avg_sq[::100] = 0
+    sd = {"state": {0: {"exp_avg": exp_avg, "exp_avg_sq": exp_avg_sq}}}
+
+    compressed = compress_optimizer_state_dict(sd,
+                                               quantize_exp_avg_sq=True,
+                                               block_size=256)
+    restored = decompress_state_dict(compressed)["state"][0]["exp_avg_sq"]
+
+    assert torch.equal(restored == 0, exp_avg_sq == 0)
+    eps = 1e-8
+    update = exp_avg / (exp_avg_sq.sqrt() + eps)
+    restored_update = exp_avg / (restored.sqrt() + eps)
+    ratio = restored_update / update
+    assert ratio.min() > 0.95 and ratio.max() < 1.05
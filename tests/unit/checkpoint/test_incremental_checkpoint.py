@@ -0,0 +1,85 @@
+import os
+import torch
+
+from deepspeed.runtime.checkpoint_engine.incremental_checkpoint_engine import IncrementalCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.tensor_reference import is_tensor_reference
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+
+from unit.common import DistributedTest
+from unit.simple_model import *
+
+from unit.checkpoint.common import checkpoint_correctness_verification
+
+
+class TestIncrementalCheckpoint(DistributedTest):
+    world_size = 1
+
+    def test_incremental_save(self, tmpdir):
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "checkpoint": {
+                "incremental": True
+            }
+        }
+        hidden_dim = 10
+        models = [SimpleModel(hidden_dim=hidden_dim) for _ in range(2)]
+        checkpoint_correctness_verification(config_dict=config_dict,
+                                            models=models,
+                                            hidden_dim=hidden_dim,
+                                            tmpdir=tmpdir,
+                                            load_optimizer_states=True,
+                                            load_lr_scheduler_states=False,
+                                            fp16=False)
+
+
+def _save_tag(engine, save_dir, tag, state):
+    path = os.path.join(save_dir, tag, "model_states.pt")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    engine.create(tag)
+    engine.save(state, path)
+    engine.commit(tag)
+    return path
+
+
+def test_incremental_skips_unchanged_tensors(tmpdir):
+    engine = IncrementalCheckpointEngine()
+    frozen = torch.randn(16)
+    trained = torch.randn(16)
+
+    paths, snapshots = [], []
+    for step in range(1, 4):
+        state = {"module": {"frozen": frozen, "trained": trained}}
+        paths.append(_save_tag(engine, tmpdir, f"step{step}", state))
+        snapshots.append(trained.clone())
+        trained.add_(1)
+
+    raw = torch.load(paths[-1])
+    assert is_tensor_reference(raw["module"]["frozen"])
+    assert not is_tensor_reference(raw["module"]["trained"])
+    # References always point at the tag holding the data, not at the previous tag
+    assert raw["module"]["frozen"]["ds_tensor_ref"]["tag"] == "step1"
+
+    loader = TorchCheckpointEngine()
+    for path, snapshot in zip(paths, snapshots):
+        loaded = loader.load(path)
+        assert torch.equal(loaded["module"]["frozen"], frozen)
+        assert torch.equal(loaded["module"]["trained"], snapshot)
+
+
+def test_incremental_requires_commit(tmpdir):
+    engine = IncrementalCheckpointEngine()
+    weight = torch.randn(8)
+
+    path = os.path.join(tmpdir, "step1", "model_states.pt")
+    os.makedirs(os.path.dirname(path))
+    engine.save({"weight": weight}, path)
+    # step1 was never committed, so step2 must not reference it
+    path2 = _save_tag(engine, tmpdir, "step2", {"weight": weight})
+    assert not is_tensor_reference(torch.load(path2)["weight"])
@@ -0,0 +1,133 @@
+import os
+import pytest
+import torch
+
+from deepspeed.runtime.checkpoint_engine.mmap_checkpoint import is_mmap_checkpoint, save_mmap_checkpoint, load_mmap_checkpoint
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+
+from unit.common import DistributedTest
+from unit.simple_model import *
+
+from unit.checkpoint.common import checkpoint_correctness_verification
+
+
+class TestMmapCheckpoint(DistributedTest):
+    world_size = 1
+
+    @pytest.mark.parametrize('zero_stage', [0, 2])
+    def test_mmap_format(self, tmpdir, zero_stage):
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "zero_optimization": {
+                "stage": zero_stage
+            },
+            "checkpoint": {
+                "mmap_format": True
+            }
+        }
+        hidden_dim = 10
+        models = [SimpleModel(hidden_dim=hidden_dim) for _ in range(2)]
+        checkpoint_correctness_verification(config_dict=config_dict,
+                                            models=models,
+                                            hidden_dim=hidden_dim,
+                                            tmpdir=tmpdir,
+                                            load_optimizer_states=True,
+                                            load_lr_scheduler_states=False,
+                                            fp16=False)
+
+
+def test_mmap_checkpoint_roundtrip(tmpdir):
+    path = os.path.join(tmpdir, "state.pt")
+    state = {
+        "module": {
+            "weight": torch.randn(3,
+                                  5),
+            "bias": torch.arange(7,
+                                 dtype=torch.bfloat16),
+            "scalar": torch.tensor(2.5),
+            "empty": torch.empty(0,
+                                 4),
+        },
+        "shapes": [torch.Size([3,
+                               5])],
+        "transposed": torch.randn(4,
+                                  6).t(),
+        "step": 10,
+        "name": "global_step10",
+    }
+    save_mmap_checkpoint(state, path)
+    assert is_mmap_checkpoint(path)
+
+    loaded = load_mmap_checkpoint(path)
+    assert loaded["step"] == 10
+    assert loaded["name"] == "global_step10"
+    assert loaded["shapes"] == state["shapes"]
+    for key, value in state["module"].items():
+        assert loaded["module"][key].dtype == value.dtype
+        assert torch.equal(loaded["module"][key], value)
+    assert torch.equal(loaded["transposed"], state["transposed"])
+
+    # Loaded tensors are copy-on-write views, updating them leaves the file intact.
+    loaded["module"]["weight"].zero_()
+    reloaded = load_mmap_checkpoint(path)
+    assert torch.equal(reloaded["module"]["weight"], state["module"]["weight"])
+
+
+def test_mmap_checkpoint_shared_storage(tmpdir):
+    path = os.path.join(tmpdir, "state.pt")
+    flat = torch.arange(12, dtype=torch.float)
+    first = flat[:4].view(2, 2)
+    state = {"flat": flat, "first": first, "second": flat[4:], "other": torch.ones(3)}
+    save_mmap_checkpoint(state, path)
+
+    loaded = load_mmap_checkpoint(path)
+    for key, value in state.items():
+        assert torch.equal(loaded[key], value)
+    # views of one storage are saved once and still alias after load
+    loaded["flat"].zero_()
+    assert loaded["first"].eq(0).all() and loaded["second"].eq(0).all()
+    assert loaded["other"].eq(1).all()
+
+
+def test_mmap_checkpoint_map_location(tmpdir):
+    path = os.path.join(tmpdir, "state.pt")
+    state = {"weight": torch.randn(4)}
+    save_mmap_checkpoint(state, path)
+
+    locations = []
+
+    def keep_on_cpu(storage, location):
+        locations.append(location)
+        return storage
+
+    map_locations = [keep_on_cpu, {"cuda:0": "cpu"}, "cpu", torch.device("cpu"), None]
+    for map_location in map_locations:
+        loaded = load_mmap_checkpoint(path, map_location=map_location)
+        assert torch.equal(loaded["weight"], state["weight"])
+    assert locations == ["cpu"]
+
+    with pytest.raises(TypeError):
+        load_mmap_checkpoint(path, map_location=1)
+
+
+def test_torch_engine_loads_both_formats(tmpdir):
+    engine = TorchCheckpointEngine()
+    state = {"weight": torch.randn(4)}
+
+    legacy_path = os.path.join(tmpdir, "legacy.pt")
+    engine.save(state, legacy_path)
+    assert not is_mmap_checkpoint(legacy_path)
+
+    mmap_path = os.path.join(tmpdir, "mmap.pt")
+    save_mmap_checkpoint(state, mmap_path)
+
+    for path in [legacy_path, mmap_path]:
+        loaded = engine.load(path, map_location='cpu')
+        assert torch.equal(loaded["weight"], state["weight"])
@@ -0,0 +1,118 @@
+import os
+import shutil
+import pytest
+import torch
+
+import deepspeed.comm as dist
+from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+from deepspeed.runtime.checkpoint_engine.peer_memory_checkpoint_engine import PeerMemoryCheckpointEngine
+
+from unit.common import DistributedTest
+from unit.simple_model import *
+
+from unit.checkpoint.common import checkpoint_correctness_verification
+
+
+class TestPeerMemoryCheckpoint(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('zero_stage', [0, 2])
+    def test_checkpoint_correctness(self, tmpdir, zero_stage):
+        config_dict = {
+            "train_batch_size": 2,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "zero_optimization": {
+                "stage": zero_stage
+            },
+            "checkpoint": {
+                "peer_memory": {
+                    "enabled": True,
+                    "persist_interval": 2,
+                    "memory_dir": os.path.join(tmpdir,
+                                               "memory")
+                }
+            }
+        }
+        hidden_dim = 10
+        models = [SimpleModel(hidden_dim=hidden_dim) for _ in range(2)]
+        # the only checkpoint is loaded from memory, it is not persisted
+        checkpoint_correctness_verification(config_dict=config_dict,
+                                            models=models,
+                                            hidden_dim=hidden_dim,
+                                            tmpdir=tmpdir,
+                                            load_optimizer_states=True,
+                                            load_lr_scheduler_states=True,
+                                            fp16=False)
+
+    def test_restore_from_buddy(self, tmpdir, monkeypatch):
+        # one rank per node, so that the ranks are buddies of each other
+        monkeypatch.setenv("LOCAL_SIZE", "1")
+        rank = dist.get_rank()
+        memory_dir = os.path.join(tmpdir, "memory")
+        engine = PeerMemoryCheckpointEngine(TorchCheckpointEngine(),
+                                            persist_interval=2,
+                                            memory_dir=memory_dir,
+                                            device=torch.device("cpu"),
+                                            chunk_bytes=100)
+        assert engine.buddy_rank == 1 - rank
+
+        state_dicts = {}
+        for step in range(2):
+            tag = f"global_step{step}"
+            path = os.path.join(tmpdir, tag, f"rank_{rank}_states.pt")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            state_dicts[tag] = {"weight": torch.randn(64) + rank, "step": step}
+            engine.create(tag)
+            engine.save(state_dicts[tag], path)
+            engine.commit(tag)
+            # only every second checkpoint is persisted
+            assert os.path.isfile(path) == (step == 1)
+            dist.barrier()
+
+        # simulate the replacement of the node of rank 1
+        if rank == 1:
+            shutil.rmtree(engine.own_dir)
+        dist.barrier()
+
+        tag = "global_step1"
+        assert engine.restore(tag)
+        loaded = engine.load(os.path.join(tmpdir, tag, f"rank_{rank}_states.pt"))
+        assert loaded["step"] == 1
+        assert torch.equal(loaded["weight"], state_dicts[tag]["weight"])
+
+    def test_memory_only_tag(self, tmpdir, monkeypatch):
+        monkeypatch.setenv("LOCAL_SIZE", "1")
+        rank = dist.get_rank()
+        engine = PeerMemoryCheckpointEngine(TorchCheckpointEngine(),
+                                            persist_interval=2,
+                                            memory_dir=os.path.join(tmpdir,
+                                                                    "memory"),
+                                            device=torch.device("cpu"))
+        persisted = []
+        for step in range(3):
+            tag = f"global_step{step}"
+            engine.create(tag)
+            # like the model states, only saved by the first rank
+            if rank == 0:
+                path = os.path.join(tmpdir, tag, "mp_rank_00_model_states.pt")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                engine.save({"step": step}, path)
+            engine.commit(tag)
+            engine.on_persisted(tag, lambda: persisted.append(tag))
+            dist.barrier()
+
+        # only the second tag is persisted
+        assert persisted == ["global_step1"]
+        assert engine.latest_tag() == "global_step2"
+        pattern = os.path.join(tmpdir, "global_step2", "mp_rank_*_model_states.pt")
+        assert engine.glob(pattern) == [
+            os.path.join(tmpdir,
+                         "global_step2",
+                         "mp_rank_00_model_states.pt")
+        ]
@@ -1,4 +1,6 @@
 from deepspeed.runtime.checkpoint_engine.torch_checkpoint_engine import TorchCheckpointEngine
+from deepspeed.runtime.pipe.module import _LayerFileWindow
+from deepspeed.runtime.config import DeepSpeedConfigError, get_checkpoint_parallel_write_max_inflight_bytes
 from unit.common import DistributedTest
 from unit.simple_model import *
 
@@ -11,7 +13,8 @@ class TestPipelineCheckpoint(DistributedTest):
     world_size = 4
 
     @pytest.mark.parametrize("zero_stage", [0, 1])
-    def test_checkpoint_pipe_engine(self, zero_stage, tmpdir):
+    @pytest.mark.parametrize("layer_workers", [1, 4])
+    def test_checkpoint_pipe_engine(self, zero_stage, layer_workers, tmpdir):
         config_dict = {
             "train_batch_size": 2,
             "train_micro_batch_size_per_gpu": 1,
@@ -43,6 +46,13 @@ class TestPipelineCheckpoint(DistributedTest):
                     "cycle_max_mom": 0.99,
                     "decay_mom_rate": 0.0
                 }
+            },
+            "checkpoint": {
+                "parallel_write": {
+                    "layer_workers": layer_workers,
+                    # small enough to keep only a few layer files in flight
+                    "max_inflight_bytes": 4096
+                }
             }
         }
         fp16=config_dict['fp16']['enabled']
@@ -116,3 +126,28 @@ class TestPipelineCheckpoint(DistributedTest):
             # Compare layer parameters
             for p0, p1 in zip(A_layer.parameters(), B_layer.parameters()):
                 assert torch.allclose(p0, p1, atol=1e-07), f"Model state {p0} is not equal to {p1}"
+
+
+def test_layer_file_window_bounds_inflight_bytes():
+    window = _LayerFileWindow(num_workers=4, max_inflight_bytes=10)
+    completed = []
+    for idx in range(6):
+        completed += window.make_room(4)
+        assert window.inflight_bytes + 4 <= 10 or not window.pending
+        window.submit(4, idx, lambda i: i * i, idx)
+    completed += window.drain()
+    # results come back in submission order
+    assert completed == [(i, i * i) for i in range(6)]
+    assert window.inflight_bytes == 0
+
+    with pytest.raises(AssertionError):
+        _LayerFileWindow(num_workers=4, max_inflight_bytes=0)
+
+
+@pytest.mark.parametrize("max_inflight_bytes", [0, -1, 1.5])
+def test_invalid_max_inflight_bytes(max_inflight_bytes):
+    with pytest.raises(DeepSpeedConfigError):
+        get_checkpoint_parallel_write_max_inflight_bytes(
+            {"parallel_write": {
+                "max_inflight_bytes": max_inflight_bytes
+            }})
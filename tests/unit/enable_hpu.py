@@ -0,0 +1,2 @@
+import pytest
+pytest.use_hpu='False'
@@ -105,3 +105,34 @@ def test_cpu_adam_gpu_error():
     param.grad = torch.randn(model_size, device=device)
     with pytest.raises(AssertionError):
         optimizer.step()
+
+
+def test_cpu_adam_step_slice():
+    from deepspeed.ops.adam import DeepSpeedCPUAdam
+    model_size = 1000
+    param = torch.nn.Parameter(torch.randn(model_size))
+    sliced_param = torch.nn.Parameter(param.detach().clone())
+    optimizer = DeepSpeedCPUAdam([param])
+    sliced_optimizer = DeepSpeedCPUAdam([sliced_param])
+    group = {
+        key: value
+        for key,
+        value in sliced_optimizer.param_groups[0].items() if key != 'params'
+    }
+
+    for i in range(5):
+        param.grad = torch.randn(model_size)
+        sliced_param.grad = param.grad.clone()
+        optimizer.step()
+        step = sliced_optimizer.begin_slice_step(sliced_param)
+        # slices may be updated out of order
+        for offset in [600, 0, 300]:
+            sliced_optimizer.step_slice(sliced_param,
+                                        group,
+                                        step,
+                                        offset,
+                                        min(300,
+                                            model_size - offset))
+        sliced_optimizer.step_slice(sliced_param, group, step, 900, 100)
+
+    check_equal(param, sliced_param, atol=1e-6)
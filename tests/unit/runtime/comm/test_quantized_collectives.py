@@ -0,0 +1,109 @@
+"""unit tests for quantized collectives"""
+
+import torch
+import pytest
+import deepspeed.comm as dist
+from deepspeed.runtime.comm.quantized_collectives import BlockQuantizer, all_to_all_quant_reduce, quant_all_reduce
+
+from unit.common import DistributedTest
+
+
+@pytest.mark.parametrize('dtype', ["int8", "fp8"])
+@pytest.mark.parametrize('block_size', [30, 32])
+@pytest.mark.parametrize('numel', [1, 64, 100])
+def test_block_quantizer_roundtrip(dtype, block_size, numel):
+    quantizer = BlockQuantizer(dtype, block_size=block_size)
+    tensor = torch.randn(numel)
+    tensor[:numel // 2] *= 100
+    packed = torch.empty(quantizer.packed_numel(numel), dtype=torch.uint8)
+    dequantized = quantizer.pack(tensor, packed)
+
+    assert torch.equal(dequantized, quantizer.unpack(packed, numel))
+    # the error of each block is bounded by its largest element
+    tolerance = 0.01 if dtype == "int8" else 0.07
+    for block in range(quantizer.num_blocks(numel)):
+        expected = tensor[block * block_size:(block + 1) * block_size]
+        actual = dequantized[block * block_size:(block + 1) * block_size]
+        assert (actual - expected).abs().max() <= tolerance * expected.abs().max()
+
+
+def test_block_quantizer_zeros():
+    quantizer = BlockQuantizer("int8", block_size=8)
+    packed = torch.empty(quantizer.packed_numel(10), dtype=torch.uint8)
+    assert torch.equal(quantizer.pack(torch.zeros(10), packed), torch.zeros(10))
+
+
+def _get_device():
+    if bool(pytest.use_hpu) == True:
+        import habana_frameworks.torch.hpu as hpu
+        return 'hpu:' + str(hpu.current_device())
+    return torch.cuda.current_device()
+
+
+class TestQuantizedCollectives(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('dtype', ["int8", "fp8"])
+    def test_all_to_all_quant_reduce(self, dtype):
+        quantizer = BlockQuantizer(dtype, block_size=16)
+        rank = dist.get_rank()
+        tensor = torch.arange(100, dtype=torch.float, device=_get_device()) * (rank + 1)
+        expected = torch.arange(100, dtype=torch.float, device=_get_device()) * 3
+        rank_ranges = [[(0, 10), (60, 40)], [(10, 50)]]
+        residual = torch.zeros_like(tensor)
+
+        all_to_all_quant_reduce(tensor, rank_ranges, quantizer, residual=residual)
+
+        for offset, numel in rank_ranges[rank]:
+            reduced = tensor.narrow(0, offset, numel)
+            assert torch.allclose(reduced, expected.narrow(0, offset, numel), rtol=0.07)
+        # ranges of the other rank are not reduced
+        for offset, numel in rank_ranges[1 - rank]:
+            unreduced = expected.narrow(0, offset, numel) * (rank + 1) / 3
+            assert torch.allclose(tensor.narrow(0, offset, numel), unreduced)
+        assert residual.abs().max() > 0
+
+    def test_non_finite_residual(self):
+        quantizer = BlockQuantizer("int8", block_size=4)
+        tensor = torch.ones(16, device=_get_device())
+        tensor[5] = float('inf')
+        residual = torch.full_like(tensor, 0.01)
+        rank_ranges = [[(0, 8)], [(8, 8)]]
+
+        all_to_all_quant_reduce(tensor, rank_ranges, quantizer, residual=residual)
+
+        # the errors of the overflowing block are dropped, not stored as NaN
+        assert torch.isfinite(residual).all()
+        assert residual[4:8].eq(0).all()
+
+    def test_fp32_residual(self):
+        quantizer = BlockQuantizer("int8", block_size=8)
+        rank = dist.get_rank()
+        torch.manual_seed(rank)
+        tensor = torch.randn(16, device=_get_device()).half()
+        residual = torch.zeros(16, dtype=torch.float32, device=_get_device())
+        rank_ranges = [[(0, 8)], [(8, 8)]]
+        sent = tensor.float()
+
+        all_to_all_quant_reduce(tensor, rank_ranges, quantizer, residual=residual)
+
+        # the error of fp16 gradients is kept in fp32
+        assert residual.dtype == torch.float32
+        packed = torch.empty(quantizer.packed_numel(8), dtype=torch.uint8)
+        for offset in [0, 8]:
+            block = sent.narrow(0, offset, 8).cpu()
+            error = block - quantizer.pack(block, packed)
+            assert torch.allclose(residual.narrow(0, offset, 8).cpu(), error)
+
+    def test_quant_all_reduce(self):
+        quantizer = BlockQuantizer("int8", block_size=16)
+        tensor = torch.randn(101, device=_get_device()) + dist.get_rank()
+        expected = tensor.clone()
+        dist.all_reduce(expected)
+
+        quant_all_reduce(tensor, quantizer)
+
+        assert torch.allclose(tensor, expected, atol=0.1)
+        gathered = [torch.empty_like(tensor) for _ in range(2)]
+        dist.all_gather(gathered, tensor)
+        assert torch.equal(gathered[0], gathered[1])
@@ -1,6 +1,9 @@
 import torch
 import deepspeed
 import numpy as np
+import deepspeed.comm as dist
+from deepspeed.runtime.fp16.loss_scaler import DynamicLossScaler, DeviceDynamicLossScaler
+from deepspeed.runtime.zero.stage_1_and_2 import DeepSpeedZeroOptimizer
 from unit.common import DistributedTest
 from unit.simple_model import SimpleModel
 from unit.hpu import *
@@ -301,3 +304,158 @@ class TestUnfused(DistributedTest):
         expected_loss_scale /= (2**len(overflow_gradients))
         assert optim.cur_scale == expected_loss_scale
         assert optim.cur_iter == expected_iteration
+
+
+@pytest.mark.parametrize('consecutive_hysteresis', [False, True])
+@pytest.mark.parametrize('delayed_shift', [1, 2])
+def test_device_dynamic_loss_scaler(delayed_shift, consecutive_hysteresis):
+    scaler_args = {
+        "init_scale": 2**16,
+        "scale_window": 3,
+        "delayed_shift": delayed_shift,
+        "consecutive_hysteresis": consecutive_hysteresis,
+        "raise_error_at_min_scale": False
+    }
+    host_scaler = DynamicLossScaler(**scaler_args)
+    device_scaler = DeviceDynamicLossScaler(torch.device("cpu"), **scaler_args)
+    overflows = np.random.RandomState(delayed_shift).uniform(size=100) < 0.4
+    for overflow in overflows:
+        host_scaler.update_scale(bool(overflow))
+        device_scaler.update_scale(torch.tensor(bool(overflow)))
+        assert device_scaler.cur_scale.item() == host_scaler.cur_scale
+        assert device_scaler.cur_hysteresis.item() == host_scaler.cur_hysteresis
+    assert device_scaler.read_overflows() == overflows.sum()
+    assert device_scaler.read_overflows() == 0
+
+    host_scaler = device_scaler.to_host_scaler()
+    assert host_scaler.cur_scale == device_scaler.cur_scale.item()
+    assert host_scaler.cur_iter == device_scaler.cur_iter
+
+
+class TestDeferredOverflowCheck(DistributedTest):
+    world_size = 2
+
+    def test(self):
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 1,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "loss_scale": 0,
+                "initial_scale_power": 8,
+                "loss_scale_window": 100,
+                "hysteresis": 1,
+                "deferred_overflow_check": True
+            },
+            "zero_optimization": {
+                "stage": 2
+            }
+        }
+        if bool(pytest.use_hpu) == True:
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        hidden_dim = 10
+        model = SimpleModel(hidden_dim)
+        model, optim, _, _ = deepspeed.initialize(config=config_dict,
+                                                  model=model,
+                                                  model_parameters=model.parameters())
+        assert optim.deferred_overflow_check
+        x = torch.randn(1, hidden_dim, device=model.device, dtype=torch.half)
+        y = torch.zeros(1, device=model.device, dtype=torch.long)
+
+        loss = model(x, y)
+        model.backward(loss)
+        model.step()
+        assert model.skipped_steps == 0
+        assert optim.cur_scale.item() == 2**8
+
+        # an overflow on one rank reverts the step on all ranks
+        params = [p.detach().clone() for p in model.parameters()]
+        loss = model(x, y)
+        model.backward(loss)
+        if dist.get_rank() == 0:
+            optim.averaged_gradients[0][0].view(-1)[0] = float('inf')
+        model.step()
+        assert model.skipped_steps == 1
+        assert optim.cur_scale.item() == 2**7
+        for param, expected in zip(model.parameters(), params):
+            assert torch.equal(param, expected)
+
+    def test_first_step_overflow(self):
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 1,
+            "steps_per_print": 1,
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 0.00015
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "loss_scale": 0,
+                "initial_scale_power": 8,
+                "loss_scale_window": 100,
+                "hysteresis": 1,
+                "deferred_overflow_check": True
+            },
+            "zero_optimization": {
+                "stage": 2
+            }
+        }
+        if bool(pytest.use_hpu) == True:
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        hidden_dim = 10
+        model = SimpleModel(hidden_dim)
+        model, optim, _, _ = deepspeed.initialize(config=config_dict,
+                                                  model=model,
+                                                  model_parameters=model.parameters())
+        x = torch.randn(1, hidden_dim, device=model.device, dtype=torch.half)
+        y = torch.zeros(1, device=model.device, dtype=torch.long)
+
+        # the optimizer states are created by the overflowing step
+        params = [p.detach().clone() for p in model.parameters()]
+        loss = model(x, y)
+        model.backward(loss)
+        optim.averaged_gradients[0][0].view(-1)[0] = float('inf')
+        model.step()
+        assert model.skipped_steps == 1
+        for param, expected in zip(model.parameters(), params):
+            assert torch.equal(param, expected)
+
+        loss = model(x, y)
+        model.backward(loss)
+        model.step()
+        assert model.skipped_steps == 1
+        for param in model.parameters():
+            assert torch.isfinite(param).all()
+
+
+def test_masked_optimizer_step_creates_state():
+    param = torch.nn.Parameter(torch.ones(4))
+    zero_optimizer = object.__new__(DeepSpeedZeroOptimizer)
+    zero_optimizer.optimizer = torch.optim.Adam([param], lr=0.1)
+    zero_optimizer.single_partition_of_fp32_groups = [param]
+    zero_optimizer.dtype = torch.half
+
+    param.grad = torch.full((4, ), float('inf'))
+    zero_optimizer._masked_optimizer_step(0, torch.tensor(True))
+    assert torch.equal(param, torch.ones(4))
+    state = zero_optimizer.optimizer.state[param]
+    assert state["exp_avg"].eq(0).all() and state["exp_avg_sq"].eq(0).all()
+
+    param.grad = torch.ones(4)
+    zero_optimizer._masked_optimizer_step(0, torch.tensor(False))
+    assert torch.isfinite(param).all()
+    assert torch.allclose(param, torch.full((4, ), 0.9))
@@ -0,0 +1,94 @@
+import os
+import pytest
+import torch
+import deepspeed
+from deepspeed.runtime.zero.bucket_arena import BucketArena
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+def test_bucket_arena():
+    arena = BucketArena('cpu')
+    tensors = [torch.randn(3, 4), torch.randn(5)]
+    flat = arena.flatten("bucket", tensors, numel=20)
+    assert torch.equal(flat[:17], torch.cat([t.view(-1) for t in tensors]))
+    assert torch.equal(flat[17:], torch.zeros(3))
+
+    # smaller buckets reuse the buffer, larger ones grow it
+    buffer = arena.buffers[("bucket", torch.float)]
+    assert arena.flatten("bucket", tensors[1:]).data_ptr() == buffer.data_ptr()
+    assert arena.get("bucket", 30, torch.float).numel() == 30
+    assert arena.buffers[("bucket", torch.float)].numel() == 30
+    assert arena.get("bucket", 10, torch.half).dtype == torch.half
+    assert arena.memory_bytes() == 30 * 4 + 10 * 2
+
+
+class TestZeroPersistentGradientBuckets(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('zero_stage', [1, 2])
+    def test(self, zero_stage):
+        hidden_dim = 10
+        dtype = torch.half
+
+        models = []
+        for persistent_gradient_buckets in [False, True]:
+            config_dict = {
+                "train_micro_batch_size_per_gpu": 2,
+                "gradient_accumulation_steps": 2,
+                "steps_per_print": 1,
+                "zero_optimization": {
+                    "stage": zero_stage,
+                    "reduce_bucket_size": 25,
+                    "overlap_comm": True,
+                    "persistent_gradient_buckets": persistent_gradient_buckets
+                },
+                "optimizer": {
+                    "type": "Adam",
+                    "params": {
+                        "lr": 1e-3
+                    }
+                },
+                "fp16": {
+                    "enabled": True,
+                    "initial_scale_power": 8
+                }
+            }
+            if bool(pytest.use_hpu) == True:
+                if os.getenv("REPLACE_FP16", default=None):
+                    config_dict["fp16"]["enabled"] = False
+                    config_dict["bf16"] = {"enabled": True}
+                    dtype = torch.bfloat16
+                hpu_flag, msg = is_hpu_supported(config_dict)
+                if not hpu_flag:
+                    pytest.skip(msg)
+
+            torch.manual_seed(42)
+            model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+            model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                          model=model,
+                                                          model_parameters=model.parameters())
+            torch.manual_seed(0)
+            data_loader = random_dataloader(model=model,
+                                            total_samples=16,
+                                            hidden_dim=hidden_dim,
+                                            device=model.device,
+                                            dtype=dtype)
+            arena_bytes = []
+            for batch in data_loader:
+                loss = model(batch[0], batch[1])
+                model.backward(loss)
+                model.step()
+                if persistent_gradient_buckets:
+                    arena_bytes.append(optimizer.bucket_arena.memory_bytes())
+            models.append(model)
+
+            if persistent_gradient_buckets:
+                # the buckets are allocated in the first step and then reused
+                assert arena_bytes[-1] > 0
+                assert arena_bytes[-1] == arena_bytes[1]
+
+        for param, persistent_param in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.equal(param, persistent_param)
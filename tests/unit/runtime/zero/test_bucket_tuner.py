@@ -0,0 +1,104 @@
+import os
+import pytest
+import torch
+import deepspeed
+from deepspeed.runtime.zero.bucket_tuner import fit_latency_model, pick_bucket_size
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+def test_fit_latency_model():
+    # 10us launch, 1ns per byte, with a warmup outlier
+    sizes = [1000, 4000, 16000] * 3
+    samples = [(size, 0.01 + size * 1e-6) for size in sizes]
+    samples.append((1000, 5.0))
+    launch, per_byte = fit_latency_model(samples)
+    assert launch == pytest.approx(0.01)
+    assert per_byte == pytest.approx(1e-6)
+
+
+# a single message size, and latencies that shrink with the message size
+SINGLE_SIZE_SAMPLES = [(1000, 1.0), (1000, 2.0)]
+SHRINKING_SAMPLES = [(1000, 2.0), (2000, 1.0)]
+
+
+@pytest.mark.parametrize('samples', [[], SINGLE_SIZE_SAMPLES, SHRINKING_SAMPLES])
+def test_fit_latency_model_degenerate(samples):
+    assert fit_latency_model(samples) is None
+
+
+def test_pick_bucket_size():
+    # launch is 10% of the latency of a 90KB message, 45K fp16 elements
+    assert pick_bucket_size(0.01, 1e-6, 0.1, 2, 1, 10**9) == 45000
+    assert pick_bucket_size(0.01, 1e-6, 0.1, 2, 10**5, 10**9) == 10**5
+    assert pick_bucket_size(0.01, 1e-6, 0.1, 2, 1, 1000) == 1000
+
+
+class TestZeroBucketSizeTuning(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('zero_stage', [2, 3])
+    def test(self, zero_stage):
+        hidden_dim = 10
+        dtype = torch.half
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 2,
+            "steps_per_print": 1,
+            "zero_optimization": {
+                "stage": zero_stage,
+                "reduce_bucket_size": 1000,
+                "allgather_bucket_size": 1024,
+                "prefetch_bucket_size": 1000,
+                "bucket_size_tuning": {
+                    "enabled": True,
+                    "tuning_steps": 3,
+                    "min_bucket_size": 20
+                }
+            },
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 1e-3
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "initial_scale_power": 8
+            }
+        }
+        if bool(pytest.use_hpu) == True:
+            if os.getenv("REPLACE_FP16", default=None):
+                config_dict["fp16"]["enabled"] = False
+                config_dict["bf16"] = {"enabled": True}
+                dtype = torch.bfloat16
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+        model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                      model=model,
+                                                      model_parameters=model.parameters())
+        tuner = model.bucket_size_tuner
+        data_loader = random_dataloader(model=model,
+                                        total_samples=8,
+                                        hidden_dim=hidden_dim,
+                                        device=model.device,
+                                        dtype=dtype)
+        bucket_sizes = []
+        for batch in data_loader:
+            bucket_sizes.append(optimizer.get_bucket_sizes())
+            loss = model(batch[0], batch[1])
+            model.backward(loss)
+            model.step()
+
+        # swept from the configured sizes down to the minimum, then frozen
+        assert bucket_sizes[0] == tuner.max_bucket_sizes
+        assert bucket_sizes[2]["reduce_bucket_size"] == 20
+        assert tuner.frozen
+        assert bucket_sizes[3] == optimizer.get_bucket_sizes()
+        for name, size in optimizer.get_bucket_sizes().items():
+            assert 20 <= size <= tuner.max_bucket_sizes[name]
+        assert not deepspeed.comm.comms_logger.enabled
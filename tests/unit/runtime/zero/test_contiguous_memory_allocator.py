@@ -0,0 +1,76 @@
+import torch
+from deepspeed.runtime.zero.contiguous_memory_allocator import ContiguousMemoryAllocator
+
+
+def _allocate(mem, size, value):
+    tensor = mem.allocate_tensor(size)
+    tensor.fill_(value)
+    return tensor
+
+
+def test_best_fit():
+    mem = ContiguousMemoryAllocator(100, torch.float, 'cpu')
+    a = _allocate(mem, 30, 1)
+    b = _allocate(mem, 10, 2)
+    c = _allocate(mem, 10, 3)
+    d = _allocate(mem, 50, 4)
+    mem.release_tensor(a)
+    mem.release_tensor(c)
+    assert mem.largest_contiguous == 30
+
+    # the smallest free block that fits is used, the large one stays intact
+    e = _allocate(mem, 8, 5)
+    assert mem.tensor_addresses[id(e)] == 40
+    assert mem.largest_contiguous == 30
+    assert b.eq(2).all() and d.eq(4).all()
+
+
+def test_coalesce_released_blocks():
+    mem = ContiguousMemoryAllocator(100, torch.float, 'cpu')
+    tensors = [_allocate(mem, 20, i) for i in range(5)]
+    for i in [1, 3, 2]:
+        mem.release_tensor(tensors[i])
+    assert mem.contiguous_sizes == {20: 60}
+    assert mem.largest_contiguous == 60
+
+    mem.release_tensor(tensors[0])
+    mem.release_tensor(tensors[4])
+    assert mem.contiguous_sizes == {0: 100}
+    assert mem.largest_contiguous == 100
+
+
+def test_defragment_keeps_data_and_params():
+    mem = ContiguousMemoryAllocator(64, torch.float, 'cpu')
+    tensors = [_allocate(mem, 8, i) for i in range(8)]
+    params = []
+    for i in range(0, 8, 2):
+        param = torch.nn.Parameter(torch.empty(0))
+        mem.assign_to_param(tensors[i], param, 6, (2, 3))
+        params.append((i, param))
+    for i in range(1, 8, 2):
+        mem.release_tensor(tensors[i])
+    assert mem.largest_contiguous == 8
+
+    # needs to compact the four live tensors to the front of the buffer
+    large = _allocate(mem, 32, -1)
+    assert mem.tensor_addresses[id(large)] == 32
+    assert mem.contiguous_sizes == {}
+    for i, param in params:
+        assert param.shape == (2, 3)
+        assert param.eq(i).all()
+        assert param.data_ptr() == mem.tensor_map[param.contiguous_tensor_id].data_ptr()
+    assert large.eq(-1).all()
+
+
+def test_defragment_overlapping_move():
+    mem = ContiguousMemoryAllocator(100, torch.float, 'cpu')
+    a = _allocate(mem, 10, 1)
+    expected = torch.arange(60, dtype=torch.float)
+    tensor = mem.allocate_tensor(60)
+    tensor.copy_(expected)
+    mem.release_tensor(a)
+
+    # the 60 element tensor moves 10 elements down, onto itself
+    _allocate(mem, 40, -1)
+    assert mem.tensor_addresses[id(tensor)] == 0
+    assert mem.tensor_map[id(tensor)].equal(expected)
@@ -0,0 +1,100 @@
+import os
+import pytest
+import torch
+import deepspeed
+from deepspeed.runtime.zero.grad_offload_pipeline import GradientOffloadPipeline
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+def test_gradient_offload_pipeline():
+    if not torch.cuda.is_available():
+        pytest.skip("pinned memory requires an accelerator")
+    device = torch.cuda.current_device()
+    pipeline = GradientOffloadPipeline(buffer_count=2,
+                                       buffer_numel=7,
+                                       dtype=torch.half,
+                                       device=device)
+    grads = [torch.randn(30, dtype=torch.half, device=device) for _ in range(3)]
+    dest = torch.zeros(30)
+    norms = []
+    pipeline.copy(grads[0], dest, accumulate=False)
+    pipeline.copy(grads[1], dest, accumulate=True)
+    pipeline.copy(grads[2],
+                  dest,
+                  accumulate=True,
+                  on_done=lambda grad: norms.append(grad.norm()))
+    pipeline.synchronize()
+
+    expected = sum(grad.float().cpu() for grad in grads)
+    assert torch.allclose(dest, expected)
+    assert len(norms) == 1 and torch.allclose(norms[0], expected.norm())
+
+
+class TestZeroPipelinedGradOffload(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('zero_stage', [1, 2])
+    def test(self, zero_stage):
+        hidden_dim = 10
+        dtype = torch.half
+
+        models = []
+        for pipeline_grad_offload in [False, True]:
+            config_dict = {
+                "train_micro_batch_size_per_gpu": 2,
+                "gradient_accumulation_steps": 2,
+                "steps_per_print": 1,
+                "zero_optimization": {
+                    "stage": zero_stage,
+                    "reduce_bucket_size": 25,
+                    "offload_optimizer": {
+                        "device": "cpu",
+                        "pipeline_grad_offload": pipeline_grad_offload,
+                        "grad_buffer_count": 2,
+                        "grad_buffer_size": 16
+                    }
+                },
+                "optimizer": {
+                    "type": "Adam",
+                    "params": {
+                        "lr": 1e-3
+                    }
+                },
+                "fp16": {
+                    "enabled": True,
+                    "initial_scale_power": 8
+                }
+            }
+            if bool(pytest.use_hpu) == True:
+                if os.getenv("REPLACE_FP16", default=None):
+                    config_dict["fp16"]["enabled"] = False
+                    config_dict["bf16"] = {"enabled": True}
+                    dtype = torch.bfloat16
+                hpu_flag, msg = is_hpu_supported(config_dict)
+                if not hpu_flag:
+                    pytest.skip(msg)
+
+            torch.manual_seed(42)
+            model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+            model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                          model=model,
+                                                          model_parameters=model.parameters())
+            assert (optimizer.grad_offload_pipeline is not None) == pipeline_grad_offload
+            torch.manual_seed(0)
+            data_loader = random_dataloader(model=model,
+                                            total_samples=16,
+                                            hidden_dim=hidden_dim,
+                                            device=model.device,
+                                            dtype=dtype)
+            for batch in data_loader:
+                loss = model(batch[0], batch[1])
+                model.backward(loss)
+                model.step()
+            models.append(model)
+
+        # the pipeline accumulates in fp32 on CPU instead of fp16 on device
+        for param, pipelined_param in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.allclose(param, pipelined_param, atol=1e-3)
@@ -0,0 +1,71 @@
+import os
+import pytest
+import torch
+import deepspeed
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+class TestZeroLocalGradAccumulation(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('overlap_comm', [False, True])
+    def test(self, overlap_comm):
+        hidden_dim = 10
+        dtype = torch.half
+
+        models = []
+        for local_gradient_accumulation in [False, True]:
+            config_dict = {
+                "train_micro_batch_size_per_gpu": 2,
+                "gradient_accumulation_steps": 4,
+                "steps_per_print": 1,
+                "zero_optimization": {
+                    "stage": 2,
+                    "reduce_bucket_size": 25,
+                    "overlap_comm": overlap_comm,
+                    "local_gradient_accumulation": local_gradient_accumulation
+                },
+                "optimizer": {
+                    "type": "Adam",
+                    "params": {
+                        "lr": 1e-3
+                    }
+                },
+                "fp16": {
+                    "enabled": True,
+                    "initial_scale_power": 8
+                }
+            }
+            if bool(pytest.use_hpu) == True:
+                if os.getenv("REPLACE_FP16", default=None):
+                    config_dict["fp16"]["enabled"] = False
+                    config_dict["bf16"] = {"enabled": True}
+                    dtype = torch.bfloat16
+                hpu_flag, msg = is_hpu_supported(config_dict)
+                if not hpu_flag:
+                    pytest.skip(msg)
+
+            torch.manual_seed(42)
+            model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+            model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                          model=model,
+                                                          model_parameters=model.parameters())
+            assert optimizer.local_gradient_accumulation == local_gradient_accumulation
+            torch.manual_seed(0)
+            data_loader = random_dataloader(model=model,
+                                            total_samples=32,
+                                            hidden_dim=hidden_dim,
+                                            device=model.device,
+                                            dtype=dtype)
+            for batch in data_loader:
+                loss = model(batch[0], batch[1])
+                model.backward(loss)
+                model.step()
+            models.append(model)
+
+        # the local sums are reduced once instead of summing reduced gradients
+        for param, local_param in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.allclose(param, local_param, atol=1e-3)
@@ -0,0 +1,86 @@
+import pytest
+import torch
+from deepspeed.runtime.zero.memory_planner import build_meta_model, ModelMemoryStats, estimate_memory_needs
+
+from unit.simple_model import SimpleModel
+
+
+class MLPModel(torch.nn.Module):
+    def __init__(self, hidden_dim, nlayers):
+        super(MLPModel, self).__init__()
+        self.layers = torch.nn.ModuleList([
+            torch.nn.Sequential(torch.nn.Linear(hidden_dim,
+                                                4 * hidden_dim),
+                                torch.nn.GELU(),
+                                torch.nn.Linear(4 * hidden_dim,
+                                                hidden_dim)) for _ in range(nlayers)
+        ])
+        self.cross_entropy_loss = torch.nn.CrossEntropyLoss()
+
+    def forward(self, x, y):
+        for layer in self.layers:
+            x = x + layer(x)
+        return self.cross_entropy_loss(x, y)
+
+
+def sample_stats(model_class=SimpleModel, hidden_dim=16, nlayers=4, batch_size=8):
+    model = build_meta_model(model_class, hidden_dim, nlayers=nlayers)
+
+    def make_inputs():
+        x = torch.randn(batch_size, hidden_dim)
+        y = torch.randint(0, hidden_dim, [batch_size])
+        return x, y
+
+    inputs = build_meta_model(make_inputs)
+    return ModelMemoryStats(model, inputs)
+
+
+def test_model_memory_stats():
+    stats = sample_stats()
+    assert stats.total_params == 4 * (16 * 16 + 16)
+    assert stats.largest_layer_params == 16 * 16 + 16
+    # SimpleModel calls 2 layers per iteration on the same input, which is
+    # saved and kept once
+    assert stats.checkpoint_input_bytes == [8 * 16 * 4, 0] * 4
+    assert stats.checkpointed_activation_bytes == [8 * 16 * 4, 0] * 4
+    assert stats.activation_bytes > sum(stats.checkpointed_activation_bytes)
+
+
+def gpu_bytes(stats, zero_config, **config):
+    config.update({"bf16": {"enabled": True}, "zero_optimization": zero_config})
+    memory = estimate_memory_needs(stats,
+                                   config,
+                                   num_gpus_per_node=8,
+                                   fragmentation_factor=1.0)
+    return sum(memory["gpu"].values()), sum(memory["cpu"].values())
+
+
+def test_estimate_zero_stages():
+    stats = sample_stats()
+    buckets = {
+        "reduce_bucket_size": 16,
+        "prefetch_bucket_size": 16,
+        "stage3_param_persistence_threshold": 0
+    }
+    stage_bytes = []
+    for stage in range(4):
+        stage_bytes.append(gpu_bytes(stats, dict(stage=stage, **buckets))[0])
+    assert stage_bytes == sorted(stage_bytes, reverse=True)
+    assert len(set(stage_bytes)) == 4
+
+    offload_gpu, offload_cpu = gpu_bytes(stats, {"stage": 2, "offload_optimizer": {"device": "cpu"}, **buckets})
+    assert offload_gpu < stage_bytes[2]
+    assert offload_cpu > 0
+
+
+@pytest.mark.parametrize('cpu_checkpointing', [False, True])
+def test_estimate_activation_checkpointing(cpu_checkpointing):
+    stats = sample_stats(MLPModel, hidden_dim=64, batch_size=1024)
+    zero_config = {"stage": 2, "reduce_bucket_size": 16}
+    gpu, _ = gpu_bytes(stats, zero_config)
+    checkpointed_gpu, checkpointed_cpu = gpu_bytes(
+        stats,
+        zero_config,
+        activation_checkpointing={"cpu_checkpointing": cpu_checkpointing})
+    assert checkpointed_gpu < gpu
+    assert (checkpointed_cpu > 0) == cpu_checkpointing
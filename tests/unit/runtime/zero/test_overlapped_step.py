@@ -0,0 +1,106 @@
+import os
+import pytest
+import torch
+import deepspeed
+import deepspeed.comm as dist
+from deepspeed.ops.op_builder import CPUAdamBuilder
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+def _train(zero_stage, overlap_step, hidden_dim=10):
+    dtype = torch.half
+    config_dict = {
+        "train_micro_batch_size_per_gpu": 2,
+        "steps_per_print": 1,
+        "zero_optimization": {
+            "stage": zero_stage,
+            # chunks of 8 elements per rank
+            "allgather_bucket_size": 16,
+            "offload_optimizer": {
+                "device": "cpu",
+                "overlap_step": overlap_step
+            }
+        },
+        "optimizer": {
+            "type": "Adam",
+            "params": {
+                "lr": 1e-3
+            }
+        },
+        "gradient_clipping": 1.0,
+        "fp16": {
+            "enabled": True,
+            "initial_scale_power": 8
+        }
+    }
+    if bool(pytest.use_hpu) == True:
+        if os.getenv("REPLACE_FP16", default=None):
+            config_dict["fp16"]["enabled"] = False
+            config_dict["bf16"] = {"enabled": True}
+            dtype = torch.bfloat16
+        hpu_flag, msg = is_hpu_supported(config_dict)
+        if not hpu_flag:
+            pytest.skip(msg)
+
+    torch.manual_seed(42)
+    model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+    model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                  model=model,
+                                                  model_parameters=model.parameters())
+    assert (optimizer.overlapped_step is not None) == overlap_step
+    torch.manual_seed(0)
+    data_loader = random_dataloader(model=model,
+                                    total_samples=8,
+                                    hidden_dim=hidden_dim,
+                                    device=model.device,
+                                    dtype=dtype)
+    for batch in data_loader:
+        loss = model(batch[0], batch[1])
+        model.backward(loss)
+        model.step()
+        if overlap_step and not optimizer.overflow:
+            assert optimizer.overlapped_step.pending
+    return model, optimizer
+
+
+class TestZeroOverlappedStep(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('zero_stage', [1, 2])
+    def test(self, zero_stage):
+        if not deepspeed.ops.__compatible_ops__[CPUAdamBuilder.NAME]:
+            pytest.skip("cpu-adam is not compatible")
+
+        models = []
+        for overlap_step in [False, True]:
+            model, optimizer = _train(zero_stage, overlap_step)
+            optimizer.wait_overlapped_step()
+            models.append(model)
+
+        for param, overlapped_param in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.allclose(param, overlapped_param)
+
+    @pytest.mark.parametrize('zero_stage', [1, 2])
+    def test_save_after_step(self, tmpdir, zero_stage):
+        if not deepspeed.ops.__compatible_ops__[CPUAdamBuilder.NAME]:
+            pytest.skip("cpu-adam is not compatible")
+
+        model, _ = _train(zero_stage, overlap_step=False)
+        expected = model.module_state_dict()
+
+        # the exports must wait for the pending step themselves
+        model, _ = _train(zero_stage, overlap_step=True)
+        state_dict = model.module_state_dict()
+        for key, value in expected.items():
+            assert torch.allclose(value, state_dict[key])
+
+        model, optimizer = _train(zero_stage, overlap_step=True)
+        assert model.save_16bit_model(str(tmpdir))
+        assert not optimizer.overlapped_step.pending
+        if dist.get_rank() == 0:
+            saved = torch.load(os.path.join(tmpdir, "pytorch_model.bin"))
+            for key, value in expected.items():
+                assert torch.allclose(value, saved[key].to(value.device))
@@ -0,0 +1,86 @@
+import functools
+import os
+import pytest
+import torch
+import deepspeed
+from deepspeed.runtime.zero.prefetch_controller import adjust_prefetch_limit
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+def test_adjust_prefetch_limit():
+    adjust = functools.partial(adjust_prefetch_limit,
+                               min_limit=10,
+                               max_limit=100,
+                               max_memory_fraction=0.9,
+                               max_exposed_fraction=0.05,
+                               factor=2)
+    # exposed all-gathers grow the limit up to its upper bound
+    assert adjust(40, peak_memory_fraction=0.5, exposed_fraction=0.5) == 80
+    assert adjust(80, peak_memory_fraction=0.5, exposed_fraction=0.5) == 100
+    # memory pressure wins over exposed all-gathers
+    assert adjust(40, peak_memory_fraction=0.95, exposed_fraction=0.5) == 20
+    assert adjust(15, peak_memory_fraction=0.95, exposed_fraction=0.) == 10
+    # steady state
+    assert adjust(40, peak_memory_fraction=0.5, exposed_fraction=0.01) == 40
+
+
+class TestZeroPrefetchController(DistributedTest):
+    world_size = 2
+
+    def test(self):
+        hidden_dim = 10
+        dtype = torch.half
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 2,
+            "steps_per_print": 1,
+            "zero_optimization": {
+                "stage": 3,
+                "stage3_param_persistence_threshold": 0,
+                "stage3_prefetch_bucket_size": 10,
+                "prefetch_control": {
+                    "enabled": True,
+                    "min_prefetch_bucket_size": 10,
+                    "max_prefetch_bucket_size": 1000,
+                    "memory_headroom": 0.
+                }
+            },
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 1e-3
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "initial_scale_power": 8
+            }
+        }
+        if bool(pytest.use_hpu) == True:
+            if os.getenv("REPLACE_FP16", default=None):
+                config_dict["fp16"]["enabled"] = False
+                config_dict["bf16"] = {"enabled": True}
+                dtype = torch.bfloat16
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        model = SimpleModel(hidden_dim=hidden_dim, nlayers=4)
+        model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                      model=model,
+                                                      model_parameters=model.parameters())
+        assert model.prefetch_controller is not None
+        data_loader = random_dataloader(model=model,
+                                        total_samples=16,
+                                        hidden_dim=hidden_dim,
+                                        device=model.device,
+                                        dtype=dtype)
+        for batch in data_loader:
+            loss = model(batch[0], batch[1])
+            model.backward(loss)
+            model.step()
+
+        # the first forward of every step is gathered on demand
+        assert optimizer.get_prefetch_limits()["prefetch_bucket_size"] > 10
@@ -0,0 +1,46 @@
+import os
+
+import torch
+import pytest
+
+import deepspeed
+from deepspeed.runtime.comm.quantized_collectives import BlockQuantizer
+from deepspeed.runtime.zero.partition_parameters import ZeroParamStatus
+
+from unit.common import DistributedTest
+from unit.hpu import *
+
+
+class TestQuantizedParamGather(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('dtype', ["int8", "fp8"])
+    def test(self, dtype):
+        if dtype == "fp8" and not hasattr(torch, "float8_e4m3fn"):
+            pytest.skip("fp8 requires torch.float8_e4m3fn")
+        use_hpu = None
+        zero3_init_dtype = None
+        if bool(pytest.use_hpu) == True:
+            use_hpu = True
+            if os.getenv("REPLACE_FP16", default=None):
+                zero3_init_dtype = torch.bfloat16
+        with deepspeed.zero.Init(use_hpu=use_hpu, dtype=zero3_init_dtype):
+            l = torch.nn.Linear(64, 33)
+        params = [l.weight, l.bias]
+        with deepspeed.zero.GatheredParameters(params):
+            expected = [param.detach().clone().float() for param in params]
+
+        handle = l.weight.all_gather_coalesced(params,
+                                               quantizer=BlockQuantizer(dtype,
+                                                                        block_size=32))
+        handle.wait()
+        for param, expected_param in zip(params, expected):
+            assert param.ds_status == ZeroParamStatus.AVAILABLE
+            assert param.shape == expected_param.shape
+            # the error is bounded by half a quantization step of the block
+            num_steps = 127 if dtype == "int8" else 8
+            tolerance = expected_param.abs().max().item() / num_steps
+            assert torch.allclose(param.float(), expected_param, atol=tolerance)
+
+        l.weight.partition(param_list=params)
+        assert all(param.ds_status == ZeroParamStatus.NOT_AVAILABLE for param in params)
@@ -0,0 +1,73 @@
+import os
+import pytest
+import torch
+import deepspeed
+
+from unit.common import DistributedTest
+from unit.simple_model import SimpleModel, random_dataloader
+from unit.hpu import *
+
+
+class TestZeroSecondaryPartition(DistributedTest):
+    world_size = 4
+
+    def test(self):
+        # two nodes of two ranks
+        os.environ["LOCAL_SIZE"] = "2"
+        hidden_dim = 10
+        dtype = torch.half
+
+        models = []
+        for secondary_partition in [False, True]:
+            config_dict = {
+                "train_micro_batch_size_per_gpu": 2,
+                "steps_per_print": 1,
+                "zero_optimization": {
+                    "stage": 3,
+                    "stage3_param_persistence_threshold": 0,
+                    "stage3_max_reuse_distance": 0,
+                    "stage3_secondary_partition": secondary_partition
+                },
+                "optimizer": {
+                    "type": "Adam",
+                    "params": {
+                        "lr": 1e-3
+                    }
+                },
+                "fp16": {
+                    "enabled": True,
+                    "initial_scale_power": 8
+                }
+            }
+            if bool(pytest.use_hpu) == True:
+                if os.getenv("REPLACE_FP16", default=None):
+                    config_dict["fp16"]["enabled"] = False
+                    config_dict["bf16"] = {"enabled": True}
+                    dtype = torch.bfloat16
+                hpu_flag, msg = is_hpu_supported(config_dict)
+                if not hpu_flag:
+                    pytest.skip(msg)
+
+            torch.manual_seed(42)
+            model = SimpleModel(hidden_dim=hidden_dim, nlayers=3)
+            model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                          model=model,
+                                                          model_parameters=model.parameters())
+            assert (optimizer.parameter_offload._secondary_group
+                    is not None) == secondary_partition
+            torch.manual_seed(0)
+            data_loader = random_dataloader(model=model,
+                                            total_samples=16,
+                                            hidden_dim=hidden_dim,
+                                            device=model.device,
+                                            dtype=dtype)
+            for batch in data_loader:
+                loss = model(batch[0], batch[1])
+                model.backward(loss)
+                model.step()
+            with deepspeed.zero.GatheredParameters(list(model.parameters())):
+                models.append([param.detach().clone() for param in model.parameters()])
+
+        # the secondary partitions hold the same values as the gathered parameters
+        for param, secondary_param in zip(*models):
+            assert torch.equal(param, secondary_param)
@@ -1460,3 +1460,256 @@ class TestZeroAdamOptimizerStepCount(DistributedTest):
                         state = optimizer.optimizer.state[param]
                         step_counts.append(state['step'])
                 assert all(step == step_counts[0] for step in step_counts)
+
+
+@pytest.mark.parametrize('zero_stage', [1, 2])
+class TestZeroFusedNormAndOverflow(DistributedTest):
+    world_size = 2
+
+    def test(self, zero_stage):
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 2,
+            "steps_per_print": 1,
+            "zero_optimization": {
+                "stage": zero_stage
+            },
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 1e-3
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "initial_scale_power": 8
+            }
+        }
+        hidden_dim = 10
+        dtype=torch.half
+        if bool(pytest.use_hpu) == True:
+            if os.getenv("REPLACE_FP16", default=None):
+                config_dict["fp16"]["enabled"] = False
+                config_dict["bf16"] = {"enabled" : True}
+                dtype=torch.bfloat16
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        model = SimpleModel(hidden_dim=hidden_dim, nlayers=4)
+        model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                      model=model,
+                                                      model_parameters=model.parameters())
+        data_loader = random_dataloader(model=model,
+                                        total_samples=8,
+                                        hidden_dim=hidden_dim,
+                                        device=model.device,
+                                        dtype=dtype)
+
+        for i, batch in enumerate(data_loader):
+            loss = model(batch[0], batch[1])
+            model.backward(loss)
+            if i == 2:
+                # an inf in the gradient partition of one rank skips the step on all ranks
+                if dist.get_rank() == 0:
+                    optimizer.averaged_gradients[0][0].view(-1)[0] = float('inf')
+                model.step()
+                assert optimizer.overflow
+                continue
+
+            # the fused pass must match the separate norm computation
+            loss_scale = optimizer.loss_scale
+            expected_norm = optimizer.scaled_global_norm() / loss_scale
+            model.step()
+            assert not optimizer.overflow
+            assert math.isclose(model.get_global_grad_norm(), expected_norm, rel_tol=1e-5)
+
+    def test_multiple_groups(self, zero_stage):
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 2,
+            "steps_per_print": 1,
+            "zero_optimization": {
+                "stage": zero_stage
+            },
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 1e-3
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "initial_scale_power": 8
+            }
+        }
+        hidden_dim = 10
+        dtype = torch.half
+        if bool(pytest.use_hpu) == True:
+            if os.getenv("REPLACE_FP16", default=None):
+                config_dict["fp16"]["enabled"] = False
+                config_dict["bf16"] = {"enabled": True}
+                dtype = torch.bfloat16
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        model = SimpleModel(hidden_dim=hidden_dim, nlayers=4)
+        params = list(model.parameters())
+        param_groups = [{"params": params[:2]}, {"params": params[2:]}]
+        model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                      model=model,
+                                                      model_parameters=param_groups)
+        data_loader = random_dataloader(model=model,
+                                        total_samples=4,
+                                        hidden_dim=hidden_dim,
+                                        device=model.device,
+                                        dtype=dtype)
+
+        for batch in data_loader:
+            loss = model(batch[0], batch[1])
+            model.backward(loss)
+            # the flat partitions of several groups are not all kept alive
+            _, flat_grad_partitions = optimizer._fused_grad_sum_squares()
+            assert flat_grad_partitions == [None, None]
+
+            loss_scale = optimizer.loss_scale
+            expected_norm = optimizer.scaled_global_norm() / loss_scale
+            model.step()
+            if not optimizer.overflow:
+                assert math.isclose(model.get_global_grad_norm(),
+                                    expected_norm,
+                                    rel_tol=1e-5)
+
+
+class TestZeroHierarchicalReduceScatter(DistributedTest):
+    world_size = 4
+
+    def test(self, monkeypatch):
+        # 2 nodes of 2 ranks
+        monkeypatch.setenv("LOCAL_SIZE", "2")
+        hidden_dim = 10
+        dtype=torch.half
+
+        models = []
+        for hierarchical_reduce_scatter in [False, True]:
+            config_dict = {
+                "train_micro_batch_size_per_gpu": 2,
+                "steps_per_print": 1,
+                "zero_optimization": {
+                    "stage": 2,
+                    "reduce_bucket_size": 25,
+                    "hierarchical_reduce_scatter": hierarchical_reduce_scatter
+                },
+                "optimizer": {
+                    "type": "Adam",
+                    "params": {
+                        "lr": 1e-3
+                    }
+                },
+                "fp16": {
+                    "enabled": True,
+                    "initial_scale_power": 8
+                }
+            }
+            if bool(pytest.use_hpu) == True:
+                if os.getenv("REPLACE_FP16", default=None):
+                    config_dict["fp16"]["enabled"] = False
+                    config_dict["bf16"] = {"enabled" : True}
+                    dtype=torch.bfloat16
+                hpu_flag, msg = is_hpu_supported(config_dict)
+                if not hpu_flag:
+                    pytest.skip(msg)
+
+            torch.manual_seed(42)
+            model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+            model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                          model=model,
+                                                          model_parameters=model.parameters())
+            assert (optimizer.hierarchical_dp_groups is not None) == hierarchical_reduce_scatter
+            torch.manual_seed(0)
+            data_loader = random_dataloader(model=model,
+                                            total_samples=8,
+                                            hidden_dim=hidden_dim,
+                                            device=model.device,
+                                            dtype=dtype)
+            for batch in data_loader:
+                loss = model(batch[0], batch[1])
+                model.backward(loss)
+                model.step()
+            models.append(model)
+
+        for flat_param, hierarchical_param in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.allclose(flat_param, hierarchical_param, atol=1e-3)
+
+
+class TestZeroGradientQuantization(DistributedTest):
+    world_size = 2
+
+    @pytest.mark.parametrize('zero_stage', [1, 2])
+    @pytest.mark.parametrize('quantization_dtype', ["int8", "fp8"])
+    @pytest.mark.parametrize('error_feedback', [False, True])
+    def test(self, zero_stage, quantization_dtype, error_feedback):
+        hidden_dim = 10
+        dtype=torch.half
+
+        models = []
+        for enabled in [False, True]:
+            config_dict = {
+                "train_micro_batch_size_per_gpu": 2,
+                "steps_per_print": 1,
+                "zero_optimization": {
+                    "stage": zero_stage,
+                    "reduce_bucket_size": 25,
+                    "gradient_quantization": {
+                        "enabled": enabled,
+                        "dtype": quantization_dtype,
+                        "block_size": 16,
+                        "error_feedback": error_feedback
+                    }
+                },
+                "optimizer": {
+                    "type": "Adam",
+                    "params": {
+                        "lr": 1e-3
+                    }
+                },
+                "fp16": {
+                    "enabled": True,
+                    "initial_scale_power": 8
+                }
+            }
+            if bool(pytest.use_hpu) == True:
+                if os.getenv("REPLACE_FP16", default=None):
+                    config_dict["fp16"]["enabled"] = False
+                    config_dict["bf16"] = {"enabled" : True}
+                    dtype=torch.bfloat16
+                hpu_flag, msg = is_hpu_supported(config_dict)
+                if not hpu_flag:
+                    pytest.skip(msg)
+
+            torch.manual_seed(42)
+            model = SimpleModel(hidden_dim=hidden_dim, nlayers=2)
+            model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                          model=model,
+                                                          model_parameters=model.parameters())
+            assert (optimizer.gradient_quantizer is not None) == enabled
+            torch.manual_seed(0)
+            data_loader = random_dataloader(model=model,
+                                            total_samples=8,
+                                            hidden_dim=hidden_dim,
+                                            device=model.device,
+                                            dtype=dtype)
+            for batch in data_loader:
+                loss = model(batch[0], batch[1])
+                model.backward(loss)
+                model.step()
+            if enabled and error_feedback:
+                # fp16 residuals divided by the loss scale would underflow
+                assert len(optimizer.quantization_residuals) > 0
+                for residual in optimizer.quantization_residuals.values():
+                    assert residual.dtype == torch.float32
+            models.append(model)
+
+        # Adam normalizes the updates, quantized gradients only move the
+        # parameters by a fraction of the learning rate per step
+        for param, quantized_param in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.allclose(param, quantized_param, atol=1e-2)
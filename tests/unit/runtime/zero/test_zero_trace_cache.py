@@ -0,0 +1,77 @@
+import os
+import pytest
+import torch
+import deepspeed
+
+from unit.common import DistributedTest
+from unit.simple_model import random_dataloader
+from unit.hpu import *
+
+
+class BranchModel(torch.nn.Module):
+    def __init__(self, hidden_dim):
+        super().__init__()
+        self.linear = torch.nn.Linear(hidden_dim, hidden_dim)
+        self.branches = torch.nn.ModuleList(
+            [torch.nn.Linear(hidden_dim,
+                             hidden_dim) for _ in range(2)])
+        self.cross_entropy_loss = torch.nn.CrossEntropyLoss()
+        self.branch = 0
+
+    def forward(self, x, y):
+        hidden = self.branches[self.branch](self.linear(x))
+        return self.cross_entropy_loss(hidden, y)
+
+
+class TestZeroTraceCache(DistributedTest):
+    world_size = 2
+
+    def test(self):
+        hidden_dim = 10
+        dtype = torch.half
+        config_dict = {
+            "train_micro_batch_size_per_gpu": 2,
+            "steps_per_print": 1,
+            "zero_optimization": {
+                "stage": 3,
+                "stage3_param_persistence_threshold": 0,
+                "stage3_max_cached_traces": 2
+            },
+            "optimizer": {
+                "type": "Adam",
+                "params": {
+                    "lr": 1e-3
+                }
+            },
+            "fp16": {
+                "enabled": True,
+                "initial_scale_power": 8
+            }
+        }
+        if bool(pytest.use_hpu) == True:
+            if os.getenv("REPLACE_FP16", default=None):
+                config_dict["fp16"]["enabled"] = False
+                config_dict["bf16"] = {"enabled": True}
+                dtype = torch.bfloat16
+            hpu_flag, msg = is_hpu_supported(config_dict)
+            if not hpu_flag:
+                pytest.skip(msg)
+
+        model = BranchModel(hidden_dim)
+        model, optimizer, _, _ = deepspeed.initialize(config=config_dict,
+                                                      model=model,
+                                                      model_parameters=model.parameters())
+        coordinator = optimizer.parameter_offload.get_param_coordinator(training=True)
+        data_loader = random_dataloader(model=model,
+                                        total_samples=16,
+                                        hidden_dim=hidden_dim,
+                                        device=model.device,
+                                        dtype=dtype)
+        for n, batch in enumerate(data_loader):
+            model.module.branch = n % 2
+            loss = model(batch[0], batch[1])
+            # both execution paths are cached after the first two steps
+            if n >= 2:
+                assert coordinator.is_complete_trace()
+            model.backward(loss)
+            model.step()
@@ -1,4 +1,4 @@
-from deepspeed.utils.groups import _get_expert_parallel_ranks
+from deepspeed.utils.groups import _get_expert_parallel_ranks, _get_hierarchical_data_parallel_ranks
 
 
 def test_get_expert_parallel_ranks():
@@ -51,3 +51,28 @@ def test_get_expert_parallel_ranks():
         [7,
          15],
     ]
+
+
+def test_get_hierarchical_data_parallel_ranks():
+    """
+    Example - M + D parallel
+    world_size = 8
+    local_world_size = 4
+    model_degree = 2
+    data_parallel_group = [0,2,4,6], [1,3,5,7]
+    intra_node_group = [0,2],[4,6], [1,3],[5,7]
+    inter_node_group = [0,4],[2,6], [1,5],[3,7]
+    """
+    get_ranks = _get_hierarchical_data_parallel_ranks
+    intra_node_ranks, inter_node_ranks = get_ranks([0, 2, 4, 6], local_world_size=4)
+    assert intra_node_ranks == [[0, 2], [4, 6]]
+    assert inter_node_ranks == [[0, 4], [2, 6]]
+    intra_node_ranks, inter_node_ranks = get_ranks([1, 3, 5, 7], local_world_size=4)
+    assert intra_node_ranks == [[1, 3], [5, 7]]
+    assert inter_node_ranks == [[1, 5], [3, 7]]
+    # single node
+    assert get_ranks([0, 1, 2, 3], local_world_size=4) is None
+    # single rank per node
+    assert get_ranks([0, 4], local_world_size=4) is None
+    # uneven nodes
+    assert get_ranks([0, 1, 2, 4], local_world_size=4) is None
@@ -0,0 +1,129 @@
+import os
+import math
+import pytest
+import torch
+from collections import OrderedDict
+
+from deepspeed.checkpoint.constants import (DS_VERSION,
+                                            OPTIMIZER_STATE_DICT,
+                                            SINGLE_PARTITION_OF_FP32_GROUPS,
+                                            FP32_FLAT_GROUPS,
+                                            ZERO_STAGE,
+                                            PARTITION_COUNT,
+                                            PARAM_SHAPES,
+                                            BUFFER_NAMES)
+import deepspeed.utils.zero_to_fp32 as zero_to_fp32
+from deepspeed.utils.zero_to_fp32 import convert_zero_checkpoint_to_fp32_state_dict
+
+WORLD_SIZE = 4
+
+# two param groups with numels that do not split evenly across ranks
+PARAMS = [OrderedDict(), OrderedDict()]
+PARAMS[0]["linear1.weight"] = torch.randn(5, 3)
+PARAMS[0]["linear1.bias"] = torch.randn(5)
+PARAMS[1]["linear2.weight"] = torch.randn(7, 5)
+PARAMS[1]["linear2.bias"] = torch.randn(7)
+
+
+def _save_model_states(ckpt_dir, file_name):
+    param_shapes = []
+    for group in PARAMS:
+        param_shapes.append(OrderedDict((name, p.shape) for name, p in group.items()))
+    model_states = {
+        "module": {
+            "running_mean": torch.ones(3).half()
+        },
+        BUFFER_NAMES: ["running_mean"],
+        PARAM_SHAPES: param_shapes,
+        DS_VERSION: "0.0.0",
+    }
+    torch.save(model_states, os.path.join(ckpt_dir, file_name))
+
+
+def _save_optim_states(ckpt_dir, rank, zero_stage, fp32_groups):
+    fp32_groups_key = SINGLE_PARTITION_OF_FP32_GROUPS if zero_stage == 2 else FP32_FLAT_GROUPS
+    torch.save(
+        {
+            OPTIMIZER_STATE_DICT: {
+                ZERO_STAGE: zero_stage,
+                PARTITION_COUNT: [WORLD_SIZE] * len(PARAMS),
+                fp32_groups_key: fp32_groups,
+                "base_optimizer_state": [torch.zeros(16)],
+            }
+        },
+        os.path.join(ckpt_dir,
+                     f"zero_pp_rank_{rank}_mp_rank_00_optim_states.pt"))
+
+
+def _create_zero2_checkpoint(ckpt_dir):
+    _save_model_states(ckpt_dir, "mp_rank_00_model_states.pt")
+    partitions = [[] for _ in range(WORLD_SIZE)]
+    for group in PARAMS:
+        flat = torch.cat([p.flatten() for p in group.values()])
+        align_to = 2 * WORLD_SIZE
+        padding = align_to * math.ceil(flat.numel() / align_to) - flat.numel()
+        flat = torch.cat([flat, torch.zeros(padding)])
+        for rank, partition in enumerate(flat.chunk(WORLD_SIZE)):
+            partitions[rank].append(partition.clone())
+    for rank in range(WORLD_SIZE):
+        _save_optim_states(ckpt_dir, rank, 2, partitions[rank])
+
+
+def _create_zero3_checkpoint(ckpt_dir):
+    _save_model_states(ckpt_dir, "zero_pp_rank_0_mp_rank_00_model_states.pt")
+    partitions = [[] for _ in range(WORLD_SIZE)]
+    for group in PARAMS:
+        group_partitions = [[] for _ in range(WORLD_SIZE)]
+        for p in group.values():
+            partitioned_numel = math.ceil(p.numel() / WORLD_SIZE)
+            padding = partitioned_numel * WORLD_SIZE - p.numel()
+            padded = torch.cat([p.flatten(), torch.zeros(padding)])
+            for rank, partition in enumerate(padded.chunk(WORLD_SIZE)):
+                group_partitions[rank].append(partition)
+        for rank in range(WORLD_SIZE):
+            partitions[rank].append(torch.cat(group_partitions[rank]))
+    for rank in range(WORLD_SIZE):
+        _save_optim_states(ckpt_dir, rank, 3, partitions[rank])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('zero_stage', [2, 3])
+def test_zero_to_fp32(tmpdir, zero_stage, workers):
+    tag = "global_step1"
+    ckpt_dir = os.path.join(tmpdir, tag)
+    os.makedirs(ckpt_dir)
+    if zero_stage == 2:
+        _create_zero2_checkpoint(ckpt_dir)
+    else:
+        _create_zero3_checkpoint(ckpt_dir)
+
+    output_file = os.path.join(tmpdir, "pytorch_model.bin")
+    convert_zero_checkpoint_to_fp32_state_dict(str(tmpdir),
+                                               output_file,
+                                               tag=tag,
+                                               workers=workers)
+    state_dict = torch.load(output_file)
+
+    param_names = [name for group in PARAMS for name in group]
+    assert list(state_dict.keys()) == ["running_mean"] + param_names
+    assert state_dict["running_mean"].dtype == torch.float32
+    for group in PARAMS:
+        for name, param in group.items():
+            assert torch.equal(state_dict[name], param)
+    # the file backing the merged params is removed
+    assert sorted(os.listdir(tmpdir)) == sorted([tag, "pytorch_model.bin"])
+
+
+def test_zero_to_fp32_small_shared_memory(tmpdir, monkeypatch):
+    tag = "global_step1"
+    ckpt_dir = os.path.join(tmpdir, tag)
+    os.makedirs(ckpt_dir)
+    _create_zero2_checkpoint(ckpt_dir)
+
+    # falls back to a single worker when /dev/shm cannot hold the merged params
+    monkeypatch.setattr(zero_to_fp32, "_shared_memory_available", lambda numel: False)
+    get_state_dict = zero_to_fp32.get_fp32_state_dict_from_zero_checkpoint
+    state_dict = get_state_dict(str(tmpdir), tag=tag, workers=2)
+    for group in PARAMS:
+        for name, param in group.items():
+            assert torch.equal(state_dict[name], param)